@@ -3,12 +3,18 @@ Aplicação Flask para Interface Web de Teste de Conectividade HTTP/HTTPS
 """
 
 from flask import Flask, render_template, request, jsonify
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict
 import logging
 
+from services.concurrency import criar_controle, workers_fixos
 from services.http_tester import HTTPTester
-from utils.file_reader import validar_ipv4
+from services.probe_result import formatar_protocolo, formatar_status, status_geral, tempos_ms
+from services.rate_limiter import LimitadorTaxa
+from services.result_cache import criar_cache, perfil_teste
+from services.scheduler import AgendadorTestes
+from services.timeouts import PoliticaTimeout, TimeoutAdaptativo
+from utils.file_reader import FonteAlvos
+from utils.ip_parser import ipv4_para_int
+from utils.target_set import ConjuntoAlvos, ler_exclusoes
 import config
 
 app = Flask(__name__)
@@ -17,35 +23,23 @@ app.config['JSON_AS_ASCII'] = False
 # Configura logging
 logging.basicConfig(level=logging.INFO)
 
+# Resultados recentes, compartilhados entre as requisições
+cache_resultados = criar_cache(config.VALIDADE_CACHE, config.MAX_ENTRADAS_CACHE, config.ARQUIVO_CACHE)
 
-def processar_lista_ips(texto_ips: str) -> List[str]:
+
+def processar_lista_ips(texto_ips: str) -> ConjuntoAlvos:
     """
-    Processa texto com IPs (um por linha) e retorna lista de IPs válidos.
+    Processa texto com IPs (um por linha) e retorna os alvos válidos.
     
     Args:
-        texto_ips: String com IPs separados por quebra de linha
+        texto_ips: String com IPs, prefixos CIDR ou faixas separados por quebra de linha
         
     Returns:
-        Lista de IPs IPv4 válidos
+        ConjuntoAlvos com os IPs IPv4 válidos, sem repetições e sem os de
+        config.ARQUIVO_EXCLUSOES
     """
-    ips_validos = []
-    linhas = texto_ips.strip().split('\n')
-    
-    for linha in linhas:
-        ip = linha.strip()
-        # Ignora linhas vazias e comentários
-        if ip and not ip.startswith('#'):
-            if validar_ipv4(ip):
-                ips_validos.append(ip)
-    
-    return ips_validos
-
-
-def calcular_workers(numero_ips: int) -> int:
-    """Calcula número ideal de workers"""
-    workers = max(config.MIN_WORKERS, min(numero_ips // 5, config.MAX_WORKERS))
-    workers = min(workers, numero_ips, config.MAX_WORKERS)
-    return max(workers, 1)
+    exclusoes = ler_exclusoes(config.ARQUIVO_EXCLUSOES) if config.ARQUIVO_EXCLUSOES else []
+    return ConjuntoAlvos.da_fonte(FonteAlvos.do_texto(texto_ips), exclusoes)
 
 
 @app.route('/')
@@ -58,7 +52,16 @@ def index():
 def testar_ips():
     """
     Endpoint para testar IPs.
-    Recebe JSON com: { "ips": "string com IPs", "porta": 8080, "timeout": 5 }
+    Recebe JSON com: { "ips": "string com IPs", "porta": 8080, "timeout": 5,
+                       "verificar_ssl": false, "protocolos_simultaneos": true,
+                       "pre_verificar_tcp": false, "farejar_protocolo": false,
+                       "timeout_adaptativo": false, "timeout_conexao": null,
+                       "timeout_tls": null, "timeout_leitura": null, "prazo_ip": null,
+                       "inferir_https": false, "taxa": null, "max_por_sub_rede": null,
+                       "forcar_atualizacao": false }
+    Os timeouts por fase ausentes (null) usam "timeout". Alvos testados há menos
+    de VALIDADE_CACHE segundos vêm do cache ("em_cache": true), exceto com
+    "forcar_atualizacao".
     """
     try:
         data = request.get_json()
@@ -70,6 +73,20 @@ def testar_ips():
         porta = data.get('porta', config.PORTA_PADRAO)
         timeout = data.get('timeout', config.TIMEOUT_PADRAO)
         verificar_ssl = data.get('verificar_ssl', config.VERIFICAR_SSL)
+        protocolos_simultaneos = data.get('protocolos_simultaneos', config.PROTOCOLOS_SIMULTANEOS)
+        pre_verificar_tcp = data.get('pre_verificar_tcp', config.PRE_VERIFICACAO_TCP)
+        farejar_protocolo = data.get('farejar_protocolo', config.FAREJAR_PROTOCOLO)
+        timeout_adaptativo = data.get('timeout_adaptativo', config.TIMEOUT_ADAPTATIVO)
+        inferir_https = data.get('inferir_https', config.INFERIR_HTTPS)
+        taxa = data.get('taxa', config.TAXA_CONEXOES)
+        max_por_sub_rede = data.get('max_por_sub_rede', config.MAX_POR_SUB_REDE)
+        forcar_atualizacao = data.get('forcar_atualizacao', False)
+        politica = PoliticaTimeout(
+            conexao=data.get('timeout_conexao') or config.TIMEOUT_CONEXAO or timeout,
+            tls=data.get('timeout_tls') or config.TIMEOUT_TLS or timeout,
+            leitura=data.get('timeout_leitura') or config.TIMEOUT_LEITURA or timeout,
+            prazo_ip=data.get('prazo_ip', config.PRAZO_POR_IP)
+        )
         
         if not texto_ips:
             return jsonify({'erro': 'Lista de IPs vazia'}), 400
@@ -80,56 +97,72 @@ def testar_ips():
         if not ips:
             return jsonify({'erro': 'Nenhum IP válido encontrado'}), 400
         
+        # Resultados ainda válidos, obtidos no mesmo modo de teste, vêm do
+        # cache; só os demais são testados. O farejamento não usa o cache
+        cache = None if farejar_protocolo else cache_resultados
+        perfil = perfil_teste(verificar_ssl, politica, pre_verificar_tcp, inferir_https, timeout_adaptativo)
+        em_cache = {}
+        if cache is not None and not forcar_atualizacao:
+            for ip in ips:
+                resultado = cache.obter(ip, porta, perfil)
+                if resultado is not None:
+                    em_cache[(ip, porta)] = resultado
+        numero_testes = max(1, len(ips) - len(em_cache))
+        
+        # Testes simultâneos: controle adaptativo ou número fixo de workers
+        controle = None
+        if config.CONCORRENCIA_ADAPTATIVA:
+            controle = criar_controle(numero_testes, config.MAX_WORKERS_PADRAO, config.MIN_WORKERS,
+                                      config.MAX_CONCORRENCIA, 2 if protocolos_simultaneos else 1)
+            num_workers = controle.maximo
+        else:
+            num_workers = workers_fixos(numero_testes, config.MIN_WORKERS, config.MAX_WORKERS)
+        
         # Inicializa testador
         testador = HTTPTester(
             porta=porta,
             timeout=timeout,
-            verificar_ssl=verificar_ssl
+            verificar_ssl=verificar_ssl,
+            protocolos_simultaneos=protocolos_simultaneos,
+            max_workers=num_workers,
+            pre_verificar_tcp=pre_verificar_tcp,
+            farejar_protocolo=farejar_protocolo,
+            timeout_adaptativo=(
+                TimeoutAdaptativo(config.TIMEOUT_MINIMO, politica.conexao) if timeout_adaptativo else None
+            ),
+            politica_timeout=politica,
+            inferir_https=inferir_https,
+            limitador_taxa=LimitadorTaxa(taxa, config.RAJADA_CONEXOES) if taxa else None
         )
         
-        # Calcula workers
-        num_workers = calcular_workers(len(ips))
-        
         # Executa testes em paralelo
-        resultados = []
+        with testador:
+            resultados = AgendadorTestes(
+                testador, [porta], num_workers, prazo_ip=politica.prazo_ip,
+                max_por_sub_rede=max_por_sub_rede, prefixo_sub_rede=config.PREFIXO_SUB_REDE,
+                controle=controle
+            ).executar(ips, concluido=lambda ip, porta: (ip, porta) in em_cache)
         
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
-            futures = {executor.submit(testador.testar_ip, ip): ip for ip in ips}
-            
-            for future in as_completed(futures):
-                ip = futures[future]
-                try:
-                    resultado = future.result()
-                    resultados.append(resultado)
-                except Exception as e:
-                    logging.error(f"Erro ao testar {ip}: {str(e)}")
-                    resultados.append({
-                        'ip': ip,
-                        'http': f'Erro: {str(e)}',
-                        'https': f'Erro: {str(e)}'
-                    })
+        if cache is not None:
+            cache.guardar(resultados, perfil)
+            cache.persistir()
         
-        # Ordena por IP
-        resultados.sort(key=lambda x: x['ip'])
+        # Ordena por IP (numérico)
+        resultados.extend(em_cache.values())
+        resultados.sort(key=lambda x: (ipv4_para_int(x.ip), x.porta))
         
         # Formata resultados para o frontend
         resultados_formatados = []
         for r in resultados:
-            http_status = r.get('http', 'N/A')
-            https_status = r.get('https', 'N/A')
-            
-            # Determina status geral
-            status_geral = 'OK'
-            if 'Timeout' in http_status and 'Timeout' in https_status:
-                status_geral = 'Timeout'
-            elif 'OK' not in http_status and 'OK' not in https_status:
-                status_geral = 'Error'
-            
             resultados_formatados.append({
-                'ip': r['ip'],
-                'http': http_status,
-                'https': https_status,
-                'status': status_geral
+                'ip': r.ip,
+                'porta': r.porta,
+                'http': formatar_protocolo(r.http),
+                'https': formatar_protocolo(r.https),
+                'status': formatar_status(status_geral(r)),
+                'tempos_http': tempos_ms(r.http),
+                'tempos_https': tempos_ms(r.https),
+                'em_cache': (r.ip, r.porta) in em_cache
             })
         
         return jsonify({
@@ -6,8 +6,9 @@ Interface gráfica com Tkinter
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict
+from typing import List, Optional
 import csv
+from collections import Counter
 from datetime import datetime
 import ipaddress
 import sys
@@ -23,8 +24,21 @@ import requests
 import zipfile
 import shutil
 
+from services.concurrency import criar_controle, workers_fixos
 from services.http_tester import HTTPTester
-from utils.file_reader import validar_ipv4
+from services.port_history import HistoricoPortas
+from services.probe_result import (
+    ResultadoTeste, StatusGeral, campos_tempos, colunas_tempos, formatar_protocolo,
+    formatar_status, formatar_tempos, status_geral
+)
+from services.rate_limiter import LimitadorTaxa
+from services.result_cache import criar_cache, perfil_teste
+from services.scheduler import AgendadorTestes
+from services.timeouts import PoliticaTimeout, TimeoutAdaptativo
+from utils.checkpoint import DiarioVarredura, MarcasConcluidas, ler_diario
+from utils.file_reader import FonteAlvos
+from utils.ip_parser import int_para_ipv4, ipv4_para_int
+from utils.target_set import ConjuntoAlvos, ler_exclusoes
 import config
 
 # Configuração de DPI awareness para melhor nitidez (Windows)
@@ -39,6 +53,13 @@ if sys.platform == 'win32':
         except:
             pass
 
+# Tag da tabela de resultados para cada status
+TAGS_STATUS = {
+    StatusGeral.OK: 'ok',
+    StatusGeral.TIMEOUT: 'timeout',
+    StatusGeral.ERRO: 'error',
+}
+
 
 class AppDesktop:
     """Classe principal da aplicação desktop"""
@@ -55,7 +76,12 @@ class AppDesktop:
         self.ordem_atual = 'ip'  # 'ip', 'status', 'http', 'https'
         self.ordem_reversa = False
         self.ips_para_testar = []  # Lista de IPs sendo testados
-        self.ips_testados = 0  # Contador de IPs testados
+        self.ips_testados = 0  # Contador de testes (IP x porta) concluídos
+        self.agendador = None  # Agendador da execução em andamento
+        self.historico_portas = None  # Carregado na primeira execução
+        # Resultados recentes: repetições dentro da validade não testam de novo
+        self.cache_resultados = criar_cache(config.VALIDADE_CACHE, config.MAX_ENTRADAS_CACHE,
+                                            config.ARQUIVO_CACHE)
         self.tela_atual = 0  # Controle de navegação (0-4)
         self.telas = []  # Lista de frames de telas
         
@@ -342,7 +368,128 @@ class AppDesktop:
             activebackground='white',
             selectcolor='white'
         )
-        ssl_check.grid(row=0, column=4, sticky=tk.W)
+        ssl_check.grid(row=0, column=4, sticky=tk.W, padx=(0, 24))
+        
+        # HTTP e HTTPS ao mesmo tempo (desmarcar para CPEs sensíveis a conexões paralelas)
+        self.protocolos_simultaneos_var = tk.BooleanVar(value=config.PROTOCOLOS_SIMULTANEOS)
+        simultaneo_check = tk.Checkbutton(
+            config_inner,
+            text="HTTP/HTTPS simultâneos",
+            variable=self.protocolos_simultaneos_var,
+            bg='white',
+            font=("Segoe UI", 13),
+            activebackground='white',
+            selectcolor='white'
+        )
+        simultaneo_check.grid(row=0, column=5, sticky=tk.W)
+        
+        # Pré-verificação TCP (descarta portas fechadas/filtradas antes do HTTP/HTTPS)
+        self.pre_verificar_tcp_var = tk.BooleanVar(value=config.PRE_VERIFICACAO_TCP)
+        pre_tcp_check = tk.Checkbutton(
+            config_inner,
+            text="Pré-verificação TCP",
+            variable=self.pre_verificar_tcp_var,
+            bg='white',
+            font=("Segoe UI", 13),
+            activebackground='white',
+            selectcolor='white'
+        )
+        pre_tcp_check.grid(row=1, column=4, sticky=tk.W, pady=(8, 0))
+        
+        # Parar na primeira porta que responder (ordem aprendida com o histórico)
+        self.parar_na_primeira_var = tk.BooleanVar(value=config.PARAR_NA_PRIMEIRA_PORTA)
+        parar_check = tk.Checkbutton(
+            config_inner,
+            text="Parar na primeira porta que responder",
+            variable=self.parar_na_primeira_var,
+            bg='white',
+            font=("Segoe UI", 13),
+            activebackground='white',
+            selectcolor='white'
+        )
+        parar_check.grid(row=1, column=1, sticky=tk.W, pady=(8, 0))
+        
+        # Farejamento: uma conexão por porta detecta HTTP ou HTTPS
+        self.farejar_protocolo_var = tk.BooleanVar(value=config.FAREJAR_PROTOCOLO)
+        farejar_check = tk.Checkbutton(
+            config_inner,
+            text="Detectar protocolo (1 conexão)",
+            variable=self.farejar_protocolo_var,
+            bg='white',
+            font=("Segoe UI", 13),
+            activebackground='white',
+            selectcolor='white'
+        )
+        farejar_check.grid(row=1, column=5, sticky=tk.W, pady=(8, 0))
+        
+        # Timeout adaptativo: o timeout de conexão segue o RTT de cada sub-rede /24
+        self.timeout_adaptativo_var = tk.BooleanVar(value=config.TIMEOUT_ADAPTATIVO)
+        adaptativo_check = tk.Checkbutton(
+            config_inner,
+            text="Timeout adaptativo (RTT)",
+            variable=self.timeout_adaptativo_var,
+            bg='white',
+            font=("Segoe UI", 13),
+            activebackground='white',
+            selectcolor='white'
+        )
+        adaptativo_check.grid(row=1, column=2, columnspan=2, sticky=tk.W, pady=(8, 0))
+        
+        # Inferir HTTPS: sem conexão TCP no HTTP, não testa HTTPS (modo sequencial)
+        self.inferir_https_var = tk.BooleanVar(value=config.INFERIR_HTTPS)
+        inferir_check = tk.Checkbutton(
+            config_inner,
+            text="Inferir HTTPS",
+            variable=self.inferir_https_var,
+            bg='white',
+            font=("Segoe UI", 13),
+            activebackground='white',
+            selectcolor='white'
+        )
+        inferir_check.grid(row=1, column=0, sticky=tk.W, pady=(8, 0))
+        
+        # Timeouts por fase e prazo por IP (vazio = timeout geral / sem prazo)
+        fases_frame = tk.Frame(config_inner, bg='white')
+        fases_frame.grid(row=2, column=0, columnspan=6, sticky=tk.W, pady=(8, 0))
+        self.timeout_conexao_var = tk.StringVar(value=self._texto_segundos(config.TIMEOUT_CONEXAO))
+        self.timeout_tls_var = tk.StringVar(value=self._texto_segundos(config.TIMEOUT_TLS))
+        self.timeout_leitura_var = tk.StringVar(value=self._texto_segundos(config.TIMEOUT_LEITURA))
+        self.prazo_ip_var = tk.StringVar(value=self._texto_segundos(config.PRAZO_POR_IP))
+        campos_fases = [
+            ("Conexão (s):", self.timeout_conexao_var),
+            ("TLS (s):", self.timeout_tls_var),
+            ("Leitura (s):", self.timeout_leitura_var),
+            ("Prazo por IP (s):", self.prazo_ip_var),
+        ]
+        for rotulo, variavel in campos_fases:
+            tk.Label(fases_frame, text=rotulo, bg='white', font=("Segoe UI", 13)).pack(side=tk.LEFT, padx=(0, 8))
+            tk.Entry(fases_frame, textvariable=variavel, width=8, font=("Segoe UI", 13),
+                     relief='solid', bd=1, highlightthickness=0,
+                     highlightbackground=self.cor_borda).pack(side=tk.LEFT, padx=(0, 24))
+        
+        # Retomar: pula os testes registrados no diário da varredura interrompida
+        self.retomar_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            fases_frame,
+            text="Retomar varredura interrompida",
+            variable=self.retomar_var,
+            bg='white',
+            font=("Segoe UI", 13),
+            activebackground='white',
+            selectcolor='white'
+        ).pack(side=tk.LEFT, padx=(0, 24))
+        
+        # Forçar atualização: testa tudo de novo, ignorando o cache de resultados
+        self.forcar_atualizacao_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            fases_frame,
+            text="Forçar atualização",
+            variable=self.forcar_atualizacao_var,
+            bg='white',
+            font=("Segoe UI", 13),
+            activebackground='white',
+            selectcolor='white'
+        ).pack(side=tk.LEFT)
         
         # Frame de entrada de IPs
         input_frame = tk.Frame(main_frame, bg='white', relief='flat', highlightbackground=self.cor_borda, highlightthickness=1)
@@ -1889,7 +2036,10 @@ class AppDesktop:
                 messagebox.showwarning("Aviso", "Preencha todos os campos")
                 return
             
-            if not validar_ipv4(ip):
+            try:
+                # Mesmas regras da lista de alvos, e forma canônica para a checagem de repetidos
+                ip = int_para_ipv4(ipv4_para_int(ip))
+            except ValueError:
                 messagebox.showerror("Erro", "IP inválido")
                 return
             
@@ -2036,7 +2186,10 @@ class AppDesktop:
                 messagebox.showwarning("Aviso", "Preencha todos os campos")
                 return
             
-            if not validar_ipv4(ip):
+            try:
+                # Mesmas regras da lista de alvos, e forma canônica para a checagem de repetidos
+                ip = int_para_ipv4(ipv4_para_int(ip))
+            except ValueError:
                 messagebox.showerror("Erro", "IP inválido")
                 return
             
@@ -2717,7 +2870,7 @@ class AppDesktop:
         table_frame.grid_rowconfigure(0, weight=1)
         
         # Treeview (tabela) com estilo melhorado
-        columns = ('IP', 'Porta', 'HTTP', 'HTTPS', 'Status')
+        columns = ('IP', 'Porta', 'HTTP', 'HTTPS', 'Status', 'Tempos HTTP', 'Tempos HTTPS')
         self.tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=25)
         
         # Configura colunas
@@ -2726,12 +2879,16 @@ class AppDesktop:
         self.tree.heading('HTTP', text='HTTP')
         self.tree.heading('HTTPS', text='HTTPS')
         self.tree.heading('Status', text='Status')
+        self.tree.heading('Tempos HTTP', text='Tempos HTTP (ms)')
+        self.tree.heading('Tempos HTTPS', text='Tempos HTTPS (ms)')
         
         self.tree.column('IP', width=180, anchor=tk.W, minwidth=150)
         self.tree.column('Porta', width=100, anchor=tk.CENTER, minwidth=80)
         self.tree.column('HTTP', width=180, anchor=tk.W, minwidth=150)
         self.tree.column('HTTPS', width=180, anchor=tk.W, minwidth=150)
         self.tree.column('Status', width=120, anchor=tk.CENTER, minwidth=100)
+        self.tree.column('Tempos HTTP', width=260, anchor=tk.W, minwidth=150)
+        self.tree.column('Tempos HTTPS', width=300, anchor=tk.W, minwidth=150)
         
         # Scrollbar
         scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
@@ -2746,28 +2903,10 @@ class AppDesktop:
         self.tree.tag_configure('timeout', background='#fef3c7', foreground='#92400e')
         self.tree.tag_configure('error', background='#fee2e2', foreground='#991b1b')
     
-    def calcular_workers(self, numero_ips: int) -> int:
-        """Calcula número ideal de workers"""
-        workers = max(config.MIN_WORKERS, min(numero_ips // 5, config.MAX_WORKERS))
-        workers = min(workers, numero_ips, config.MAX_WORKERS)
-        return max(workers, 1)
-    
-    def processar_ips(self) -> List[str]:
-        """Processa texto de IPs e retorna lista válida"""
-        texto = self.ips_text.get("1.0", tk.END).strip()
-        if not texto:
-            return []
-        
-        ips_validos = []
-        linhas = texto.split('\n')
-        
-        for linha in linhas:
-            ip = linha.strip()
-            if ip and not ip.startswith('#'):
-                if validar_ipv4(ip):
-                    ips_validos.append(ip)
-        
-        return ips_validos
+    def processar_ips(self) -> ConjuntoAlvos:
+        """Processa texto de IPs (aceita prefixos CIDR e faixas) e retorna os alvos válidos, sem repetições"""
+        exclusoes = ler_exclusoes(config.ARQUIVO_EXCLUSOES) if config.ARQUIVO_EXCLUSOES else []
+        return ConjuntoAlvos.da_fonte(FonteAlvos.do_texto(self.ips_text.get("1.0", tk.END).strip()), exclusoes)
     
     def processar_portas(self) -> List[int]:
         """Processa texto de portas (separadas por vírgula) e retorna lista válida"""
@@ -2797,7 +2936,11 @@ class AppDesktop:
             return
         
         # Obtém IPs
-        ips = self.processar_ips()
+        try:
+            ips = self.processar_ips()
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Erro", f"Lista de exclusão inválida: {str(e)}")
+            return
         
         if not ips:
             messagebox.showwarning("Aviso", "Por favor, insira pelo menos um IP válido.")
@@ -2807,6 +2950,12 @@ class AppDesktop:
         try:
             portas = self.processar_portas()
             timeout = int(self.timeout_var.get())
+            politica = PoliticaTimeout(
+                conexao=self._ler_segundos(self.timeout_conexao_var.get()) or timeout,
+                tls=self._ler_segundos(self.timeout_tls_var.get()) or timeout,
+                leitura=self._ler_segundos(self.timeout_leitura_var.get()) or timeout,
+                prazo_ip=self._ler_segundos(self.prazo_ip_var.get())
+            )
         except ValueError:
             messagebox.showerror("Erro", "Timeout deve ser um número válido.")
             return
@@ -2821,69 +2970,148 @@ class AppDesktop:
         
         # Desabilita botão e inicia progresso
         self.executando = True
-        self.ips_para_testar = ips.copy()
+        self.ips_para_testar = ips
         self.ips_testados = 0
         self.btn_testar.config(state=tk.DISABLED, text="Executando...")
         self.btn_parar.config(state=tk.NORMAL)
         self.progress.start()
         self.progress_status_label.config(text="")
         
-        # Executa em thread separada (por enquanto usa apenas a primeira porta)
-        # TODO: Implementar múltiplas portas completamente
-        porta = portas[0] if portas else 8080
-        thread = threading.Thread(target=self._executar_testes_thread, args=(ips, porta, timeout))
+        # Executa em thread separada (todas as portas em uma única fila de trabalho)
+        thread = threading.Thread(target=self._executar_testes_thread, args=(ips, portas, timeout, politica))
         thread.daemon = True
         thread.start()
     
-    def _executar_testes_thread(self, ips: List[str], porta: int, timeout: int):
+    @staticmethod
+    def _texto_segundos(valor: Optional[float]) -> str:
+        """Valor inicial de um campo de segundos (vazio quando não configurado)"""
+        return '' if valor is None else str(valor)
+    
+    @staticmethod
+    def _ler_segundos(texto: str) -> Optional[float]:
+        """Lê um campo de segundos opcional; vazio retorna None"""
+        texto = texto.strip().replace(',', '.')
+        if not texto:
+            return None
+        valor = float(texto)
+        if valor <= 0:
+            raise ValueError(texto)
+        return valor
+    
+    def _executar_testes_thread(self, ips: ConjuntoAlvos, portas: List[int], timeout: int,
+                                politica: PoliticaTimeout):
         """Executa testes em thread separada"""
         try:
+            # Calcula workers (um teste por IP x porta, concorrência compartilhada)
+            # Testes simultâneos: controle adaptativo ou número fixo de workers
+            numero_testes = len(ips) * len(portas)
+            controle = None
+            if config.CONCORRENCIA_ADAPTATIVA:
+                controle = criar_controle(numero_testes, config.MAX_WORKERS_PADRAO, config.MIN_WORKERS,
+                                          config.MAX_CONCORRENCIA,
+                                          2 if self.protocolos_simultaneos_var.get() else 1)
+                num_workers = controle.maximo
+            else:
+                num_workers = workers_fixos(numero_testes, config.MIN_WORKERS, config.MAX_WORKERS)
+            
             # Inicializa testador
             testador = HTTPTester(
-                porta=porta,
+                porta=portas[0],
                 timeout=timeout,
-                verificar_ssl=self.verificar_ssl_var.get()
+                verificar_ssl=self.verificar_ssl_var.get(),
+                protocolos_simultaneos=self.protocolos_simultaneos_var.get(),
+                max_workers=num_workers,
+                pre_verificar_tcp=self.pre_verificar_tcp_var.get(),
+                farejar_protocolo=self.farejar_protocolo_var.get(),
+                timeout_adaptativo=(TimeoutAdaptativo(config.TIMEOUT_MINIMO, politica.conexao)
+                                    if self.timeout_adaptativo_var.get() else None),
+                politica_timeout=politica,
+                inferir_https=self.inferir_https_var.get(),
+                limitador_taxa=(LimitadorTaxa(config.TAXA_CONEXOES, config.RAJADA_CONEXOES)
+                                if config.TAXA_CONEXOES else None)
             )
             
-            # Calcula workers
-            num_workers = self.calcular_workers(len(ips))
+            # Histórico de portas (ordem do modo "parar na primeira")
+            if self.historico_portas is None:
+                self.historico_portas = HistoricoPortas(config.ARQUIVO_HISTORICO_PORTAS,
+                                                        config.MAX_IPS_HISTORICO_PORTAS)
+                self.historico_portas.inicializar(config.PADROES_RESULTADOS_ANTERIORES,
+                                                  config.PORTA_PADRAO)
             
             # Executa testes
-            resultados = []
+            self.agendador = AgendadorTestes(
+                testador,
+                portas,
+                num_workers,
+                parar_na_primeira=self.parar_na_primeira_var.get(),
+                historico=self.historico_portas,
+                prazo_ip=politica.prazo_ip,
+                max_por_sub_rede=config.MAX_POR_SUB_REDE,
+                prefixo_sub_rede=config.PREFIXO_SUB_REDE,
+                controle=controle
+            )
+            total_testes = self.agendador.total_testes(len(ips)) or 0
             
-            with ThreadPoolExecutor(max_workers=num_workers) as executor:
-                futures = {executor.submit(testador.testar_ip, ip): ip for ip in ips}
-                total_ips = len(ips)
-                
-                for future in as_completed(futures):
-                    if not self.executando:  # Verificar se foi cancelado
-                        break
-                    
-                    ip = futures[future]
-                    try:
-                        resultado = future.result()
-                        # Adiciona porta ao resultado
-                        resultado['porta'] = porta
-                        resultados.append(resultado)
-                        self.ips_testados += 1
-                        
-                        # Atualiza interface
-                        self.root.after(0, lambda r=resultado, i=ip, t=total_ips: self._adicionar_resultado(r, i, t))
-                        
-                    except Exception as e:
-                        if self.executando:  # Só adiciona erro se não foi cancelado
-                            resultado = {
-                                'ip': ip,
-                                'porta': porta,
-                                'http': f'Erro: {str(e)}',
-                                'https': f'Erro: {str(e)}'
-                            }
-                            resultados.append(resultado)
+            # Diário dos testes concluídos: ao retomar, os testes já registrados
+            # voltam para a tabela e não são repetidos
+            marcas = None
+            retomados = []
+            if self.retomar_var.get():
+                marcas = MarcasConcluidas(ips, portas, self.parar_na_primeira_var.get())
+                if os.path.exists(config.ARQUIVO_DIARIO_DESKTOP):
+                    for resultado in ler_diario(config.ARQUIVO_DIARIO_DESKTOP):
+                        if marcas.marcar(resultado):
+                            retomados.append(resultado)
                             self.ips_testados += 1
-                            self.root.after(0, lambda r=resultado, i=ip, t=total_ips: self._adicionar_resultado(r, i, t))
+                            self.root.after(0, lambda r=resultado, t=total_testes: self._adicionar_resultado(
+                                r, f"{r.ip}:{r.porta}", t))
+            diario = DiarioVarredura(config.ARQUIVO_DIARIO_DESKTOP, retomar=marcas is not None)
             
-            # Ordena resultados
-            resultados.sort(key=lambda x: x['ip'])
+            # Resultados ainda válidos no cache, obtidos no mesmo modo de teste,
+            # também vão direto para a tabela. O farejamento não usa o cache
+            cache = None if self.farejar_protocolo_var.get() else self.cache_resultados
+            perfil = perfil_teste(self.verificar_ssl_var.get(), politica, self.pre_verificar_tcp_var.get(),
+                                  self.inferir_https_var.get(), self.timeout_adaptativo_var.get())
+            em_cache = {}
+            if cache is not None and not self.forcar_atualizacao_var.get():
+                for ip in ips:
+                    for porta in portas:
+                        if marcas is not None and marcas.concluido(ip, porta):
+                            continue
+                        resultado = cache.obter(ip, porta, perfil)
+                        if resultado is not None:
+                            em_cache[(ip, porta)] = resultado
+                            self.ips_testados += 1
+                            self.root.after(0, lambda r=resultado, t=total_testes: self._adicionar_resultado(
+                                r, f"{r.ip}:{r.porta}", t))
+            # Parando na primeira porta, um IP que respondeu no cache está concluído
+            respondidos = ({ip for (ip, _), resultado in em_cache.items() if resultado.respondeu}
+                           if self.parar_na_primeira_var.get() else set())
+            
+            def concluido(ip: str, porta: int) -> bool:
+                if (ip, porta) in em_cache or ip in respondidos:
+                    return True
+                return marcas is not None and marcas.concluido(ip, porta)
+            
+            def ao_concluir(resultado: ResultadoTeste):
+                diario.registrar(resultado)
+                if not self.executando:  # Verificar se foi cancelado
+                    return
+                self.ips_testados += 1
+                # Atualiza interface
+                self.root.after(0, lambda r=resultado, t=total_testes: self._adicionar_resultado(
+                    r, f"{r.ip}:{r.porta}", t))
+            
+            with testador, diario:
+                resultados = self.agendador.executar(ips, callback=ao_concluir, concluido=concluido)
+            self.historico_portas.salvar()
+            if cache is not None:
+                cache.guardar(resultados, perfil)
+                cache.persistir()
+            
+            # Ordena resultados (IP numérico), incluindo os retomados do diário e os do cache
+            resultados = retomados + list(em_cache.values()) + resultados
+            resultados.sort(key=lambda x: (ipv4_para_int(x.ip), x.porta))
             self.resultados = resultados
             
             # Atualiza estatísticas
@@ -2896,30 +3124,29 @@ class AppDesktop:
             # Reabilita botão e para progresso
             self.root.after(0, self._finalizar_execucao)
     
-    def _adicionar_resultado(self, resultado: Dict, ip_atual: str = None, total: int = 0):
+    def _adicionar_resultado(self, resultado: ResultadoTeste, ip_atual: str = None, total: int = 0):
         """Adiciona um resultado à tabela"""
-        ip = resultado['ip']
-        porta = resultado.get('porta', 'N/A')
-        http = resultado.get('http', 'N/A')
-        https = resultado.get('https', 'N/A')
-        
         # Determina status e tag
-        status = 'OK'
-        tag = 'ok'
-        
-        if 'Timeout' in http and 'Timeout' in https:
-            status = 'Timeout'
-            tag = 'timeout'
-        elif 'OK' not in http and 'OK' not in https:
-            status = 'Error'
-            tag = 'error'
-        
-        # Insere na tabela (IP, Porta, HTTP, HTTPS, Status)
-        self.tree.insert('', tk.END, values=(ip, porta, http, https, status), tags=(tag,))
+        status = status_geral(resultado)
+        tag = TAGS_STATUS[status]
+        
+        # Insere na tabela (IP, Porta, HTTP, HTTPS, Status, tempos de cada protocolo)
+        self.tree.insert('', tk.END, values=(
+            resultado.ip,
+            resultado.porta,
+            formatar_protocolo(resultado.http),
+            formatar_protocolo(resultado.https),
+            formatar_status(status),
+            formatar_tempos(resultado.http),
+            formatar_tempos(resultado.https)
+        ), tags=(tag,))
         
         # Atualiza label de progresso
         if ip_atual and total > 0:
             self.progress_status_label.config(text=f"Testando: {ip_atual} ({self.ips_testados}/{total})")
+        elif ip_atual:
+            # Modo "parar na primeira porta": o total de testes não é conhecido
+            self.progress_status_label.config(text=f"Testando: {ip_atual} ({self.ips_testados})")
     
     def _atualizar_estatisticas(self):
         """Atualiza as estatísticas exibidas"""
@@ -2931,8 +3158,9 @@ class AppDesktop:
             return
         
         total = len(self.resultados)
-        ok = sum(1 for r in self.resultados if 'OK' in str(r.get('http', '')) or 'OK' in str(r.get('https', '')))
-        timeout = sum(1 for r in self.resultados if 'Timeout' in str(r.get('http', '')) and 'Timeout' in str(r.get('https', '')))
+        contagem = Counter(status_geral(r) for r in self.resultados)
+        ok = contagem[StatusGeral.OK]
+        timeout = contagem[StatusGeral.TIMEOUT]
         error = total - ok - timeout
         
         # Cria labels de estatísticas com estilo melhorado
@@ -2975,25 +3203,17 @@ class AppDesktop:
         if criterio == 'ip':
             def ip_key(r):
                 try:
-                    return ipaddress.IPv4Address(r['ip'])
+                    return ipaddress.IPv4Address(r.ip)
                 except:
                     return ipaddress.IPv4Address('0.0.0.0')
             self.resultados.sort(key=ip_key, reverse=self.ordem_reversa)
         elif criterio == 'status':
-            def status_key(r):
-                http = r.get('http', '')
-                https = r.get('https', '')
-                if 'OK' in http or 'OK' in https:
-                    return 0  # OK primeiro
-                elif 'Timeout' in http and 'Timeout' in https:
-                    return 1  # Timeout segundo
-                else:
-                    return 2  # Error último
-            self.resultados.sort(key=status_key, reverse=self.ordem_reversa)
+            # OK primeiro, Timeout segundo, Error último
+            self.resultados.sort(key=status_geral, reverse=self.ordem_reversa)
         elif criterio == 'http':
-            self.resultados.sort(key=lambda x: x.get('http', ''), reverse=self.ordem_reversa)
+            self.resultados.sort(key=lambda x: x.http[:2], reverse=self.ordem_reversa)
         elif criterio == 'https':
-            self.resultados.sort(key=lambda x: x.get('https', ''), reverse=self.ordem_reversa)
+            self.resultados.sort(key=lambda x: x.https[:2], reverse=self.ordem_reversa)
         
         # Atualiza tabela
         self.tree.delete(*self.tree.get_children())
@@ -3006,12 +3226,7 @@ class AppDesktop:
             messagebox.showwarning("Aviso", "Nenhum resultado disponível.")
             return
         
-        ips_ok = []
-        for r in self.resultados:
-            http = r.get('http', '')
-            https = r.get('https', '')
-            if 'OK' in http or 'OK' in https:
-                ips_ok.append(r['ip'])
+        ips_ok = [r.ip for r in self.resultados if r.respondeu]
         
         if not ips_ok:
             messagebox.showinfo("Info", "Nenhum IP com status OK encontrado.")
@@ -3028,12 +3243,7 @@ class AppDesktop:
             messagebox.showwarning("Aviso", "Nenhum resultado disponível.")
             return
         
-        ips_erro = []
-        for r in self.resultados:
-            http = r.get('http', '')
-            https = r.get('https', '')
-            if 'OK' not in http and 'OK' not in https:
-                ips_erro.append(r['ip'])
+        ips_erro = [r.ip for r in self.resultados if not r.respondeu]
         
         if not ips_erro:
             messagebox.showinfo("Info", "Nenhum IP com erro encontrado.")
@@ -3056,10 +3266,12 @@ class AppDesktop:
         """Para os testes em andamento"""
         if self.executando:
             self.executando = False
+            if self.agendador:
+                self.agendador.cancelar()
             self.btn_testar.config(state=tk.NORMAL, text="▶ Executar Testes")
             self.btn_parar.config(state=tk.DISABLED)
             self.progress.stop()
-            self.progress_status_label.config(text=f"Interrompido - {self.ips_testados} IP(s) testado(s)")
+            self.progress_status_label.config(text=f"Interrompido - {self.ips_testados} teste(s) concluído(s)")
             # Atualiza estatísticas com os resultados já obtidos
             self._atualizar_estatisticas()
     
@@ -3091,28 +3303,22 @@ class AppDesktop:
         
         try:
             with open(filename, 'w', newline='', encoding='utf-8') as arquivo:
-                campos = ['IP', 'HTTP', 'HTTPS', 'Status']
+                campos = ['IP', 'Porta', 'HTTP', 'HTTPS', 'Status'] + campos_tempos('HTTP') + campos_tempos('HTTPS')
                 escritor = csv.DictWriter(arquivo, fieldnames=campos)
                 
                 escritor.writeheader()
                 
                 for resultado in self.resultados:
-                    http = resultado.get('http', 'N/A')
-                    https = resultado.get('https', 'N/A')
-                    
-                    # Determina status
-                    status = 'OK'
-                    if 'Timeout' in http and 'Timeout' in https:
-                        status = 'Timeout'
-                    elif 'OK' not in http and 'OK' not in https:
-                        status = 'Error'
-                    
-                    escritor.writerow({
-                        'IP': resultado['ip'],
-                        'HTTP': http,
-                        'HTTPS': https,
-                        'Status': status
-                    })
+                    linha = {
+                        'IP': resultado.ip,
+                        'Porta': resultado.porta,
+                        'HTTP': formatar_protocolo(resultado.http),
+                        'HTTPS': formatar_protocolo(resultado.https),
+                        'Status': formatar_status(status_geral(resultado))
+                    }
+                    linha.update(colunas_tempos('HTTP', resultado.http))
+                    linha.update(colunas_tempos('HTTPS', resultado.https))
+                    escritor.writerow(linha)
             
             messagebox.showinfo("Sucesso", f"Resultados exportados para:\n{filename}")
             
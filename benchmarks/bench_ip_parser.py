@@ -0,0 +1,130 @@
+"""
+Micro-benchmark da leitura de IPs: validação linha a linha (implementação
+original de validar_ipv4) x conversão em lote (utils.ip_parser)
+
+Uso:
+    python benchmarks/bench_ip_parser.py [--linhas 5000000] [--arquivo ips_grande.txt]
+
+Sem --arquivo, gera um arquivo temporário com IPs aleatórios (1% inválidos).
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.file_reader import TAMANHO_BLOCO_LEITURA, validar_ipv4  # noqa: E402
+from utils.ip_parser import converter_linhas, numpy_disponivel  # noqa: E402
+
+
+def validar_ipv4_original(ip: str) -> bool:
+    """validar_ipv4 como era antes da conversão em lote (regex não compilada)"""
+    padrao_ipv4 = r'^(\d{1,3}\.){3}\d{1,3}$'
+    
+    if not re.match(padrao_ipv4, ip):
+        return False
+    
+    partes = ip.split('.')
+    for parte in partes:
+        try:
+            numero = int(parte)
+            if numero < 0 or numero > 255:
+                return False
+        except ValueError:
+            return False
+    
+    return True
+
+
+def gerar_arquivo(caminho: str, linhas: int):
+    """Gera um arquivo de IPs aleatórios, com 1% de linhas inválidas"""
+    aleatorio = random.Random(42)
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        for _ in range(linhas):
+            if aleatorio.random() < 0.01:
+                arquivo.write(f"{aleatorio.randint(256, 999)}.0.0.1\n")
+            else:
+                numero = aleatorio.getrandbits(32)
+                arquivo.write(f"{numero >> 24}.{(numero >> 16) & 255}.{(numero >> 8) & 255}.{numero & 255}\n")
+
+
+def ler_linha_a_linha(caminho: str, validar) -> int:
+    """Leitura como em ler_ips_do_arquivo original: strip + validação + lista de str"""
+    ips_validos = []
+    with open(caminho, 'r', encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            ip = linha.strip()
+            if not ip or ip.startswith('#'):
+                continue
+            if validar(ip):
+                ips_validos.append(ip)
+    return len(ips_validos)
+
+
+def ler_em_lote(caminho: str, usar_numpy: bool) -> int:
+    """Conversão em lote, bloco a bloco, para inteiros"""
+    total = 0
+    with open(caminho, 'rb') as arquivo:
+        resto = b''
+        while True:
+            bloco = arquivo.read(TAMANHO_BLOCO_LEITURA)
+            if not bloco:
+                break
+            bloco = resto + bloco
+            corte = bloco.rfind(b'\n') + 1
+            total += len(converter_linhas(bloco[:corte], usar_numpy=usar_numpy).enderecos)
+            resto = bloco[corte:]
+        if resto:
+            total += len(converter_linhas(resto, usar_numpy=usar_numpy).enderecos)
+    return total
+
+
+def medir(descricao: str, funcao, *argumentos):
+    inicio = time.perf_counter()
+    validos = funcao(*argumentos)
+    duracao = time.perf_counter() - inicio
+    print(f"{descricao:<45} {duracao:8.2f} s   {validos} IPs validos")
+    return duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark da leitura de IPs")
+    parser.add_argument('--linhas', type=int, default=5_000_000, help="Linhas do arquivo gerado")
+    parser.add_argument('--arquivo', help="Arquivo de IPs existente (não gera um novo)")
+    argumentos = parser.parse_args()
+    
+    caminho = argumentos.arquivo
+    temporario = None
+    if caminho is None:
+        temporario = tempfile.NamedTemporaryFile(suffix='.txt', delete=False)
+        temporario.close()
+        caminho = temporario.name
+        print(f"Gerando {argumentos.linhas} linhas em {caminho}...")
+        gerar_arquivo(caminho, argumentos.linhas)
+    
+    try:
+        base = medir("validar_ipv4 original (linha a linha)", ler_linha_a_linha, caminho, validar_ipv4_original)
+        medicoes = [
+            ("validar_ipv4 atual (regex compilada)", ler_linha_a_linha, caminho, validar_ipv4),
+            ("converter_linhas (Python)", ler_em_lote, caminho, False),
+        ]
+        if numpy_disponivel():
+            medicoes.append(("converter_linhas (NumPy)", ler_em_lote, caminho, True))
+        else:
+            print("NumPy não instalado: conversão vetorizada não medida")
+        
+        for descricao, funcao, *parametros in medicoes:
+            duracao = medir(descricao, funcao, *parametros)
+            print(f"{'':<45} {base / duracao:7.1f}x mais rápido")
+    finally:
+        if temporario is not None:
+            os.remove(caminho)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,90 @@ Configurações do sistema de teste de conectividade HTTP/HTTPS
 # Configurações de conexão
 PORTA_PADRAO = 2265
 TIMEOUT_PADRAO = 3  # segundos
+# Timeouts por fase; None = TIMEOUT_PADRAO
+TIMEOUT_CONEXAO = None  # conexão TCP
+TIMEOUT_TLS = None  # handshake TLS
+TIMEOUT_LEITURA = None  # espera pela resposta HTTP
+# Tempo máximo de sondagem por IP, somando todas as portas (None = sem prazo)
+PRAZO_POR_IP = None  # segundos
+# Timeout adaptativo: o timeout de conexão de cada IP segue o RTT observado na
+# sua sub-rede /24 (como o RTO do TCP), entre TIMEOUT_MINIMO e o timeout configurado
+TIMEOUT_ADAPTATIVO = False
+TIMEOUT_MINIMO = 0.5  # segundos
 # Portas padrão para teste (HTTP e HTTPS em cada porta)
 PORTAS_PADRAO = [2265, 8080, 8888, 8443, 443, 80, 8530]
 
 # Configurações de paralelismo
-MAX_WORKERS_PADRAO = 20
+MAX_WORKERS_PADRAO = 20  # testes simultâneos no início (concorrência adaptativa)
 MIN_WORKERS = 10
 MAX_WORKERS = 50
+# Concorrência adaptativa (AIMD): os testes simultâneos crescem enquanto a
+# vazão sobe e recuam com erros locais (EMFILE, EADDRNOTAVAIL) ou latência
+# inflada, até MAX_CONCORRENCIA e ao limite de descritores do processo
+# (RLIMIT_NOFILE, elevado se permitido). False = número fixo de workers,
+# entre MIN_WORKERS e MAX_WORKERS
+CONCORRENCIA_ADAPTATIVA = True
+MAX_CONCORRENCIA = 500
+# Processos que dividem a varredura (--processos), cada um com o seu motor de
+# testes e sub-redes inteiras; os limites acima valem por processo.
+# 1 = varredura no próprio processo
+PROCESSOS_VARREDURA = 1
+
+# Ritmo da varredura (proteção de NAT/anti-flood dos concentradores)
+TAXA_CONEXOES = None  # conexões TCP por segundo, somando todos os workers (None = sem limite)
+RAJADA_CONEXOES = None  # conexões liberadas de uma vez após ociosidade (None = 1 segundo de taxa)
+MAX_POR_SUB_REDE = None  # testes simultâneos por sub-rede (None = sem limite)
+PREFIXO_SUB_REDE = 24  # tamanho do prefixo das sub-redes (limite e intercalação dos IPs)
+
+# Motor de testes: "threads" (requests) ou "asyncio" (AsyncHTTPTester)
+MOTOR_PADRAO = "threads"
+MAX_CONEXOES_ASYNC = 1000  # conexões simultâneas no motor asyncio
+
+# Testa HTTP e HTTPS de um mesmo IP ao mesmo tempo (False = um socket por vez)
+PROTOCOLOS_SIMULTANEOS = True
+
+# Conexão TCP simples antes dos testes HTTP/HTTPS (portas fechadas/filtradas
+# são resolvidas sem abrir as duas conexões HTTP e HTTPS)
+PRE_VERIFICACAO_TCP = False
+
+# Detecta HTTP/HTTPS com uma única conexão por porta (ClientHello TLS)
+FAREJAR_PROTOCOLO = False
+
+# No modo sequencial, não testa HTTPS quando a conexão TCP do HTTP não se
+# completou (timeout de conexão, host/rede inalcançável); o resultado HTTPS
+# é copiado do HTTP e marcado como "(inferido)"
+INFERIR_HTTPS = False
 
 # Arquivos
 ARQUIVO_IPS = "ips.txt"
+# IPs, prefixos CIDR ou faixas que nunca são testados (None = sem exclusões)
+ARQUIVO_EXCLUSOES = None
+# Processos que convertem fatias do arquivo de IPs em paralelo (listas de
+# vários GB); 1 = conversão no próprio processo
+PROCESSOS_LEITURA = 1
 ARQUIVO_RESULTADOS = "results.csv"
+# Cache de resultados da interface web e do desktop: repetições dentro da
+# validade usam os resultados guardados e só testam os alvos vencidos
+VALIDADE_CACHE = 300  # segundos (0 = sem cache)
+MAX_ENTRADAS_CACHE = 100000  # sondagens guardadas; as menos usadas saem primeiro
+ARQUIVO_CACHE = None  # SQLite que mantém o cache entre execuções (None = só memória)
+# Diário dos testes concluídos, para retomar uma varredura interrompida
+# (--retomar); None = "<arquivo de resultados>.diario"
+ARQUIVO_DIARIO = None
+# Diário da interface desktop (opção "Retomar varredura interrompida")
+ARQUIVO_DIARIO_DESKTOP = "desktop.diario"
+# Formato dos resultados: "csv", "jsonl" ou None (pela extensão do arquivo)
+FORMATO_RESULTADOS = None
+# Ordena o arquivo de resultados por IP e porta ao final (ordenação externa,
+# em disco); False mantém a ordem de conclusão
+ORDENAR_RESULTADOS = True
+
+# Parar na primeira porta que responder em cada IP; a ordem das portas vem do
+# histórico local ou, na primeira execução, dos CSVs de resultados anteriores
+PARAR_NA_PRIMEIRA_PORTA = False
+ARQUIVO_HISTORICO_PORTAS = "historico_portas.json"
+MAX_IPS_HISTORICO_PORTAS = 200000  # IPs com a última porta que respondeu
+PADROES_RESULTADOS_ANTERIORES = ["resultados_*.csv", ARQUIVO_RESULTADOS]
 
 # Configurações SSL
 VERIFICAR_SSL = False  # Desabilitado para CPEs sem certificado válido
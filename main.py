@@ -2,16 +2,29 @@
 Sistema de Teste de Conectividade HTTP/HTTPS para Clientes IPv4
 """
 
-import csv
+import argparse
 import logging
+import multiprocessing
+import os
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import Counter
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, Iterable, List, Optional, Tuple
 
 import config
+from services.async_http_tester import AsyncHTTPTester
+from services.concurrency import ControleConcorrencia, criar_controle, workers_fixos
 from services.http_tester import HTTPTester
-from utils.file_reader import ler_ips_do_arquivo
+from services.port_history import HistoricoPortas
+from services.probe_result import Desfecho, ResultadoTeste, formatar_protocolo
+from services.rate_limiter import LimitadorTaxa
+from services.scheduler import AgendadorTestes
+from services.sharding import executar_em_processos
+from services.timeouts import PoliticaTimeout, TimeoutAdaptativo
+from utils.checkpoint import DiarioVarredura, MarcasConcluidas, ler_diario
+from utils.result_diff import AUSENTE, comparar_resultados, resultados_ordenados
+from utils.result_writer import FORMATOS, EscritorResultados, ler_resultados, ordenar_arquivo
+from utils.target_set import ConjuntoAlvos, carregar_alvos, ler_exclusoes
 
 
 def configurar_logging():
@@ -25,99 +38,321 @@ def configurar_logging():
     )
 
 
-def calcular_workers(numero_ips: int) -> int:
+def ler_portas(texto: str) -> List[int]:
     """
-    Calcula o número ideal de workers baseado no número de IPs.
+    Converte uma lista de portas separadas por vírgula (ex.: "80,443,8080").
     
     Args:
-        numero_ips: Quantidade de IPs a serem testados
+        texto: Portas separadas por vírgula
         
     Returns:
-        Número de workers a serem utilizados
+        Lista de portas válidas, sem duplicatas e na ordem informada
     """
-    # Usa uma heurística: 1 worker para cada 5 IPs, com limites
-    workers = max(config.MIN_WORKERS, min(numero_ips // 5, config.MAX_WORKERS))
-    
-    # Se houver poucos IPs, usa no máximo o número de IPs
-    workers = min(workers, numero_ips, config.MAX_WORKERS)
-    
-    return max(workers, 1)  # Garante pelo menos 1 worker
+    portas = []
+    for parte in texto.split(','):
+        parte = parte.strip()
+        if not parte:
+            continue
+        porta = int(parte)
+        if not 1 <= porta <= 65535:
+            raise argparse.ArgumentTypeError(f"Porta inválida: {porta}")
+        if porta not in portas:
+            portas.append(porta)
+    if not portas:
+        raise argparse.ArgumentTypeError("Informe pelo menos uma porta")
+    return portas
+
+
+def parse_argumentos() -> argparse.Namespace:
+    """Lê os argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(
+        description="Teste de conectividade HTTP/HTTPS para clientes IPv4"
+    )
+    parser.add_argument(
+        '--portas',
+        type=ler_portas,
+        default=list(config.PORTAS_PADRAO),
+        help="Portas testadas em cada IP, separadas por vírgula "
+             f"(padrão: {','.join(map(str, config.PORTAS_PADRAO))})"
+    )
+    parser.add_argument(
+        '--motor',
+        choices=['threads', 'asyncio'],
+        default=config.MOTOR_PADRAO,
+        help="Motor de testes: 'threads' (requests + ThreadPoolExecutor) "
+             "ou 'asyncio' (milhares de conexões simultâneas)"
+    )
+    parser.add_argument(
+        '--sequencial',
+        action='store_true',
+        default=not config.PROTOCOLOS_SIMULTANEOS,
+        help="Testa HTTP e depois HTTPS (um socket por vez em cada CPE)"
+    )
+    parser.add_argument(
+        '--inferir-https',
+        action='store_true',
+        default=config.INFERIR_HTTPS,
+        help="Com --sequencial, não testa HTTPS quando a conexão TCP do HTTP não "
+             "se completou; o resultado é copiado e marcado como inferido"
+    )
+    parser.add_argument(
+        '--pre-verificar-tcp',
+        action='store_true',
+        default=config.PRE_VERIFICACAO_TCP,
+        help="Faz uma conexão TCP antes dos testes HTTP/HTTPS e descarta "
+             "portas fechadas ou filtradas (só com --motor threads)"
+    )
+    parser.add_argument(
+        '--farejar',
+        action='store_true',
+        default=config.FAREJAR_PROTOCOLO,
+        help="Detecta HTTP ou HTTPS com uma única conexão por porta (ClientHello TLS); "
+             "em portas HTTP o código é o da resposta ao ClientHello (só com --motor threads)"
+    )
+    parser.add_argument(
+        '--timeout-adaptativo',
+        action='store_true',
+        default=config.TIMEOUT_ADAPTATIVO,
+        help="Ajusta o timeout de conexão de cada IP pelo RTT observado na sua "
+             f"sub-rede /24 (entre {config.TIMEOUT_MINIMO}s e o timeout de conexão)"
+    )
+    parser.add_argument(
+        '--timeout-conexao',
+        type=float,
+        default=config.TIMEOUT_CONEXAO,
+        help=f"Timeout da conexão TCP em segundos (padrão: {config.TIMEOUT_PADRAO})"
+    )
+    parser.add_argument(
+        '--timeout-tls',
+        type=float,
+        default=config.TIMEOUT_TLS,
+        help=f"Timeout do handshake TLS em segundos (padrão: {config.TIMEOUT_PADRAO})"
+    )
+    parser.add_argument(
+        '--timeout-leitura',
+        type=float,
+        default=config.TIMEOUT_LEITURA,
+        help=f"Timeout da resposta HTTP em segundos (padrão: {config.TIMEOUT_PADRAO})"
+    )
+    parser.add_argument(
+        '--prazo-ip',
+        type=float,
+        default=config.PRAZO_POR_IP,
+        help="Tempo máximo de sondagem por IP, somando todas as portas; o que "
+             "não couber é marcado como 'Prazo esgotado' (padrão: sem prazo)"
+    )
+    parser.add_argument(
+        '--taxa',
+        type=float,
+        default=config.TAXA_CONEXOES,
+        help="Máximo de conexões TCP por segundo, somando todos os workers "
+             "(padrão: sem limite)"
+    )
+    parser.add_argument(
+        '--max-por-sub-rede',
+        type=int,
+        default=config.MAX_POR_SUB_REDE,
+        help="Máximo de testes simultâneos em uma mesma sub-rede (padrão: sem limite)"
+    )
+    parser.add_argument(
+        '--prefixo-sub-rede',
+        type=int,
+        choices=range(8, 33),
+        metavar='8-32',
+        default=config.PREFIXO_SUB_REDE,
+        help=f"Prefixo que agrupa IPs na mesma sub-rede (padrão: /{config.PREFIXO_SUB_REDE})"
+    )
+    parser.add_argument(
+        '--excluir',
+        metavar='ARQUIVO',
+        default=config.ARQUIVO_EXCLUSOES,
+        help="Arquivo com IPs, prefixos CIDR ou faixas que nunca devem ser "
+             "testados (redes de gerência, listas de não varrer)"
+    )
+    parser.add_argument(
+        '--saida',
+        metavar='ARQUIVO',
+        default=config.ARQUIVO_RESULTADOS,
+        help="Arquivo de resultados, gravado à medida que os testes terminam "
+             f"(padrão: {config.ARQUIVO_RESULTADOS})"
+    )
+    parser.add_argument(
+        '--formato',
+        choices=FORMATOS,
+        default=config.FORMATO_RESULTADOS,
+        help="Formato do arquivo de resultados: CSV ou JSON Lines "
+             "(padrão: pela extensão do arquivo)"
+    )
+    parser.add_argument(
+        '--nao-ordenar',
+        dest='ordenar',
+        action='store_false',
+        default=config.ORDENAR_RESULTADOS,
+        help="Mantém os resultados na ordem de conclusão, sem a ordenação final "
+             "por IP e porta"
+    )
+    parser.add_argument(
+        '--concorrencia-fixa',
+        dest='concorrencia_adaptativa',
+        action='store_false',
+        default=config.CONCORRENCIA_ADAPTATIVA,
+        help="Usa um número fixo de workers (entre MIN_WORKERS e MAX_WORKERS) em vez "
+             "de ajustar os testes simultâneos pela vazão e pelos erros locais"
+    )
+    parser.add_argument(
+        '--retomar',
+        action='store_true',
+        help="Retoma uma varredura interrompida: os testes registrados no diário "
+             "(<arquivo de resultados>.diario) vão para os resultados e não são repetidos"
+    )
+    parser.add_argument(
+        '--comparar',
+        nargs='?',
+        const='',
+        metavar='ANTERIOR',
+        help="Exibe só os alvos que mudaram de estado (ex.: OK -> Timeout) desde uma "
+             "varredura anterior (CSV, JSON Lines ou diário) e o resumo das transições; "
+             "sem arquivo, compara com os resultados da execução anterior "
+             "(<arquivo de resultados>.anterior)"
+    )
+    parser.add_argument(
+        '--incluir-ausentes',
+        action='store_true',
+        help="Com --comparar, lista também os alvos testados em uma só das varreduras "
+             "(por padrão eles só são contados no resumo)"
+    )
+    parser.add_argument(
+        '--processos',
+        type=int,
+        default=config.PROCESSOS_VARREDURA,
+        help="Divide os alvos entre N processos, cada um com o seu próprio motor de "
+             "testes (sub-redes inteiras por processo; --taxa é repartida entre eles)"
+    )
+    parser.add_argument(
+        '--parar-na-primeira',
+        action='store_true',
+        default=config.PARAR_NA_PRIMEIRA_PORTA,
+        help="Testa as portas de cada IP em sequência, na ordem aprendida com o "
+             "histórico, e para na primeira que responder (só com --motor threads)"
+    )
+    argumentos = parser.parse_args()
+    if argumentos.processos < 1:
+        parser.error("--processos deve ser pelo menos 1")
+    if argumentos.motor == 'asyncio':
+        # Modos implementados só no HTTPTester e no AgendadorTestes
+        so_threads = [opcao for opcao, ativa in (('--pre-verificar-tcp', argumentos.pre_verificar_tcp),
+                                                 ('--farejar', argumentos.farejar),
+                                                 ('--parar-na-primeira', argumentos.parar_na_primeira))
+                      if ativa]
+        if so_threads:
+            parser.error(f"{', '.join(so_threads)}: disponível só com --motor threads")
+    return argumentos
+
 
+def criar_controle_concorrencia(numero_testes: int, argumentos: argparse.Namespace,
+                                maximo: int) -> Optional[ControleConcorrencia]:
+    """Cria o controle adaptativo de testes simultâneos, se habilitado"""
+    if not argumentos.concorrencia_adaptativa:
+        return None
+    sockets_por_teste = 1 if argumentos.sequencial else 2
+    return criar_controle(numero_testes, config.MAX_WORKERS_PADRAO, config.MIN_WORKERS,
+                          maximo, sockets_por_teste)
 
-def gerar_relatorio_csv(resultados: List[Dict], caminho_arquivo: str):
+
+def dimensionar_threads(numero_testes: int,
+                        argumentos: argparse.Namespace) -> Tuple[int, Optional[ControleConcorrencia]]:
     """
-    Gera relatório CSV com os resultados dos testes.
+    Define os testes simultâneos do motor threads.
     
-    Args:
-        resultados: Lista de dicionários com resultados
-        caminho_arquivo: Caminho para salvar o arquivo CSV
+    Returns:
+        Tupla (número de workers, controle adaptativo ou None se a concorrência é fixa)
     """
-    try:
-        with open(caminho_arquivo, 'w', newline='', encoding='utf-8') as arquivo:
-            campos = ['IP', 'HTTP', 'HTTPS']
-            escritor = csv.DictWriter(arquivo, fieldnames=campos)
-            
-            escritor.writeheader()
-            
-            for resultado in resultados:
-                escritor.writerow({
-                    'IP': resultado['ip'],
-                    'HTTP': resultado['http'],
-                    'HTTPS': resultado['https']
-                })
-        
-        logging.info(f"Relatório CSV salvo em: {caminho_arquivo}")
-        
-    except Exception as e:
-        logging.error(f"Erro ao gerar relatório CSV: {str(e)}")
+    controle = criar_controle_concorrencia(numero_testes, argumentos, config.MAX_CONCORRENCIA)
+    if controle is not None:
+        return controle.maximo, controle
+    return workers_fixos(numero_testes, config.MIN_WORKERS, config.MAX_WORKERS), None
+
+
+def criar_politica_timeout(argumentos: argparse.Namespace) -> PoliticaTimeout:
+    """Monta os timeouts por fase; fases não informadas usam TIMEOUT_PADRAO"""
+    def valor(timeout: Optional[float]) -> float:
+        return config.TIMEOUT_PADRAO if timeout is None else timeout
+    
+    return PoliticaTimeout(
+        conexao=valor(argumentos.timeout_conexao),
+        tls=valor(argumentos.timeout_tls),
+        leitura=valor(argumentos.timeout_leitura),
+        prazo_ip=argumentos.prazo_ip
+    )
+
+
+def criar_limitador_taxa(argumentos: argparse.Namespace) -> Optional[LimitadorTaxa]:
+    """Cria o limite global de conexões por segundo, se configurado"""
+    if not argumentos.taxa:
+        return None
+    return LimitadorTaxa(argumentos.taxa, config.RAJADA_CONEXOES)
+
 
+def criar_timeout_adaptativo(argumentos: argparse.Namespace,
+                             politica: PoliticaTimeout) -> Optional[TimeoutAdaptativo]:
+    """Cria o estimador de timeout por sub-rede, se habilitado"""
+    if not argumentos.timeout_adaptativo:
+        return None
+    return TimeoutAdaptativo(config.TIMEOUT_MINIMO, politica.conexao)
 
-def exibir_resultados_console(resultados: List[Dict]):
+
+def exibir_resultados_console(resultados: Iterable[ResultadoTeste]):
     """
     Exibe resultados no console de forma formatada.
     
     Args:
-        resultados: Lista de dicionários com resultados
+        resultados: ResultadoTeste em uma lista ou lidos do arquivo de resultados
     """
     print("\n" + "="*70)
     print("RESULTADOS DOS TESTES DE CONECTIVIDADE")
     print("="*70)
-    print(f"{'IP':<20} {'HTTP':<25} {'HTTPS':<25}")
+    print(f"{'IP':<18} {'Porta':<7} {'HTTP':<22} {'HTTPS':<22}")
     print("-"*70)
     
     for resultado in resultados:
-        ip = resultado['ip']
-        http = resultado['http'] or 'N/A'
-        https = resultado['https'] or 'N/A'
-        print(f"{ip:<20} {http:<25} {https:<25}")
+        http = formatar_protocolo(resultado.http)
+        https = formatar_protocolo(resultado.https)
+        print(f"{resultado.ip:<18} {resultado.porta:<7} {http:<22} {https:<22}")
     
     print("="*70)
 
 
-def exibir_estatisticas(resultados: List[Dict]):
+def exibir_estatisticas(resultados: Iterable[ResultadoTeste]):
     """
     Exibe estatísticas dos testes realizados.
     
     Args:
-        resultados: Lista de dicionários com resultados
+        resultados: ResultadoTeste em uma lista ou lidos do arquivo de resultados
     """
-    total = len(resultados)
+    # Conta os desfechos de cada protocolo em uma única passada
+    total = 0
+    contagem_http = Counter()
+    contagem_https = Counter()
+    for resultado in resultados:
+        total += 1
+        contagem_http[resultado.http.desfecho] += 1
+        contagem_https[resultado.https.desfecho] += 1
+    if not total:
+        return
     
-    # Conta resultados HTTP
-    http_ok = sum(1 for r in resultados if r['http'] and 'OK' in r['http'])
-    http_timeout = sum(1 for r in resultados if r['http'] == 'Timeout')
-    http_recusado = sum(1 for r in resultados if r['http'] == 'Conexão recusada')
+    http_ok = contagem_http[Desfecho.OK]
+    http_timeout = contagem_http[Desfecho.TIMEOUT]
+    http_recusado = contagem_http[Desfecho.RECUSADA]
     
-    # Conta resultados HTTPS
-    https_ok = sum(1 for r in resultados if r['https'] and 'OK' in r['https'])
-    https_timeout = sum(1 for r in resultados if r['https'] == 'Timeout')
-    https_recusado = sum(1 for r in resultados if r['https'] == 'Conexão recusada')
-    https_ssl_erro = sum(1 for r in resultados if r['https'] == 'Erro SSL')
+    https_ok = contagem_https[Desfecho.OK]
+    https_timeout = contagem_https[Desfecho.TIMEOUT]
+    https_recusado = contagem_https[Desfecho.RECUSADA]
+    https_ssl_erro = contagem_https[Desfecho.ERRO_SSL]
     
     print("\n" + "="*70)
     print("ESTATÍSTICAS")
     print("="*70)
-    print(f"Total de IPs testados: {total}")
+    print(f"Total de testes (IP x porta): {total}")
     print(f"\nHTTP:")
     print(f"  [OK] OK: {http_ok} ({http_ok*100/total:.1f}%)")
     print(f"  [TIMEOUT] Timeout: {http_timeout} ({http_timeout*100/total:.1f}%)")
@@ -130,23 +365,257 @@ def exibir_estatisticas(resultados: List[Dict]):
     print("="*70)
 
 
+def exibir_mudancas(caminho_anterior: str, caminho_atual: str, incluir_ausentes: bool = False):
+    """
+    Exibe os alvos que mudaram de estado entre duas varreduras e o resumo das transições.
+    
+    Os arquivos são percorridos juntos, em ordem de IP e porta (os que não
+    estão ordenados são ordenados em disco antes): a memória não depende do
+    número de resultados.
+    
+    Args:
+        caminho_anterior: Resultados da varredura anterior (CSV, JSON Lines ou
+            diário); CSVs sem a coluna Porta valem para config.PORTA_PADRAO
+        caminho_atual: Resultados da varredura atual
+        incluir_ausentes: Também lista os alvos testados em uma só das
+            varreduras; por padrão eles só aparecem no resumo
+    """
+    contagem = Counter()
+    print("\n" + "="*70)
+    print(f"MUDANÇAS DESDE {caminho_anterior}")
+    print("="*70)
+    print(f"{'IP':<18} {'Porta':<7} {'Antes':<22} {'Agora':<22}")
+    print("-"*70)
+    
+    with resultados_ordenados(caminho_anterior, config.PORTA_PADRAO) as anteriores, \
+            resultados_ordenados(caminho_atual) as atuais:
+        for transicao in comparar_resultados(anteriores, atuais, contagem, incluir_ausentes):
+            print(f"{transicao.ip:<18} {transicao.porta:<7} {transicao.anterior:<22} {transicao.atual:<22}")
+    
+    so_anterior = sum(q for (antes, agora), q in contagem.items() if agora == AUSENTE)
+    so_atual = sum(q for (antes, agora), q in contagem.items() if antes == AUSENTE)
+    comparados = sum(contagem.values()) - so_anterior - so_atual
+    mudancas = sum(q for (antes, agora), q in contagem.items()
+                   if antes != agora and AUSENTE not in (antes, agora))
+    print("-"*70)
+    print(f"Testes comparados (IP x porta): {comparados}")
+    print(f"Sem mudança: {comparados - mudancas}")
+    print(f"Mudanças: {mudancas}")
+    print(f"Só na varredura anterior: {so_anterior}")
+    print(f"Só na varredura atual: {so_atual}")
+    transicoes = [(par, quantidade) for par, quantidade in contagem.items()
+                  if par[0] != par[1] and AUSENTE not in par]
+    for (anterior, atual), quantidade in sorted(transicoes, key=lambda item: -item[1]):
+        print(f"  {anterior} -> {atual}: {quantidade}")
+    print("="*70)
+
+
+def exibir_progresso(indice: int, total: int, resultado: ResultadoTeste):
+    """
+    Exibe uma linha de progresso para um resultado concluído.
+    
+    Args:
+        indice: Posição do resultado na ordem de conclusão
+        total: Quantidade total de testes (IP x porta), ou None se não for conhecida
+        resultado: Resultado do teste
+    """
+    http_status = formatar_protocolo(resultado.http)
+    https_status = formatar_protocolo(resultado.https)
+    alvo = f"{resultado.ip}:{resultado.porta}"
+    contador = f"{indice}/{total}" if total is not None else f"{indice}"
+    print(f"[{contador}] {alvo:<22} HTTP: {http_status:<20} HTTPS: {https_status}")
+
+
+def executar_testes_threads(ips: ConjuntoAlvos, num_workers: int,
+                            argumentos: argparse.Namespace,
+                            ao_concluir: Callable[[ResultadoTeste], None],
+                            controle: Optional[ControleConcorrencia] = None,
+                            salvar_historico: bool = True,
+                            concluido: Optional[Callable[[str, int], bool]] = None):
+    """
+    Executa os testes com HTTPTester, todas as portas em uma única fila de trabalho.
+    
+    Args:
+        ips: Lista de IPs a serem testados
+        num_workers: Número de threads paralelas (compartilhadas por todas as portas)
+        argumentos: Argumentos de linha de comando (portas e modos de teste)
+        ao_concluir: Recebe cada resultado assim que fica pronto
+        controle: Controle adaptativo; substitui num_workers pelo seu limite
+        salvar_historico: Se grava o histórico de portas ao final (False nos
+            processos de --processos: o processo principal grava)
+        concluido: Indica os pares (IP, porta) já testados (--retomar)
+    """
+    politica = criar_politica_timeout(argumentos)
+    testador = HTTPTester(
+        porta=config.PORTA_PADRAO,
+        timeout=config.TIMEOUT_PADRAO,
+        verificar_ssl=config.VERIFICAR_SSL,
+        protocolos_simultaneos=not argumentos.sequencial,
+        max_workers=num_workers,
+        pre_verificar_tcp=argumentos.pre_verificar_tcp,
+        farejar_protocolo=argumentos.farejar,
+        timeout_adaptativo=criar_timeout_adaptativo(argumentos, politica),
+        politica_timeout=politica,
+        inferir_https=argumentos.inferir_https,
+        limitador_taxa=criar_limitador_taxa(argumentos)
+    )
+    historico = HistoricoPortas(config.ARQUIVO_HISTORICO_PORTAS, config.MAX_IPS_HISTORICO_PORTAS)
+    historico.inicializar(config.PADROES_RESULTADOS_ANTERIORES, config.PORTA_PADRAO)
+    agendador = AgendadorTestes(
+        testador,
+        argumentos.portas,
+        num_workers,
+        parar_na_primeira=argumentos.parar_na_primeira,
+        historico=historico,
+        prazo_ip=politica.prazo_ip,
+        max_por_sub_rede=argumentos.max_por_sub_rede,
+        prefixo_sub_rede=argumentos.prefixo_sub_rede,
+        controle=controle
+    )
+    
+    with testador:
+        agendador.executar(ips, callback=ao_concluir, guardar_resultados=False,
+                           concluido=concluido)
+    
+    if salvar_historico:
+        historico.salvar()
+
+
+def executar_testes_async(ips: ConjuntoAlvos, argumentos: argparse.Namespace,
+                          ao_concluir: Callable[[ResultadoTeste], None],
+                          concluido: Optional[Callable[[str, int], bool]] = None):
+    """
+    Executa os testes com AsyncHTTPTester (asyncio streams).
+    
+    Args:
+        ips: Lista de IPs a serem testados
+        argumentos: Argumentos de linha de comando (portas e modos de teste)
+        ao_concluir: Recebe cada resultado assim que fica pronto
+        concluido: Indica os pares (IP, porta) já testados (--retomar)
+    """
+    politica = criar_politica_timeout(argumentos)
+    testador = AsyncHTTPTester(
+        porta=config.PORTA_PADRAO,
+        timeout=config.TIMEOUT_PADRAO,
+        verificar_ssl=config.VERIFICAR_SSL,
+        max_conexoes=config.MAX_CONEXOES_ASYNC,
+        protocolos_simultaneos=not argumentos.sequencial,
+        timeout_adaptativo=criar_timeout_adaptativo(argumentos, politica),
+        politica_timeout=politica,
+        inferir_https=argumentos.inferir_https,
+        limitador_taxa=criar_limitador_taxa(argumentos),
+        max_por_sub_rede=argumentos.max_por_sub_rede,
+        prefixo_sub_rede=argumentos.prefixo_sub_rede,
+        controle=criar_controle_concorrencia(len(ips) * len(argumentos.portas), argumentos,
+                                             config.MAX_CONEXOES_ASYNC)
+    )
+    
+    testador.testar_multiplos_ips(ips, callback=ao_concluir, portas=argumentos.portas,
+                                  guardar_resultados=False, concluido=concluido)
+
+
+def testar_fatia(ips: ConjuntoAlvos,
+                 parametros: Tuple[argparse.Namespace, Optional[Callable[[str, int], bool]]],
+                 ao_concluir: Callable[[ResultadoTeste], None]):
+    """
+    Testa a fatia de alvos de um processo de --processos (roda no processo filho).
+    
+    Args:
+        ips: IPs da fatia
+        parametros: Argumentos de linha de comando, com a taxa já repartida, e
+            a função que indica os pares já testados (--retomar) ou None
+        ao_concluir: Envia cada resultado ao processo principal
+    """
+    argumentos, concluido = parametros
+    configurar_logging()
+    if argumentos.motor == 'asyncio':
+        executar_testes_async(ips, argumentos, ao_concluir, concluido)
+    else:
+        num_workers, controle = dimensionar_threads(len(ips) * len(argumentos.portas), argumentos)
+        # O processo principal recebe todos os resultados e grava o histórico
+        executar_testes_threads(ips, num_workers, argumentos, ao_concluir, controle,
+                                salvar_historico=False, concluido=concluido)
+
+
+def executar_testes_processos(ips: ConjuntoAlvos, argumentos: argparse.Namespace,
+                              ao_concluir: Callable[[ResultadoTeste], None],
+                              marcas: Optional[MarcasConcluidas] = None):
+    """
+    Divide os alvos entre argumentos.processos processos, cada um com o seu motor.
+    
+    Args:
+        ips: Lista de IPs a serem testados
+        argumentos: Argumentos de linha de comando (portas e modos de teste)
+        ao_concluir: Recebe cada resultado, no processo principal
+        marcas: Pares (IP, porta) já testados (--retomar); cada processo
+            recebe só as marcas da sua fatia
+    """
+    # --taxa é um limite da varredura inteira: cada processo fica com uma parte
+    argumentos_fatia = argparse.Namespace(**vars(argumentos))
+    if argumentos.taxa:
+        argumentos_fatia.taxa = argumentos.taxa / argumentos.processos
+    
+    historico = None
+    if argumentos.motor == 'threads':
+        historico = HistoricoPortas(config.ARQUIVO_HISTORICO_PORTAS, config.MAX_IPS_HISTORICO_PORTAS)
+        historico.inicializar(config.PADROES_RESULTADOS_ANTERIORES, config.PORTA_PADRAO)
+    
+    def receber(resultado: ResultadoTeste):
+        if historico:
+            historico.registrar(resultado)
+        ao_concluir(resultado)
+    
+    def parametros_da_fatia(fatia: ConjuntoAlvos):
+        return argumentos_fatia, marcas.restringir(fatia).concluido if marcas else None
+    
+    executar_em_processos(testar_fatia, ips, (argumentos_fatia, None), argumentos.processos,
+                          argumentos.prefixo_sub_rede, callback=receber,
+                          parametros_da_fatia=parametros_da_fatia)
+    
+    if historico:
+        historico.salvar()
+
+
 def main():
     """Função principal do programa"""
+    argumentos = parse_argumentos()
+    motor = argumentos.motor
+    protocolos_simultaneos = not argumentos.sequencial
+    politica = criar_politica_timeout(argumentos)
     configurar_logging()
     
     print("="*70)
     print("SISTEMA DE TESTE DE CONECTIVIDADE HTTP/HTTPS - IPv4")
     print("="*70)
     print(f"Arquivo de IPs: {config.ARQUIVO_IPS}")
-    print(f"Porta: {config.PORTA_PADRAO}")
-    print(f"Timeout: {config.TIMEOUT_PADRAO}s")
+    print(f"Portas: {', '.join(map(str, argumentos.portas))}")
+    print(f"Timeout: conexao {politica.conexao}s, TLS {politica.tls}s, leitura {politica.leitura}s")
+    if politica.prazo_ip is not None:
+        print(f"Prazo por IP: {politica.prazo_ip}s")
+    if argumentos.taxa:
+        print(f"Taxa maxima: {argumentos.taxa} conexoes/s")
+    if argumentos.max_por_sub_rede:
+        print(f"Maximo por sub-rede /{argumentos.prefixo_sub_rede}: {argumentos.max_por_sub_rede}")
     print(f"Verificar SSL: {config.VERIFICAR_SSL}")
+    print(f"Motor: {motor}")
+    if argumentos.processos > 1:
+        print(f"Processos: {argumentos.processos}")
+    print(f"HTTP/HTTPS simultaneos: {protocolos_simultaneos}")
+    print(f"Timeout adaptativo: {argumentos.timeout_adaptativo}")
     print("="*70)
     
     # Lê IPs do arquivo
     try:
         logging.info(f"Lendo IPs do arquivo: {config.ARQUIVO_IPS}")
-        ips = ler_ips_do_arquivo(config.ARQUIVO_IPS)
+        exclusoes = ler_exclusoes(argumentos.excluir) if argumentos.excluir else []
+        # Sem repetições e em ordem numérica; prefixos CIDR e faixas são
+        # expandidos sob demanda durante os testes
+        ips = carregar_alvos(config.ARQUIVO_IPS, exclusoes, config.PROCESSOS_LEITURA)
+        
+        if ips.total_repetidos:
+            print(f"[AVISO] {ips.total_repetidos} IP(s) repetido(s) ignorado(s)")
+        if ips.total_excluidos:
+            print(f"[AVISO] {ips.total_excluidos} IP(s) excluido(s) por {argumentos.excluir}")
         
         if not ips:
             print("[ERRO] Nenhum IP valido encontrado no arquivo!")
@@ -163,47 +632,95 @@ def main():
         print(f"[ERRO] Erro: {str(e)}")
         sys.exit(1)
     
-    # Calcula número de workers
-    num_workers = calcular_workers(len(ips))
-    print(f"[OK] Executando testes com {num_workers} worker(s) em paralelo")
+    # --comparar sem arquivo: os resultados da execução anterior são guardados
+    # antes de sobrescritos (ao retomar, a cópia feita na execução
+    # interrompida é mantida)
+    caminho_anterior = argumentos.comparar
+    if caminho_anterior == '':
+        caminho_anterior = f"{argumentos.saida}.anterior"
+        if os.path.exists(argumentos.saida) and not (argumentos.retomar
+                                                     and os.path.exists(caminho_anterior)):
+            try:
+                os.replace(argumentos.saida, caminho_anterior)
+            except OSError as e:
+                logging.error(f"Erro ao guardar {argumentos.saida}: {str(e)}")
+                print(f"[ERRO] Nao foi possivel guardar os resultados anteriores em {caminho_anterior}")
+                sys.exit(1)
     
-    # Inicializa o testador
-    testador = HTTPTester(
-        porta=config.PORTA_PADRAO,
-        timeout=config.TIMEOUT_PADRAO,
-        verificar_ssl=config.VERIFICAR_SSL
-    )
+    # Cada resultado é gravado assim que fica pronto: uma interrupção
+    # preserva o que já foi testado
+    escritor = EscritorResultados(argumentos.saida, argumentos.formato)
+    try:
+        escritor.iniciar()
+    except OSError as e:
+        logging.error(f"Erro ao criar {argumentos.saida}: {str(e)}")
+        print(f"[ERRO] Nao foi possivel criar o arquivo de resultados: {argumentos.saida}")
+        sys.exit(1)
+    
+    # Diário dos testes concluídos: com --retomar, os testes já registrados
+    # vão para os resultados e são pulados na varredura
+    caminho_diario = config.ARQUIVO_DIARIO or f"{argumentos.saida}.diario"
+    marcas = None
+    try:
+        if argumentos.retomar:
+            marcas = MarcasConcluidas(ips, argumentos.portas, argumentos.parar_na_primeira)
+            if os.path.exists(caminho_diario):
+                for resultado in ler_diario(caminho_diario):
+                    if marcas.marcar(resultado):
+                        escritor.adicionar(resultado)
+                print(f"[OK] Retomando: {marcas.total} teste(s) ja concluido(s) em {caminho_diario}")
+            else:
+                print(f"[AVISO] Diario {caminho_diario} nao encontrado; iniciando do comeco")
+        diario = DiarioVarredura(caminho_diario, retomar=argumentos.retomar)
+    except (OSError, ValueError) as e:
+        escritor.fechar()
+        logging.error(f"Erro no diário {caminho_diario}: {str(e)}")
+        print(f"[ERRO] Nao foi possivel usar o diario {caminho_diario}: {str(e)}")
+        sys.exit(1)
+    concluido = marcas.concluido if marcas else None
+    
+    # Progresso, gravação e registro no diário de cada resultado, na ordem de conclusão
+    numero_testes = len(ips) * len(argumentos.portas)
+    total = None if argumentos.parar_na_primeira else numero_testes
+    concluidos = marcas.total if marcas else 0
+    
+    def ao_concluir(resultado: ResultadoTeste):
+        nonlocal concluidos
+        concluidos += 1
+        exibir_progresso(concluidos, total, resultado)
+        escritor.adicionar(resultado)
+        diario.registrar(resultado)
     
     # Executa testes em paralelo
-    resultados = []
     inicio = datetime.now()
     
-    print(f"\n[INICIANDO] Iniciando testes... ({inicio.strftime('%H:%M:%S')})")
-    print("-"*70)
-    
-    with ThreadPoolExecutor(max_workers=num_workers) as executor:
-        # Submete todas as tarefas
-        futures = {executor.submit(testador.testar_ip, ip): ip for ip in ips}
-        
-        # Processa resultados conforme completam
-        for i, future in enumerate(as_completed(futures), 1):
-            ip = futures[future]
+    with escritor, diario:
+        if argumentos.processos > 1:
+            print(f"[OK] Executando testes em {argumentos.processos} processo(s), "
+                  f"sub-redes /{argumentos.prefixo_sub_rede} divididas entre eles")
+            print(f"\n[INICIANDO] Iniciando testes... ({inicio.strftime('%H:%M:%S')})")
+            print("-"*70)
             try:
-                resultado = future.result()
-                resultados.append(resultado)
-                
-                # Exibe progresso
-                http_status = resultado['http'] or 'N/A'
-                https_status = resultado['https'] or 'N/A'
-                print(f"[{i}/{len(ips)}] {ip:<20} HTTP: {http_status:<20} HTTPS: {https_status}")
-                
-            except Exception as e:
-                logging.error(f"Erro ao testar {ip}: {str(e)}")
-                resultados.append({
-                    'ip': ip,
-                    'http': f'Erro: {str(e)}',
-                    'https': f'Erro: {str(e)}'
-                })
+                executar_testes_processos(ips, argumentos, ao_concluir, marcas)
+            except RuntimeError as e:
+                print(f"[AVISO] {str(e)}; os resultados recebidos foram gravados")
+        elif motor == 'asyncio':
+            print(f"[OK] Executando testes com ate {config.MAX_CONEXOES_ASYNC} conexao(oes) simultanea(s)")
+            print(f"\n[INICIANDO] Iniciando testes... ({inicio.strftime('%H:%M:%S')})")
+            print("-"*70)
+            executar_testes_async(ips, argumentos, ao_concluir, concluido)
+        else:
+            # Testes simultâneos: adaptativo ou número fixo de workers (um teste por IP x porta)
+            num_workers, controle = dimensionar_threads(numero_testes, argumentos)
+            if controle is not None:
+                print(f"[OK] Concorrencia adaptativa: {controle.limite} teste(s) simultaneo(s) "
+                      f"no inicio, ate {controle.maximo}")
+            else:
+                print(f"[OK] Executando testes com {num_workers} worker(s) em paralelo")
+            print(f"\n[INICIANDO] Iniciando testes... ({inicio.strftime('%H:%M:%S')})")
+            print("-"*70)
+            executar_testes_threads(ips, num_workers, argumentos, ao_concluir, controle,
+                                    concluido=concluido)
     
     fim = datetime.now()
     duracao = (fim - inicio).total_seconds()
@@ -211,23 +728,31 @@ def main():
     print("-"*70)
     print(f"[OK] Testes concluidos em {duracao:.2f} segundos")
     
-    # Ordena resultados por IP para facilitar leitura
-    resultados.sort(key=lambda x: x['ip'])
-    
-    # Exibe resultados
-    exibir_resultados_console(resultados)
-    exibir_estatisticas(resultados)
-    
-    # Gera relatório CSV
+    # Ordena o arquivo por IP (numérico) e porta, em disco, para facilitar leitura
     try:
-        gerar_relatorio_csv(resultados, config.ARQUIVO_RESULTADOS)
-        print(f"\n[OK] Relatorio salvo em: {config.ARQUIVO_RESULTADOS}")
+        if argumentos.ordenar:
+            ordenar_arquivo(argumentos.saida, escritor.formato)
+        
+        # Exibe resultados (ou só as mudanças), relendo o arquivo (nada fica
+        # acumulado em memória)
+        if caminho_anterior and os.path.exists(caminho_anterior):
+            exibir_mudancas(caminho_anterior, argumentos.saida, argumentos.incluir_ausentes)
+        else:
+            if caminho_anterior:
+                print(f"[AVISO] Varredura anterior {caminho_anterior} nao encontrada; nada a comparar")
+            exibir_resultados_console(ler_resultados(argumentos.saida, escritor.formato))
+        exibir_estatisticas(ler_resultados(argumentos.saida, escritor.formato))
+        print(f"\n[OK] Relatorio salvo em: {argumentos.saida}")
     except Exception as e:
         logging.error(f"Erro ao gerar relatório: {str(e)}")
-        print(f"[AVISO] Nao foi possivel salvar o relatorio CSV")
+        print(f"[AVISO] Nao foi possivel concluir o relatorio {argumentos.saida}")
     
     print("\n[CONCLUIDO] Processo finalizado!")
 
 
 if __name__ == "__main__":
+    # Executável gerado pelo PyInstaller: os processos de --processos e de
+    # PROCESSOS_LEITURA (spawn, padrão no Windows) reexecutam o programa e
+    # precisam parar aqui
+    multiprocessing.freeze_support()
     main()
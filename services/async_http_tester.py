@@ -0,0 +1,327 @@
+"""
+Serviço assíncrono de teste de conectividade HTTP/HTTPS (asyncio streams)
+"""
+
+import asyncio
+import ssl
+import time
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+from services.concurrency import ControleConcorrencia
+from services.http_tester import Cronometro, classificar_excecao, extrair_codigo_status
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste, inferir_resultado
+from services.rate_limiter import LimitadorSubRedesAsync, LimitadorTaxa
+from services.scheduler import gerar_alvos, sondagens_por_ip
+from services.timeouts import PREFIXO_PADRAO, OrcamentoIPs, PoliticaTimeout, TimeoutAdaptativo
+
+
+class AsyncHTTPTester:
+    """
+    Testa conectividade HTTP/HTTPS em IPs usando asyncio.
+    
+    Alternativa ao HTTPTester para varreduras grandes: um único processo
+    mantém milhares de conexões simultâneas, limitadas por um semáforo global.
+    Os resultados têm o mesmo formato do HTTPTester.
+    """
+    
+    def __init__(self, porta: int = 8080, timeout: int = 5, verificar_ssl: bool = False,
+                 max_conexoes: int = 1000, protocolos_simultaneos: bool = True,
+                 timeout_adaptativo: Optional[TimeoutAdaptativo] = None,
+                 politica_timeout: Optional[PoliticaTimeout] = None,
+                 inferir_https: bool = False,
+                 limitador_taxa: Optional[LimitadorTaxa] = None,
+                 max_por_sub_rede: Optional[int] = None,
+                 prefixo_sub_rede: int = PREFIXO_PADRAO,
+                 controle: Optional[ControleConcorrencia] = None):
+        """
+        Inicializa o testador assíncrono.
+        
+        Args:
+            porta: Porta de destino para os testes
+            timeout: Timeout em segundos para conexão e para leitura da resposta
+            verificar_ssl: Se deve verificar certificados SSL
+            max_conexoes: Número máximo de conexões abertas ao mesmo tempo
+            protocolos_simultaneos: Se HTTP e HTTPS de um mesmo IP são testados ao
+                mesmo tempo (False testa um protocolo após o outro)
+            timeout_adaptativo: Estimador opcional do timeout de conexão por sub-rede
+            politica_timeout: Timeouts de conexão, TLS e leitura e prazo por IP;
+                sem ela, timeout vale para as três fases e não há prazo
+            inferir_https: No modo sequencial, se não testa HTTPS quando a conexão
+                TCP do HTTP não se completou (o resultado é copiado e marcado inferido)
+            limitador_taxa: Limite global de conexões por segundo
+            max_por_sub_rede: Máximo de pares (IP, porta) testados ao mesmo tempo
+                em uma sub-rede (None = sem limite)
+            prefixo_sub_rede: Tamanho do prefixo que agrupa IPs na mesma sub-rede
+            controle: Controle adaptativo dos pares (IP, porta) em andamento; o
+                teto continua sendo max_conexoes sockets
+        """
+        self.porta = porta
+        self.timeout = timeout
+        self.politica = politica_timeout or PoliticaTimeout.unica(timeout)
+        self.verificar_ssl = verificar_ssl
+        self.max_conexoes = max(1, max_conexoes)
+        self.protocolos_simultaneos = protocolos_simultaneos
+        self.timeout_adaptativo = timeout_adaptativo
+        self.inferir_https = inferir_https
+        self.limitador_taxa = limitador_taxa
+        self.max_por_sub_rede = max_por_sub_rede
+        self.prefixo_sub_rede = prefixo_sub_rede
+        self.controle = controle
+        self._contexto_ssl = self._criar_contexto_ssl()
+        self._semaforo: Optional[asyncio.Semaphore] = None
+    
+    def _criar_contexto_ssl(self) -> ssl.SSLContext:
+        """Cria o contexto SSL compartilhado por todas as conexões HTTPS"""
+        if self.verificar_ssl:
+            return ssl.create_default_context()
+        
+        contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        contexto.check_hostname = False
+        contexto.verify_mode = ssl.CERT_NONE
+        return contexto
+    
+    async def testar_ip(self, ip: str, porta: Optional[int] = None,
+                        orcamento: Optional[float] = None) -> ResultadoTeste:
+        """
+        Testa conectividade HTTP e HTTPS para um IP específico.
+        
+        Args:
+            ip: Endereço IPv4 a ser testado
+            porta: Porta de destino (padrão: a porta do testador)
+            orcamento: Segundos disponíveis para este teste (restante do prazo
+                do IP); as sondagens que não cabem são marcadas PRAZO_ESGOTADO
+        
+        Returns:
+            ResultadoTeste com os resultados dos testes HTTP e HTTPS
+        """
+        porta = porta or self.porta
+        politica = self.politica if orcamento is None else self.politica.limitada(orcamento)
+        if self.protocolos_simultaneos:
+            http, https = await asyncio.gather(
+                self._testar_protocolo(ip, porta, 'http', politica),
+                self._testar_protocolo(ip, porta, 'https', politica)
+            )
+        else:
+            inicio = time.perf_counter()
+            http = await self._testar_protocolo(ip, porta, 'http', politica)
+            if self.inferir_https:
+                # Sem conexão TCP no HTTP, a de HTTPS (mesmo IP e porta) falharia igual
+                https = inferir_resultado(http)
+                if https is not None:
+                    return ResultadoTeste(ip, porta, http, https)
+            if orcamento is not None:
+                orcamento -= time.perf_counter() - inicio
+                politica = self.politica.limitada(orcamento)
+            if orcamento is not None and orcamento <= 0:
+                https = ResultadoProtocolo(Desfecho.PRAZO_ESGOTADO)
+            else:
+                https = await self._testar_protocolo(ip, porta, 'https', politica)
+        
+        return ResultadoTeste(ip, porta, http, https)
+    
+    async def _testar_protocolo(self, ip: str, porta: int, protocolo: str,
+                                politica: PoliticaTimeout) -> ResultadoProtocolo:
+        """
+        Testa um protocolo específico (HTTP ou HTTPS) para um IP.
+        
+        Args:
+            ip: Endereço IPv4
+            porta: Porta de destino
+            protocolo: 'http' ou 'https'
+            politica: Timeouts de conexão, TLS e leitura
+        
+        Returns:
+            ResultadoProtocolo com o desfecho, o código HTTP e os tempos de cada fase
+        """
+        if self.limitador_taxa is not None:
+            espera = self.limitador_taxa.reservar()
+            if espera > 0:
+                await asyncio.sleep(espera)
+        
+        async with self._semaforo:
+            cronometro = Cronometro()
+            try:
+                codigo = await self._requisitar(ip, porta, protocolo, politica, cronometro)
+                if codigo is not None:
+                    return cronometro.resultado(Desfecho.OK, codigo)
+                desfecho = Desfecho.ERRO_CONEXAO
+            
+            except asyncio.TimeoutError:
+                desfecho = Desfecho.TIMEOUT
+            
+            except OSError as e:
+                # Recusada, inalcançável, erro SSL... pelo errno/tipo da exceção
+                desfecho = classificar_excecao(e) or Desfecho.ERRO_CONEXAO
+            
+            except Exception as e:
+                return cronometro.resultado(Desfecho.ERRO, detalhe=type(e).__name__)
+            
+            return cronometro.resultado(desfecho)
+    
+    async def _requisitar(self, ip: str, porta: int, protocolo: str,
+                          politica: PoliticaTimeout, cronometro: Cronometro) -> Optional[int]:
+        """
+        Envia um GET mínimo e lê apenas a linha de status da resposta.
+        
+        Args:
+            ip: Endereço IPv4
+            porta: Porta de destino
+            protocolo: 'http' ou 'https'
+            politica: Timeouts de conexão, TLS e leitura
+            cronometro: Recebe os tempos de conexão, TLS e primeiro byte
+        
+        Returns:
+            Código HTTP da resposta, ou None se a resposta não for HTTP
+        """
+        contexto = self._contexto_ssl if protocolo == 'https' else None
+        # Python 3.11+: o handshake TLS vira uma etapa separada e pode ser medido
+        separar_tls = contexto is not None and hasattr(asyncio.StreamWriter, 'start_tls')
+        
+        if contexto is None or separar_tls:
+            timeout_conexao = politica.conexao
+            if self.timeout_adaptativo is not None:
+                timeout_conexao = min(timeout_conexao, self.timeout_adaptativo.timeout(ip))
+        else:
+            # Conexão e handshake em uma única etapa: somam os dois limites
+            timeout_conexao = politica.conexao + politica.tls
+        
+        inicio = time.perf_counter_ns()
+        leitor, escritor = await asyncio.wait_for(
+            asyncio.open_connection(ip, porta, ssl=None if separar_tls else contexto),
+            timeout_conexao
+        )
+        if contexto is None or separar_tls:
+            cronometro.registrar('conexao', inicio)
+            if self.timeout_adaptativo is not None:
+                self.timeout_adaptativo.registrar(ip, cronometro.fases['conexao'] / 1000)
+        
+        try:
+            if separar_tls:
+                inicio = time.perf_counter_ns()
+                await asyncio.wait_for(escritor.start_tls(contexto, server_hostname=ip), politica.tls)
+                cronometro.registrar('tls', inicio)
+            
+            escritor.write(
+                f"GET / HTTP/1.1\r\n"
+                f"Host: {ip}:{porta}\r\n"
+                f"User-Agent: ReachCLI\r\n"
+                f"Connection: close\r\n\r\n".encode('ascii')
+            )
+            await asyncio.wait_for(escritor.drain(), politica.leitura)
+            inicio = time.perf_counter_ns()
+            linha = await asyncio.wait_for(leitor.readline(), politica.leitura)
+            cronometro.registrar('primeiro_byte', inicio)
+        finally:
+            # Aborta em vez de fechar: evita esperar o close_notify de CPEs lentos
+            escritor.transport.abort()
+        
+        # Linha de status esperada: b"HTTP/1.1 200 OK"
+        return extrair_codigo_status(linha)
+    
+    async def _testar_lote(self, alvos: Iterable[Tuple[str, int]],
+                           callback: Optional[Callable[[ResultadoTeste], None]],
+                           guardar_resultados: bool = True,
+                           sondagens: Union[int, Callable[[str], int]] = 1) -> List[ResultadoTeste]:
+        """
+        Testa alvos com um conjunto fixo de tarefas consumindo o mesmo iterador.
+        
+        Args:
+            alvos: Pares (ip, porta) a serem testados
+            callback: Função chamada com cada resultado assim que fica pronto
+            guardar_resultados: Se acumula os resultados na lista retornada
+            sondagens: Pares de cada IP em alvos (ou função que os conta), para
+                o prazo por IP descartar os IPs concluídos
+        
+        Returns:
+            Lista de ResultadoTeste, na ordem de conclusão
+        """
+        self._semaforo = asyncio.Semaphore(self.max_conexoes)
+        iterador = iter(alvos)
+        resultados = []
+        prazo_ip = self.politica.prazo_ip
+        orcamento = OrcamentoIPs(prazo_ip, sondagens) if prazo_ip is not None else None
+        esgotado = ResultadoProtocolo(Desfecho.PRAZO_ESGOTADO)
+        limitador = None
+        if self.max_por_sub_rede is not None:
+            limitador = LimitadorSubRedesAsync(self.max_por_sub_rede, self.prefixo_sub_rede)
+        
+        async def testar(ip: str, porta: int) -> ResultadoTeste:
+            if limitador is None:
+                return await self._testar_no_prazo(ip, porta, orcamento, esgotado)
+            async with limitador.ocupar(ip):
+                return await self._testar_no_prazo(ip, porta, orcamento, esgotado)
+        
+        controle = self.controle
+        vaga_livre = asyncio.Condition()
+        em_andamento = 0
+        
+        async def testar_no_limite(ip: str, porta: int) -> ResultadoTeste:
+            # Espera o número de testes em andamento ficar abaixo do limite atual
+            nonlocal em_andamento
+            async with vaga_livre:
+                await vaga_livre.wait_for(lambda: em_andamento < controle.limite)
+                em_andamento += 1
+            try:
+                return await testar(ip, porta)
+            finally:
+                async with vaga_livre:
+                    em_andamento -= 1
+                    vaga_livre.notify_all()
+        
+        async def trabalhador():
+            for ip, porta in iterador:
+                if controle is None:
+                    resultado = await testar(ip, porta)
+                else:
+                    resultado = await testar_no_limite(ip, porta)
+                    controle.registrar(resultado)
+                if guardar_resultados:
+                    resultados.append(resultado)
+                if callback:
+                    callback(resultado)
+        
+        # Cada IP abre duas conexões; o semáforo limita o total de sockets
+        trabalhadores = self.max_conexoes if controle is None else min(self.max_conexoes, controle.maximo)
+        await asyncio.gather(*(trabalhador() for _ in range(trabalhadores)))
+        return resultados
+    
+    async def _testar_no_prazo(self, ip: str, porta: int, orcamento: Optional[OrcamentoIPs],
+                               esgotado: ResultadoProtocolo) -> ResultadoTeste:
+        """Testa um par (IP, porta) descontando a duração do prazo restante do IP"""
+        if orcamento is None:
+            return await self.testar_ip(ip, porta)
+        
+        restante = orcamento.restante(ip)
+        if restante <= 0:
+            orcamento.consumir(ip, 0.0)
+            return ResultadoTeste(ip, porta, esgotado, esgotado)
+        inicio = time.perf_counter()
+        try:
+            return await self.testar_ip(ip, porta, restante)
+        finally:
+            orcamento.consumir(ip, time.perf_counter() - inicio)
+    
+    def testar_multiplos_ips(self, ips: Iterable[str],
+                             callback: Optional[Callable[[ResultadoTeste], None]] = None,
+                             portas: Optional[List[int]] = None,
+                             guardar_resultados: bool = True,
+                             concluido: Optional[Callable[[str, int], bool]] = None) -> list:
+        """
+        Testa múltiplos IPs executando o loop de eventos até o fim.
+        
+        Args:
+            ips: Lista (ou iterável) de endereços IPv4
+            callback: Função opcional chamada a cada resultado concluído
+            portas: Portas a testar em cada IP (padrão: a porta do testador)
+            guardar_resultados: Se acumula os resultados na lista retornada; com
+                False, só o callback os recebe
+            concluido: Função opcional que indica os pares (IP, porta) já
+                testados em uma execução interrompida, que são pulados
+        
+        Returns:
+            Lista de ResultadoTeste (vazia se guardar_resultados for False)
+        """
+        portas = portas or [self.porta]
+        alvos = gerar_alvos(ips, portas, prefixo=self.prefixo_sub_rede, concluido=concluido)
+        return asyncio.run(self._testar_lote(alvos, callback, guardar_resultados,
+                                             sondagens_por_ip(portas, concluido)))
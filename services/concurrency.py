@@ -0,0 +1,224 @@
+"""
+Controle adaptativo da concorrência: quantos testes ficam em andamento ao
+mesmo tempo, ajustado pela vazão, pela latência e pelos erros locais (AIMD)
+"""
+
+import errno
+import logging
+import threading
+import time
+from typing import Optional
+
+from services.probe_result import Desfecho, ResultadoTeste
+
+try:
+    import resource
+except ImportError:  # Windows: sem RLIMIT_NOFILE
+    resource = None
+
+# Falhas do próprio host (descritores, portas efêmeras, buffers): sinal de
+# concorrência alta demais, e não de problema no CPE
+ERRNOS_RECURSO_LOCAL = {
+    errno.EMFILE,
+    errno.ENFILE,
+    errno.EADDRNOTAVAIL,
+    errno.ENOBUFS,
+    errno.ENOMEM,
+}
+
+# Descritores deixados livres para arquivos, logs e o restante do processo
+RESERVA_DESCRITORES = 64
+
+# Limite de descritores pedido ao sistema ao iniciar (até o limite rígido)
+DESCRITORES_DESEJADOS = 65536
+
+
+def ajustar_limite_descritores(desejado: int = DESCRITORES_DESEJADOS) -> Optional[int]:
+    """
+    Eleva o limite flexível de descritores abertos (RLIMIT_NOFILE), se permitido.
+    
+    Args:
+        desejado: Limite pretendido; nunca passa do limite rígido
+    
+    Returns:
+        Limite flexível em vigor após o ajuste, ou None se o sistema não
+        oferece RLIMIT_NOFILE (Windows) ou não impõe limite
+    """
+    if resource is None:
+        return None
+    flexivel, rigido = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if rigido != resource.RLIM_INFINITY:
+        desejado = min(desejado, rigido)
+    if flexivel != resource.RLIM_INFINITY and flexivel < desejado:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (desejado, rigido))
+            flexivel = desejado
+        except (ValueError, OSError) as e:
+            # macOS, por exemplo, recusa valores acima de OPEN_MAX
+            logging.warning(f"Não foi possível elevar RLIMIT_NOFILE para {desejado}: {str(e)}")
+    return None if flexivel == resource.RLIM_INFINITY else flexivel
+
+
+def maximo_por_descritores(sockets_por_teste: int) -> Optional[int]:
+    """
+    Máximo de testes simultâneos que cabem no limite de descritores.
+    
+    Args:
+        sockets_por_teste: Sockets abertos ao mesmo tempo por teste (2 com
+            HTTP e HTTPS simultâneos)
+    
+    Returns:
+        Máximo de testes, ou None se não há limite conhecido
+    """
+    limite = ajustar_limite_descritores()
+    if limite is None:
+        return None
+    return max(1, (limite - RESERVA_DESCRITORES) // max(1, sockets_por_teste))
+
+
+def workers_fixos(numero_testes: int, minimo: int, maximo: int) -> int:
+    """
+    Heurística fixa: 1 worker para cada 5 testes, entre minimo e maximo.
+    
+    Args:
+        numero_testes: Quantidade de testes (IP × porta)
+        minimo: Menor número de workers
+        maximo: Maior número de workers
+    
+    Returns:
+        Número de workers, sem passar do número de testes
+    """
+    workers = max(minimo, min(numero_testes // 5, maximo))
+    workers = min(workers, numero_testes, maximo)
+    return max(workers, 1)
+
+
+class ControleConcorrencia:
+    """
+    Ajusta o número de testes em andamento, como o controle de congestionamento do TCP.
+    
+    O tempo é dividido em rodadas de `limite` testes concluídos. Ao fim de
+    cada rodada:
+    - erros locais (EMFILE, EADDRNOTAVAIL...) reduzem o limite pela metade;
+    - latência de conexão muito acima da menor já vista reduz o limite em 20%;
+    - se a vazão (testes/s) subiu, o limite cresce: dobra na partida lenta
+      (até a primeira redução) e depois soma INCREMENTO;
+    - vazão estável ou em queda mantém o limite.
+    
+    Seguro entre threads; registrar() recebe cada resultado concluído.
+    """
+    
+    FATOR_REDUCAO_ERRO = 0.5
+    FATOR_REDUCAO_LATENCIA = 0.8
+    FATOR_LATENCIA = 3.0  # latência da rodada / menor latência que indica fila
+    FOLGA_LATENCIA_MS = 10.0  # aumento mínimo (ms): ignora oscilações em RTTs muito baixos
+    GANHO_VAZAO = 1.05  # vazão mínima, relativa à rodada anterior, para crescer
+    INCREMENTO = 2
+    AMOSTRAS_MINIMAS = 8  # testes por rodada com limites pequenos
+    
+    def __init__(self, inicial: int, minimo: int, maximo: int):
+        """
+        Inicializa o controle.
+        
+        Args:
+            inicial: Testes simultâneos no início
+            minimo: Menor limite (mesmo após erros)
+            maximo: Maior limite (descritores, threads ou número de testes)
+        """
+        self.minimo = max(1, minimo)
+        self.maximo = max(self.minimo, maximo)
+        self._limite = float(min(self.maximo, max(self.minimo, inicial)))
+        self._partida_lenta = True
+        self._vazao_anterior: Optional[float] = None
+        self._latencia_base: Optional[float] = None
+        self._lock = threading.Lock()
+        self._iniciar_rodada()
+    
+    @property
+    def limite(self) -> int:
+        """Testes que podem estar em andamento agora"""
+        return int(self._limite)
+    
+    def _iniciar_rodada(self):
+        self._inicio_rodada = time.monotonic()
+        self._concluidos = 0
+        self._erros_locais = 0
+        self._soma_latencia = 0.0
+        self._amostras_latencia = 0
+    
+    def registrar(self, resultado: ResultadoTeste):
+        """Contabiliza um teste concluído e, ao fim da rodada, ajusta o limite"""
+        with self._lock:
+            self._concluidos += 1
+            for protocolo in (resultado.http, resultado.https):
+                if protocolo.desfecho == Desfecho.RECURSO_LOCAL:
+                    self._erros_locais += 1
+                if protocolo.conexao_ms is not None:
+                    self._soma_latencia += protocolo.conexao_ms
+                    self._amostras_latencia += 1
+            if self._concluidos >= max(self.limite, self.AMOSTRAS_MINIMAS):
+                self._ajustar()
+                self._iniciar_rodada()
+    
+    def _ajustar(self):
+        """Fecha a rodada: aplica o aumento aditivo ou a redução multiplicativa"""
+        duracao = time.monotonic() - self._inicio_rodada
+        vazao = self._concluidos / duracao if duracao > 0 else float('inf')
+        latencia = None
+        if self._amostras_latencia:
+            latencia = self._soma_latencia / self._amostras_latencia
+            if self._latencia_base is None or latencia < self._latencia_base:
+                self._latencia_base = latencia
+        
+        anterior = self.limite
+        if self._erros_locais:
+            self._reduzir(self.FATOR_REDUCAO_ERRO)
+            motivo = f"{self._erros_locais} erro(s) de recurso local"
+        elif latencia is not None and self._latencia_inflada(latencia):
+            self._reduzir(self.FATOR_REDUCAO_LATENCIA)
+            motivo = f"latência de conexão {latencia:.1f} ms (base {self._latencia_base:.1f} ms)"
+        elif self._vazao_anterior is None or vazao > self._vazao_anterior * self.GANHO_VAZAO:
+            if self._partida_lenta:
+                self._limite = min(self.maximo, self._limite * 2)
+            else:
+                self._limite = min(self.maximo, self._limite + self.INCREMENTO)
+            motivo = f"vazão {vazao:.1f} testes/s"
+        else:
+            motivo = None
+        self._vazao_anterior = vazao
+        
+        if motivo and self.limite != anterior:
+            logging.debug(f"Concorrência {anterior} -> {self.limite} ({motivo})")
+    
+    def _latencia_inflada(self, latencia: float) -> bool:
+        return (latencia > self._latencia_base * self.FATOR_LATENCIA
+                and latencia - self._latencia_base > self.FOLGA_LATENCIA_MS)
+    
+    def _reduzir(self, fator: float):
+        self._limite = max(self.minimo, self._limite * fator)
+        self._partida_lenta = False
+
+
+def criar_controle(numero_testes: int, inicial: int, minimo: int, maximo: int,
+                   sockets_por_teste: int = 2) -> ControleConcorrencia:
+    """
+    Cria o controle de concorrência de uma varredura.
+    
+    O teto é o menor entre maximo, o número de testes e o que cabe no limite
+    de descritores do processo (elevado até o limite rígido, se permitido).
+    
+    Args:
+        numero_testes: Quantidade de testes (IP × porta)
+        inicial: Testes simultâneos no início
+        minimo: Menor limite
+        maximo: Maior limite configurado
+        sockets_por_teste: Sockets abertos ao mesmo tempo por teste
+    
+    Returns:
+        ControleConcorrencia
+    """
+    teto = min(maximo, max(1, numero_testes))
+    por_descritores = maximo_por_descritores(sockets_por_teste)
+    if por_descritores is not None:
+        teto = min(teto, por_descritores)
+    return ControleConcorrencia(min(inicial, teto), min(minimo, teto), teto)
@@ -2,19 +2,299 @@
 Serviço de teste de conectividade HTTP/HTTPS
 """
 
+import errno
+import ipaddress
 import requests
+import select
+import socket
 import ssl
-from typing import Dict, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from urllib3.exceptions import InsecureRequestWarning
+from urllib3.util.ssl_ import create_urllib3_context
+
+from services.concurrency import ERRNOS_RECURSO_LOCAL
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste, inferir_resultado
+from services.rate_limiter import LimitadorTaxa
+from services.timeouts import PoliticaTimeout, TimeoutAdaptativo
 
 # Suprime avisos de SSL não verificado
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
+# Códigos de connect_ex que indicam conexão não bloqueante em andamento
+_CONEXAO_EM_ANDAMENTO = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY}
+
+# Primeiro byte de um registro TLS: handshake (ServerHello) ou alerta
+_REGISTROS_TLS = {0x16, 0x15}
+
+# Desfecho de cada errno de falha de conexão (os demais viram ERRO_CONEXAO)
+_DESFECHO_POR_ERRNO = {
+    errno.ECONNREFUSED: Desfecho.RECUSADA,
+    errno.ETIMEDOUT: Desfecho.TIMEOUT,
+    errno.EHOSTUNREACH: Desfecho.HOST_INALCANCAVEL,
+    errno.EHOSTDOWN: Desfecho.HOST_INALCANCAVEL,
+    errno.ENETUNREACH: Desfecho.REDE_INALCANCAVEL,
+    errno.ENETDOWN: Desfecho.REDE_INALCANCAVEL,
+    **{codigo: Desfecho.RECURSO_LOCAL for codigo in ERRNOS_RECURSO_LOCAL},
+}
+
+
+def extrair_codigo_status(linha: bytes) -> Optional[int]:
+    """
+    Extrai o código HTTP de uma linha de status (ex.: b"HTTP/1.1 200 OK").
+    
+    Args:
+        linha: Bytes iniciais da resposta
+        
+    Returns:
+        Código HTTP, ou None se os bytes não forem uma linha de status HTTP
+    """
+    partes = linha.split(None, 2)
+    if len(partes) < 2 or not partes[0].startswith(b'HTTP/') or not partes[1].isdigit():
+        return None
+    return int(partes[1])
+
+
+def desfecho_por_errno(codigo: Optional[int]) -> Desfecho:
+    """
+    Converte o errno de uma falha de conexão em Desfecho.
+    
+    Args:
+        codigo: errno (ex.: retorno de connect_ex ou SO_ERROR)
+        
+    Returns:
+        Desfecho correspondente; ERRO_CONEXAO para códigos não mapeados
+    """
+    return _DESFECHO_POR_ERRNO.get(codigo, Desfecho.ERRO_CONEXAO)
+
+
+def classificar_excecao(erro: BaseException) -> Optional[Desfecho]:
+    """
+    Classifica uma falha pela exceção de origem, sem analisar o texto da mensagem.
+    
+    Percorre a cadeia requests -> urllib3 -> socket (__cause__, __context__,
+    args e o atributo reason do MaxRetryError) até encontrar um ssl.SSLError,
+    um timeout de socket ou um OSError com errno conhecido.
+    
+    Args:
+        erro: Exceção capturada
+        
+    Returns:
+        Desfecho da causa original, ou None se nenhuma causa for reconhecida
+    """
+    pendentes = [erro]
+    vistos = set()
+    while pendentes:
+        atual = pendentes.pop()
+        if id(atual) in vistos:
+            continue
+        vistos.add(id(atual))
+        
+        if isinstance(atual, ssl.SSLError):
+            return Desfecho.ERRO_SSL
+        if isinstance(atual, ConnectionRefusedError):
+            return Desfecho.RECUSADA
+        if isinstance(atual, socket.timeout):
+            return Desfecho.TIMEOUT
+        if isinstance(atual, OSError) and atual.errno in _DESFECHO_POR_ERRNO:
+            return _DESFECHO_POR_ERRNO[atual.errno]
+        
+        causas = (atual.__context__, atual.__cause__, *atual.args, getattr(atual, 'reason', None))
+        pendentes.extend(causa for causa in causas if isinstance(causa, BaseException))
+    
+    return None
+
+
+class Cronometro:
+    """
+    Mede as fases de uma sondagem (DNS, conexão, TLS, primeiro byte e total).
+    
+    Cada fase é registrada somente quando termina; uma falha no meio da
+    sondagem deixa as fases seguintes como None no resultado.
+    """
+    
+    __slots__ = ('inicio', 'fases')
+    
+    def __init__(self):
+        self.inicio = time.perf_counter_ns()
+        self.fases: Dict[str, float] = {}
+    
+    def registrar(self, fase: str, inicio_ns: int):
+        """
+        Registra a duração de uma fase.
+        
+        Args:
+            fase: 'dns', 'conexao', 'tls' ou 'primeiro_byte'
+            inicio_ns: Valor de time.perf_counter_ns() no começo da fase
+        """
+        self.fases[fase] = (time.perf_counter_ns() - inicio_ns) / 1_000_000
+    
+    def resultado(self, desfecho: Desfecho, codigo: int = 0, detalhe: str = '') -> ResultadoProtocolo:
+        """Gera o resultado com as fases registradas e o tempo total até agora"""
+        fases = self.fases
+        return ResultadoProtocolo(
+            desfecho,
+            codigo,
+            (time.perf_counter_ns() - self.inicio) / 1_000_000,
+            fases.get('dns'),
+            fases.get('conexao'),
+            fases.get('tls'),
+            fases.get('primeiro_byte'),
+            detalhe=detalhe
+        )
+
+
+# Cronômetro da sondagem em andamento em cada thread (usado pelas conexões urllib3)
+_sondagem_atual = threading.local()
+
+
+def _registrar_fase(fase: str, inicio_ns: int):
+    """Registra uma fase no cronômetro da sondagem da thread atual, se houver"""
+    cronometro = getattr(_sondagem_atual, 'cronometro', None)
+    if cronometro is not None:
+        cronometro.registrar(fase, inicio_ns)
+
+
+class _MedicaoFases:
+    """Mixin para conexões urllib3 que registra DNS, conexão TCP e primeiro byte"""
+    
+    def _new_conn(self):
+        try:
+            ipaddress.ip_address(self._dns_host)
+        except ValueError:
+            # Nome de host: resolve aqui para medir o DNS separado da conexão
+            inicio = time.perf_counter_ns()
+            try:
+                self._dns_host = socket.getaddrinfo(self._dns_host, self.port, socket.AF_INET,
+                                                    socket.SOCK_STREAM)[0][4][0]
+                _registrar_fase('dns', inicio)
+            except socket.gaierror:
+                pass  # O urllib3 reporta a falha de resolução ao conectar
+        
+        inicio = time.perf_counter_ns()
+        sock = super()._new_conn()
+        self._fim_conexao = time.perf_counter_ns()
+        _registrar_fase('conexao', inicio)
+        return sock
+    
+    def getresponse(self, *args, **kwargs):
+        # A requisição já foi enviada: mede até o status e os cabeçalhos chegarem
+        inicio = time.perf_counter_ns()
+        resposta = super().getresponse(*args, **kwargs)
+        _registrar_fase('primeiro_byte', inicio)
+        return resposta
+
+
+class _ConexaoHTTP(_MedicaoFases, HTTPConnection):
+    pass
+
+
+class _ConexaoHTTPS(_MedicaoFases, HTTPSConnection):
+    
+    def _new_conn(self):
+        sock = super()._new_conn()
+        # O handshake TLS usa o timeout do socket: troca o de conexão pelo de TLS
+        timeout_tls = getattr(_sondagem_atual, 'timeout_tls', None)
+        if timeout_tls is not None:
+            sock.settimeout(timeout_tls)
+        return sock
+    
+    def connect(self):
+        # connect() = _new_conn() (DNS + TCP) seguido do handshake TLS
+        super().connect()
+        _registrar_fase('tls', self._fim_conexao)
+
+
+class _PoolHTTP(HTTPConnectionPool):
+    ConnectionCls = _ConexaoHTTP
+
+
+class _PoolHTTPS(HTTPSConnectionPool):
+    ConnectionCls = _ConexaoHTTPS
+
+
+def criar_contexto_ssl(verificar_ssl: bool) -> ssl.SSLContext:
+    """
+    Cria um contexto SSL para ser compartilhado por todas as conexões.
+    
+    Sem um contexto próprio o urllib3 cria um novo (e carrega os certificados
+    do sistema) a cada conexão HTTPS, o que domina o custo de CPU das sondagens.
+    
+    Args:
+        verificar_ssl: Se o contexto deve verificar certificados
+        
+    Returns:
+        Contexto SSL pronto para uso
+    """
+    if verificar_ssl:
+        contexto = create_urllib3_context(cert_reqs=ssl.CERT_REQUIRED)
+        contexto.load_verify_locations(DEFAULT_CA_BUNDLE_PATH)
+        return contexto
+    
+    contexto = create_urllib3_context(cert_reqs=ssl.CERT_NONE)
+    contexto.check_hostname = False
+    return contexto
+
+
+class _AdaptadorHTTP(HTTPAdapter):
+    """HTTPAdapter que usa um contexto SSL pré-construído em todas as conexões"""
+    
+    def __init__(self, contexto_ssl: ssl.SSLContext, **kwargs):
+        # Precisa existir antes de HTTPAdapter.__init__ chamar init_poolmanager
+        self._contexto_ssl = contexto_ssl
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self._contexto_ssl
+        super().init_poolmanager(*args, **kwargs)
+        # Conexões que registram os tempos de cada fase da sondagem
+        self.poolmanager.pool_classes_by_scheme = {'http': _PoolHTTP, 'https': _PoolHTTPS}
+    
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        # As CAs já estão carregadas no contexto; evita recarregar o bundle a cada conexão
+        conn.ca_certs = None
+        conn.ca_cert_dir = None
+
+
+def _aguardar_escrita(sock: socket.socket, timeout: float) -> bool:
+    """
+    Espera um socket em connect não bloqueante terminar (com sucesso ou erro).
+    
+    Args:
+        sock: Socket com connect_ex em andamento
+        timeout: Tempo máximo de espera em segundos
+        
+    Returns:
+        True se o connect terminou, False se o tempo esgotou
+    """
+    if hasattr(select, 'poll'):
+        # poll não tem o limite de 1024 descritores do select
+        poller = select.poll()
+        poller.register(sock, select.POLLOUT)
+        return bool(poller.poll(timeout * 1000))
+    
+    # Windows: falha de connect é sinalizada no conjunto de exceções
+    _, gravaveis, com_erro = select.select([], [sock], [sock], timeout)
+    return bool(gravaveis or com_erro)
+
 
 class HTTPTester:
     """Classe responsável por testar conectividade HTTP/HTTPS em IPs"""
     
-    def __init__(self, porta: int = 8080, timeout: int = 5, verificar_ssl: bool = False):
+    def __init__(self, porta: int = 8080, timeout: int = 5, verificar_ssl: bool = False,
+                 protocolos_simultaneos: bool = True, max_workers: int = 50,
+                 pre_verificar_tcp: bool = False, farejar_protocolo: bool = False,
+                 timeout_adaptativo: Optional[TimeoutAdaptativo] = None,
+                 politica_timeout: Optional[PoliticaTimeout] = None,
+                 inferir_https: bool = False,
+                 limitador_taxa: Optional[LimitadorTaxa] = None):
         """
         Inicializa o testador HTTP.
         
@@ -22,86 +302,450 @@ class HTTPTester:
             porta: Porta de destino para os testes
             timeout: Timeout em segundos para as requisições
             verificar_ssl: Se deve verificar certificados SSL
+            protocolos_simultaneos: Se HTTP e HTTPS de um mesmo IP são testados ao
+                mesmo tempo (False mantém o modo sequencial, um socket por vez)
+            max_workers: Número de threads que chamam testar_ip em paralelo
+            pre_verificar_tcp: Se faz uma conexão TCP simples antes dos testes
+                HTTP/HTTPS; portas fechadas ou filtradas são resolvidas sem requests
+            farejar_protocolo: Se classifica a porta (TLS/HTTP) pela resposta a
+                um ClientHello TLS, com uma única conexão por porta; HTTPS é
+                concluído nessa conexão e HTTP usa a resposta ao ClientHello
+            timeout_adaptativo: Estimador opcional do timeout de conexão por
+                sub-rede (limitado ao timeout de conexão da política)
+            politica_timeout: Timeouts de conexão, TLS e leitura; sem ela,
+                timeout vale para as três fases
+            inferir_https: No modo sequencial, se não testa HTTPS quando a conexão
+                TCP do HTTP não se completou (o resultado é copiado e marcado inferido)
+            limitador_taxa: Limite global de conexões por segundo (compartilhável
+                entre testadores); cada conexão TCP aberta consome uma ficha
         """
         self.porta = porta
         self.timeout = timeout
+        self.politica = politica_timeout or PoliticaTimeout.unica(timeout)
         self.verificar_ssl = verificar_ssl
+        self.protocolos_simultaneos = protocolos_simultaneos
+        self.max_workers = max(1, max_workers)
+        self.pre_verificar_tcp = pre_verificar_tcp
+        self.farejar_protocolo = farejar_protocolo
+        self.timeout_adaptativo = timeout_adaptativo
+        self.inferir_https = inferir_https
+        self.limitador_taxa = limitador_taxa
+        self._executor_https: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        
+        # Contexto SSL único e uma Session por thread (sem estado compartilhado entre threads)
+        self._contexto_ssl = criar_contexto_ssl(verificar_ssl)
+        self._local = threading.local()
+        self._sessoes: List[requests.Session] = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.fechar()
+    
+    def fechar(self):
+        """Libera as threads auxiliares usadas no modo simultâneo e as Sessions"""
+        with self._lock:
+            if self._executor_https is not None:
+                self._executor_https.shutdown(wait=False)
+                self._executor_https = None
+            for sessao in self._sessoes:
+                sessao.close()
+            self._sessoes = []
+        self._local = threading.local()
+    
+    def _obter_sessao(self) -> requests.Session:
+        """Retorna a Session da thread atual, criando-a no primeiro uso"""
+        sessao = getattr(self._local, 'sessao', None)
+        if sessao is None:
+            sessao = requests.Session()
+            # Cada thread faz uma requisição por vez: um pool de 1 conexão por thread
+            # soma exatamente o número de workers, sem bloqueio entre threads
+            adaptador = _AdaptadorHTTP(
+                self._contexto_ssl,
+                pool_connections=1,
+                pool_maxsize=1,
+                max_retries=0
+            )
+            sessao.mount('http://', adaptador)
+            sessao.mount('https://', adaptador)
+            self._local.sessao = sessao
+            with self._lock:
+                self._sessoes.append(sessao)
+        return sessao
+    
+    def _timeout_conexao(self, ip: str, politica: PoliticaTimeout) -> float:
+        """Timeout da conexão TCP para o IP (adaptativo, se configurado)"""
+        if self.timeout_adaptativo is None:
+            return politica.conexao
+        return min(politica.conexao, self.timeout_adaptativo.timeout(ip))
+    
+    def _aguardar_vez(self):
+        """Respeita o limite de conexões por segundo antes de abrir um socket"""
+        if self.limitador_taxa is not None:
+            self.limitador_taxa.aguardar()
     
-    def testar_ip(self, ip: str) -> Dict[str, str]:
+    def _politica_ate(self, prazo_final: Optional[float]) -> Optional[PoliticaTimeout]:
+        """
+        Política de timeout limitada ao tempo que resta até prazo_final.
+        
+        Args:
+            prazo_final: Instante (time.perf_counter()) limite, ou None se não houver
+            
+        Returns:
+            Política a usar na próxima sondagem, ou None se o prazo já acabou
+        """
+        if prazo_final is None:
+            return self.politica
+        restante = prazo_final - time.perf_counter()
+        if restante <= 0:
+            return None
+        return self.politica.limitada(restante)
+    
+    def _aprender_rtt(self, ip: str, conexao_ms: Optional[float]):
+        """Alimenta o timeout adaptativo com a duração de uma conexão TCP bem-sucedida"""
+        if self.timeout_adaptativo is not None and conexao_ms is not None:
+            self.timeout_adaptativo.registrar(ip, conexao_ms / 1000)
+    
+    def _obter_executor_https(self) -> ThreadPoolExecutor:
+        """Cria sob demanda o pool que executa as sondagens HTTPS em paralelo às HTTP"""
+        with self._lock:
+            if self._executor_https is None:
+                # Uma thread auxiliar por worker: o HTTPS nunca espera na fila
+                self._executor_https = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='https'
+                )
+            return self._executor_https
+    
+    def testar_ip(self, ip: str, porta: Optional[int] = None,
+                  orcamento: Optional[float] = None) -> ResultadoTeste:
         """
         Testa conectividade HTTP e HTTPS para um IP específico.
         
         Args:
             ip: Endereço IPv4 a ser testado
+            porta: Porta de destino (padrão: a porta do testador)
+            orcamento: Segundos disponíveis para este teste (restante do prazo
+                do IP); as sondagens que não cabem são marcadas PRAZO_ESGOTADO
             
         Returns:
-            Dicionário com resultados dos testes HTTP e HTTPS
-            Formato: {'http': 'resultado', 'https': 'resultado'}
+            ResultadoTeste com os resultados dos testes HTTP e HTTPS
         """
-        resultados = {
-            'ip': ip,
-            'http': None,
-            'https': None
-        }
+        porta = porta or self.porta
+        prazo_final = None if orcamento is None else time.perf_counter() + orcamento
+        esgotado = ResultadoProtocolo(Desfecho.PRAZO_ESGOTADO)
+        
+        politica = self._politica_ate(prazo_final)
+        if politica is None:
+            return ResultadoTeste(ip, porta, esgotado, esgotado)
+        
+        if self.farejar_protocolo:
+            # Uma conexão por porta; já cobre o caso de porta fechada/filtrada
+            http, https = self._farejar_protocolo(ip, porta, politica)
+            return ResultadoTeste(ip, porta, http, https)
+        
+        if self.pre_verificar_tcp:
+            # Porta fechada/filtrada: o mesmo resultado vale para os dois protocolos
+            falha = self._verificar_porta(ip, porta, politica)
+            if falha is not None:
+                return ResultadoTeste(ip, porta, falha, falha)
+            politica = self._politica_ate(prazo_final)
+            if politica is None:
+                return ResultadoTeste(ip, porta, esgotado, esgotado)
+        
+        if self.protocolos_simultaneos:
+            # HTTPS roda em uma thread auxiliar enquanto HTTP roda nesta;
+            # o pior caso por IP passa a ser um timeout em vez de dois
+            future_https = self._obter_executor_https().submit(
+                self._testar_protocolo, ip, porta, 'https', politica
+            )
+            http = self._testar_protocolo(ip, porta, 'http', politica)
+            return ResultadoTeste(ip, porta, http, future_https.result())
         
         # Testa HTTP
-        resultados['http'] = self._testar_protocolo(ip, 'http')
+        http = self._testar_protocolo(ip, porta, 'http', politica)
         
-        # Testa HTTPS
-        resultados['https'] = self._testar_protocolo(ip, 'https')
+        # Sem conexão TCP no HTTP, a de HTTPS (mesmo IP e porta) falharia igual
+        if self.inferir_https:
+            https = inferir_resultado(http)
+            if https is not None:
+                return ResultadoTeste(ip, porta, http, https)
         
-        return resultados
+        # Testa HTTPS com o que restou do prazo
+        politica = self._politica_ate(prazo_final)
+        https = esgotado if politica is None else self._testar_protocolo(ip, porta, 'https', politica)
+        
+        return ResultadoTeste(ip, porta, http, https)
+    
+    def _verificar_porta(self, ip: str, porta: int,
+                         politica: PoliticaTimeout) -> Optional[ResultadoProtocolo]:
+        """
+        Pré-verificação: uma única conexão TCP não bloqueante a ip:porta.
+        
+        Args:
+            ip: Endereço IPv4
+            porta: Porta de destino
+            politica: Timeouts da sondagem (usa o de conexão)
+            
+        Returns:
+            None se a porta aceitou a conexão; caso contrário, o resultado
+            (RECUSADA, TIMEOUT, HOST_INALCANCAVEL...) para ambos os protocolos
+        """
+        self._aguardar_vez()
+        cronometro = Cronometro()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.setblocking(False)
+            codigo = sock.connect_ex((ip, porta))
+            
+            if codigo in _CONEXAO_EM_ANDAMENTO:
+                if not _aguardar_escrita(sock, self._timeout_conexao(ip, politica)):
+                    return cronometro.resultado(Desfecho.TIMEOUT)
+                codigo = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            
+            if codigo == 0:
+                cronometro.registrar('conexao', cronometro.inicio)
+                self._aprender_rtt(ip, cronometro.fases['conexao'])
+                return None
+            return cronometro.resultado(desfecho_por_errno(codigo))
+            
+        except OSError as e:
+            return cronometro.resultado(classificar_excecao(e) or Desfecho.ERRO_CONEXAO)
+            
+        finally:
+            sock.close()
     
-    def _testar_protocolo(self, ip: str, protocolo: str) -> str:
+    def _farejar_protocolo(self, ip: str, porta: int,
+                           politica: PoliticaTimeout) -> Tuple[ResultadoProtocolo, ResultadoProtocolo]:
+        """
+        Detecta HTTP ou HTTPS na porta usando uma única conexão TCP.
+        
+        Envia um ClientHello TLS e classifica a porta pelos primeiros bytes:
+        um registro TLS indica HTTPS (o handshake continua na mesma conexão e
+        um GET obtém o código; o HTTP fica PORTA_TLS, sem teste em texto
+        puro); qualquer outra resposta vem de um servidor em texto puro, que
+        respondeu ao ClientHello como requisição inválida. O código HTTP é o
+        da linha de status dessa resposta (geralmente 400), na mesma conexão;
+        respostas sem linha de status (só o corpo, como em HTTP/0.9) ficam OK
+        com código 0 ("OK (sem código)").
+        
+        Args:
+            ip: Endereço IPv4
+            porta: Porta de destino
+            politica: Timeouts de conexão, TLS e leitura
+            
+        Returns:
+            Tupla (resultado HTTP, resultado HTTPS)
+        """
+        self._aguardar_vez()
+        cronometro = Cronometro()
+        
+        def ambos(desfecho: Desfecho) -> Tuple[ResultadoProtocolo, ResultadoProtocolo]:
+            resultado = cronometro.resultado(desfecho)
+            return resultado, resultado
+        
+        try:
+            sock = socket.create_connection((ip, porta), timeout=self._timeout_conexao(ip, politica))
+            cronometro.registrar('conexao', cronometro.inicio)
+            self._aprender_rtt(ip, cronometro.fases['conexao'])
+        except OSError as e:
+            return ambos(classificar_excecao(e) or Desfecho.ERRO_CONEXAO)
+        
+        try:
+            entrada = ssl.MemoryBIO()
+            saida = ssl.MemoryBIO()
+            tls = self._contexto_ssl.wrap_bio(entrada, saida, server_hostname=ip)
+            try:
+                tls.do_handshake()
+            except ssl.SSLWantReadError:
+                pass
+            
+            # Metade do timeout de TLS para a resposta ao ClientHello; servidores em
+            # texto puro que esperam o fim dos cabeçalhos recebem "\r\n\r\n" e
+            # respondem em metade do timeout de leitura
+            sock.settimeout(politica.tls / 2)
+            envio = time.perf_counter_ns()
+            sock.sendall(saida.read())
+            try:
+                primeiros = sock.recv(4096)
+            except socket.timeout:
+                sock.settimeout(politica.leitura / 2)
+                sock.sendall(b"\r\n\r\n")
+                primeiros = sock.recv(4096)
+            
+            if not primeiros:
+                return ambos(Desfecho.ERRO_CONEXAO)
+            
+            if primeiros[0] in _REGISTROS_TLS and primeiros[1:2] == b'\x03':
+                sock.settimeout(politica.tls)
+                https = self._concluir_https(sock, tls, entrada, saida, primeiros, ip, porta,
+                                             cronometro, envio, politica.leitura)
+                http = ResultadoProtocolo(Desfecho.PORTA_TLS, total_ms=https.total_ms,
+                                          conexao_ms=https.conexao_ms)
+                return http, https
+            
+            # Texto puro: do envio do ClientHello (requisição inválida em HTTP) à resposta
+            cronometro.registrar('primeiro_byte', envio)
+            codigo = self._ler_codigo_status(sock, primeiros)
+            http = cronometro.resultado(Desfecho.OK, codigo or 0)
+            https = ResultadoProtocolo(Desfecho.ERRO_SSL, total_ms=http.total_ms,
+                                       conexao_ms=http.conexao_ms)
+            return http, https
+            
+        except OSError as e:
+            return ambos(classificar_excecao(e) or Desfecho.ERRO_CONEXAO)
+            
+        finally:
+            sock.close()
+    
+    @staticmethod
+    def _ler_codigo_status(sock: socket.socket, recebidos: bytes) -> Optional[int]:
+        """
+        Completa a primeira linha da resposta já iniciada e extrai o código HTTP.
+        
+        Args:
+            sock: Conexão do farejamento (com o timeout de leitura já definido)
+            recebidos: Primeiros bytes já lidos do servidor
+            
+        Returns:
+            Código HTTP, ou None se a resposta não tiver linha de status
+            (ex.: servidores HTTP/0.9) ou a conexão falhar antes do fim da linha
+        """
+        resposta = recebidos
+        try:
+            while b'\n' not in resposta and len(resposta) < 4096:
+                dados = sock.recv(4096)
+                if not dados:
+                    break
+                resposta += dados
+        except OSError:
+            return None
+        return extrair_codigo_status(resposta.split(b'\n', 1)[0])
+    
+    def _concluir_https(self, sock: socket.socket, tls: ssl.SSLObject, entrada: ssl.MemoryBIO,
+                        saida: ssl.MemoryBIO, recebidos: bytes, ip: str, porta: int,
+                        cronometro: Cronometro, inicio_tls: int,
+                        timeout_leitura: float) -> ResultadoProtocolo:
+        """
+        Termina o handshake TLS iniciado pelo farejamento e lê o código HTTP.
+        
+        Args:
+            sock: Conexão TCP já aberta
+            tls: Objeto SSL ligado às BIOs de memória
+            entrada: BIO com os bytes recebidos do servidor
+            saida: BIO com os bytes a enviar ao servidor
+            recebidos: Primeiros bytes já lidos do servidor
+            ip: Endereço IPv4 (usado no cabeçalho Host)
+            porta: Porta de destino (usada no cabeçalho Host)
+            cronometro: Cronômetro da sondagem (recebe as fases TLS e primeiro byte)
+            inicio_tls: time.perf_counter_ns() no envio do ClientHello
+            timeout_leitura: Timeout da resposta ao GET, após o handshake
+            
+        Returns:
+            Resultado OK (com o código) ou o desfecho da falha
+        """
+        def trocar_dados():
+            pendente = saida.read()
+            if pendente:
+                sock.sendall(pendente)
+            dados = sock.recv(16384)
+            if not dados:
+                raise ConnectionResetError("Conexão encerrada pelo servidor")
+            entrada.write(dados)
+        
+        entrada.write(recebidos)
+        try:
+            while True:
+                try:
+                    tls.do_handshake()
+                    break
+                except ssl.SSLWantReadError:
+                    trocar_dados()
+            cronometro.registrar('tls', inicio_tls)
+            
+            sock.settimeout(timeout_leitura)
+            envio = time.perf_counter_ns()
+            tls.write(
+                f"GET / HTTP/1.1\r\nHost: {ip}:{porta}\r\n"
+                f"Connection: close\r\n\r\n".encode('ascii')
+            )
+            resposta = b''
+            while b'\r\n' not in resposta:
+                try:
+                    resposta += tls.read(4096)
+                except ssl.SSLWantReadError:
+                    trocar_dados()
+                except ssl.SSLZeroReturnError:
+                    break
+            
+        except OSError as e:
+            # Inclui ssl.SSLError (ERRO_SSL) e timeouts de socket
+            return cronometro.resultado(classificar_excecao(e) or Desfecho.ERRO_CONEXAO)
+        
+        codigo = extrair_codigo_status(resposta.split(b'\r\n', 1)[0])
+        if codigo is None:
+            return cronometro.resultado(Desfecho.ERRO_CONEXAO)
+        cronometro.registrar('primeiro_byte', envio)
+        return cronometro.resultado(Desfecho.OK, codigo)
+    
+    def _testar_protocolo(self, ip: str, porta: int, protocolo: str,
+                          politica: Optional[PoliticaTimeout] = None) -> ResultadoProtocolo:
         """
         Testa um protocolo específico (HTTP ou HTTPS) para um IP.
         
         Args:
             ip: Endereço IPv4
+            porta: Porta de destino
             protocolo: 'http' ou 'https'
+            politica: Timeouts de conexão, TLS e leitura (padrão: a do testador)
             
         Returns:
-            String descrevendo o resultado do teste
+            ResultadoProtocolo com o desfecho, o código HTTP e os tempos de cada fase
         """
-        url = f"{protocolo}://{ip}:{self.porta}"
+        url = f"{protocolo}://{ip}:{porta}"
+        politica = politica or self.politica
+        self._aguardar_vez()
+        cronometro = Cronometro()
+        _sondagem_atual.cronometro = cronometro
+        _sondagem_atual.timeout_tls = politica.tls
         
         try:
-            resposta = requests.get(
+            # stream=True: só o status interessa, o corpo não é baixado
+            with self._obter_sessao().get(
                 url,
-                timeout=self.timeout,
+                timeout=(self._timeout_conexao(ip, politica), politica.leitura),
                 verify=self.verificar_ssl,
-                allow_redirects=False
-            )
+                allow_redirects=False,
+                stream=True
+            ) as resposta:
+                # Sucesso - retorna código HTTP
+                return cronometro.resultado(Desfecho.OK, resposta.status_code)
             
-            # Sucesso - retorna código HTTP
-            return f"OK ({resposta.status_code})"
+        except requests.exceptions.Timeout as e:
+            desfecho = classificar_excecao(e) or Desfecho.TIMEOUT
             
-        except requests.exceptions.ConnectTimeout:
-            return "Timeout"
+        except requests.exceptions.SSLError as e:
+            desfecho = classificar_excecao(e) or Desfecho.ERRO_SSL
             
         except requests.exceptions.ConnectionError as e:
-            # Tenta identificar o tipo específico de erro de conexão
-            erro_str = str(e).lower()
-            if 'refused' in erro_str or 'connection refused' in erro_str:
-                return "Conexão recusada"
-            elif 'timed out' in erro_str or 'timeout' in erro_str:
-                return "Timeout"
-            else:
-                return "Erro de conexão"
-            
-        except requests.exceptions.SSLError:
-            return "Erro SSL"
-            
-        except requests.exceptions.Timeout:
-            return "Timeout"
+            # Identifica o erro pela causa original (errno, SSL), não pelo texto da mensagem
+            desfecho = classificar_excecao(e) or Desfecho.ERRO_CONEXAO
             
         except requests.exceptions.TooManyRedirects:
-            return "Muitos redirecionamentos"
+            desfecho = Desfecho.MUITOS_REDIRECIONAMENTOS
             
         except Exception as e:
-            # Captura outros erros genéricos
-            tipo_erro = type(e).__name__
-            return f"Erro: {tipo_erro}"
+            # Captura outros erros genéricos, guardando o tipo ("Erro: <tipo>")
+            return cronometro.resultado(Desfecho.ERRO, detalhe=type(e).__name__)
+            
+        finally:
+            _sondagem_atual.cronometro = None
+            _sondagem_atual.timeout_tls = None
+            self._aprender_rtt(ip, cronometro.fases.get('conexao'))
+        
+        return cronometro.resultado(desfecho)
     
     def testar_multiplos_ips(self, ips: list) -> list:
         """
@@ -112,7 +756,7 @@ class HTTPTester:
             ips: Lista de endereços IPv4
             
         Returns:
-            Lista de dicionários com resultados
+            Lista de ResultadoTeste
         """
         resultados = []
         for ip in ips:
@@ -0,0 +1,171 @@
+"""
+Histórico de portas que responderam, usado para ordenar os testes por IP
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from services.probe_result import ResultadoTeste
+from utils.result_writer import ler_resultados
+
+# IPs com a última porta que respondeu; os vistos há mais tempo saem primeiro
+MAX_IPS = 200000
+
+
+class HistoricoPortas:
+    """
+    Estatísticas de portas que responderam em execuções anteriores.
+    
+    Guarda quantas vezes cada porta respondeu e a última porta que respondeu
+    em cada IP (no máximo max_ips IPs, os mais recentes). As fontes são os
+    arquivos de resultados anteriores (CSV ou JSON Lines) e um arquivo JSON
+    local atualizado a cada execução.
+    """
+    
+    def __init__(self, caminho_arquivo: Optional[str] = None, max_ips: int = MAX_IPS):
+        """
+        Inicializa o histórico.
+        
+        Args:
+            caminho_arquivo: Arquivo JSON onde o histórico é persistido
+            max_ips: Máximo de IPs com a última porta guardada; ao passar do
+                limite, o IP anotado há mais tempo é esquecido
+        """
+        self.caminho_arquivo = caminho_arquivo
+        self.max_ips = max(1, max_ips)
+        self._contagem: Dict[int, int] = {}
+        # IP -> última porta que respondeu, do anotado há mais tempo ao mais recente
+        self._porta_por_ip: 'OrderedDict[str, int]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def inicializar(self, padroes_csv: Iterable[str], porta_padrao: Optional[int] = None):
+        """
+        Carrega o histórico local; sem ele, aprende com os resultados anteriores.
+        
+        O arquivo local já acumula os resultados das execuções anteriores, por
+        isso os CSVs só são lidos na primeira vez (evita contar a mesma linha duas vezes).
+        
+        Args:
+            padroes_csv: Padrões glob dos arquivos de resultados anteriores
+            porta_padrao: Porta das linhas de CSVs sem a coluna Porta
+        """
+        if self.caminho_arquivo and os.path.exists(self.caminho_arquivo):
+            self.carregar()
+        else:
+            self.carregar_csvs(padroes_csv, porta_padrao)
+    
+    def carregar(self):
+        """Carrega o histórico salvo em caminho_arquivo, se existir"""
+        if not self.caminho_arquivo or not os.path.exists(self.caminho_arquivo):
+            return
+        
+        try:
+            with open(self.caminho_arquivo, 'r', encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Histórico de portas ignorado ({self.caminho_arquivo}): {str(e)}")
+            return
+        
+        with self._lock:
+            for porta, quantidade in dados.get('portas', {}).items():
+                self._contagem[int(porta)] = self._contagem.get(int(porta), 0) + int(quantidade)
+            for ip, porta in dados.get('ips', {}).items():
+                self._guardar_porta(ip, int(porta))
+    
+    def carregar_csvs(self, padroes: Iterable[str], porta_padrao: Optional[int] = None) -> int:
+        """
+        Aprende com arquivos de resultados anteriores (CSV ou JSON Lines).
+        
+        CSVs sem a coluna Porta (exportações antigas, de uma só porta) valem
+        para porta_padrao, como na comparação entre varreduras; sem
+        porta_padrao, são ignorados.
+        
+        Args:
+            padroes: Padrões glob (ex.: "resultados_*.csv")
+            porta_padrao: Porta das linhas de CSVs sem a coluna Porta
+        
+        Returns:
+            Quantidade de linhas com resposta aproveitadas
+        """
+        aproveitadas = 0
+        caminhos = sorted({caminho for padrao in padroes for caminho in glob.glob(padrao)},
+                          key=os.path.getmtime)
+        
+        # Do mais antigo para o mais recente: a última porta vista por IP prevalece
+        for caminho in caminhos:
+            try:
+                for resultado in ler_resultados(caminho, porta_padrao=porta_padrao):
+                    if resultado.respondeu:
+                        self._anotar(resultado.ip, resultado.porta)
+                        aproveitadas += 1
+            except (OSError, ValueError, KeyError) as e:
+                # Sem a coluna Porta (e sem porta_padrao), colunas faltando ou linha inválida
+                logging.warning(f"Resultados anteriores ignorados ({caminho}): {str(e)}")
+        
+        return aproveitadas
+    
+    def _guardar_porta(self, ip: str, porta: int):
+        """Guarda a última porta do IP, esquecendo o IP mais antigo além de max_ips"""
+        self._porta_por_ip[ip] = porta
+        self._porta_por_ip.move_to_end(ip)
+        if len(self._porta_por_ip) > self.max_ips:
+            self._porta_por_ip.popitem(last=False)
+    
+    def _anotar(self, ip: str, porta: int):
+        """Registra que a porta respondeu no IP"""
+        with self._lock:
+            self._contagem[porta] = self._contagem.get(porta, 0) + 1
+            self._guardar_porta(ip, porta)
+    
+    def registrar(self, resultado: ResultadoTeste):
+        """
+        Atualiza o histórico com um resultado de teste.
+        
+        Args:
+            resultado: Resultado do teste de um par (IP, porta)
+        """
+        if resultado.respondeu:
+            self._anotar(resultado.ip, resultado.porta)
+    
+    def ordenar_portas(self, ip: str, portas: List[int]) -> List[int]:
+        """
+        Ordena as portas pela chance de resposta no IP.
+        
+        A última porta que respondeu no IP vem primeiro; as demais seguem a
+        contagem global. Empates mantêm a ordem informada.
+        
+        Args:
+            ip: Endereço IPv4
+            portas: Portas configuradas
+        
+        Returns:
+            Nova lista com as mesmas portas, reordenadas
+        """
+        with self._lock:
+            preferida = self._porta_por_ip.get(ip)
+            chaves = {porta: (porta != preferida, -self._contagem.get(porta, 0)) for porta in portas}
+        return sorted(portas, key=chaves.__getitem__)
+    
+    def salvar(self):
+        """Grava o histórico em caminho_arquivo"""
+        if not self.caminho_arquivo:
+            return
+        
+        with self._lock:
+            dados = {
+                'portas': {str(porta): quantidade for porta, quantidade in self._contagem.items()},
+                'ips': dict(self._porta_por_ip)
+            }
+        
+        try:
+            temporario = f"{self.caminho_arquivo}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump(dados, arquivo)
+            os.replace(temporario, self.caminho_arquivo)
+        except OSError as e:
+            logging.error(f"Erro ao salvar histórico de portas: {str(e)}")
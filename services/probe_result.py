@@ -0,0 +1,317 @@
+"""
+Tipos de resultado dos testes de conectividade
+"""
+
+import math
+import struct
+import sys
+from enum import IntEnum
+from typing import Dict, List, NamedTuple, Optional
+
+
+class Desfecho(IntEnum):
+    """Desfecho de uma sondagem HTTP ou HTTPS"""
+    OK = 0
+    TIMEOUT = 1
+    RECUSADA = 2
+    ERRO_SSL = 3
+    ERRO_CONEXAO = 4
+    MUITOS_REDIRECIONAMENTOS = 5
+    ERRO = 6
+    HOST_INALCANCAVEL = 7
+    REDE_INALCANCAVEL = 8
+    PRAZO_ESGOTADO = 9  # não testado: o prazo total do IP acabou
+    RECURSO_LOCAL = 10  # falha no próprio host (descritores, portas efêmeras)
+    PORTA_TLS = 11  # não testado em texto puro: a porta respondeu com TLS (--farejar)
+
+
+class StatusGeral(IntEnum):
+    """Status consolidado de um par (IP, porta); a ordem é a de exibição"""
+    OK = 0
+    TIMEOUT = 1
+    ERRO = 2
+
+
+# Tempos das fases empacotados em float32 (dns, conexão, TLS, 1º byte, total);
+# NaN marca a fase que não ocorreu
+_TEMPOS = struct.Struct('<5f')
+
+
+class _CamposProtocolo(NamedTuple):
+    desfecho: Desfecho
+    codigo: int = 0  # código HTTP; 0 quando não houve resposta
+    inferido: bool = False  # não sondado: deduzido da falha TCP do outro protocolo
+    detalhe: str = ''  # tipo da exceção quando o desfecho é ERRO
+    tempos: Optional[bytes] = None  # _TEMPOS empacotado; None sem nenhuma fase
+
+
+class ResultadoProtocolo(_CamposProtocolo):
+    """
+    Resultado de uma sondagem (HTTP ou HTTPS).
+    
+    Os tempos estão em milissegundos; fases que não ocorreram (DNS para IPs
+    literais, TLS em HTTP, fases após uma falha) ficam None. Milhões destes
+    registros ficam em memória numa varredura grande: os cinco tempos são
+    guardados num único bytes de 20 bytes (float32, precisão muito abaixo de
+    0,1 ms) e resultados sem tempos são instâncias compartilhadas.
+    """
+    __slots__ = ()
+    
+    def __new__(cls, desfecho: Desfecho, codigo: int = 0, total_ms: Optional[float] = None,
+                dns_ms: Optional[float] = None, conexao_ms: Optional[float] = None,
+                tls_ms: Optional[float] = None, primeiro_byte_ms: Optional[float] = None,
+                inferido: bool = False, detalhe: str = ''):
+        fases = (dns_ms, conexao_ms, tls_ms, primeiro_byte_ms, total_ms)
+        if fases.count(None) == len(fases):
+            chave = (desfecho, codigo, inferido, detalhe)
+            resultado = _SEM_TEMPOS.get(chave)
+            if resultado is None:
+                resultado = super().__new__(cls, desfecho, codigo, inferido, sys.intern(detalhe))
+                _SEM_TEMPOS[chave] = resultado
+            return resultado
+        tempos = _TEMPOS.pack(*(math.nan if valor is None else valor for valor in fases))
+        return super().__new__(cls, desfecho, codigo, inferido, sys.intern(detalhe), tempos)
+    
+    def __getnewargs__(self):
+        # Os argumentos de __new__ não são os campos da tupla (pickle entre processos)
+        return (self.desfecho, self.codigo, self.total_ms, self.dns_ms, self.conexao_ms,
+                self.tls_ms, self.primeiro_byte_ms, self.inferido, self.detalhe)
+    
+    def _fase(self, indice: int) -> Optional[float]:
+        if self.tempos is None:
+            return None
+        valor = _TEMPOS.unpack(self.tempos)[indice]
+        return None if math.isnan(valor) else valor
+    
+    @property
+    def dns_ms(self) -> Optional[float]:
+        return self._fase(0)
+    
+    @property
+    def conexao_ms(self) -> Optional[float]:
+        return self._fase(1)
+    
+    @property
+    def tls_ms(self) -> Optional[float]:
+        return self._fase(2)
+    
+    @property
+    def primeiro_byte_ms(self) -> Optional[float]:
+        """Da requisição enviada ao início da resposta"""
+        return self._fase(3)
+    
+    @property
+    def total_ms(self) -> Optional[float]:
+        return self._fase(4)
+    
+    @property
+    def ok(self) -> bool:
+        return self.desfecho == Desfecho.OK
+
+
+# Resultados sem tempos (cache, relatórios lidos, inferidos), por
+# (desfecho, código, inferido, detalhe): poucas combinações possíveis
+_SEM_TEMPOS: Dict[tuple, ResultadoProtocolo] = {}
+
+
+class ResultadoTeste(NamedTuple):
+    """Resultado dos testes HTTP e HTTPS de um IP em uma porta"""
+    ip: str
+    porta: int
+    http: ResultadoProtocolo
+    https: ResultadoProtocolo
+    
+    @property
+    def respondeu(self) -> bool:
+        """Indica se algum dos protocolos respondeu"""
+        return self.http.desfecho == Desfecho.OK or self.https.desfecho == Desfecho.OK
+
+
+# Textos exibidos ao usuário (CSV, console, web e desktop)
+_TEXTOS_DESFECHO = {
+    Desfecho.OK: "OK",
+    Desfecho.TIMEOUT: "Timeout",
+    Desfecho.RECUSADA: "Conexão recusada",
+    Desfecho.ERRO_SSL: "Erro SSL",
+    Desfecho.ERRO_CONEXAO: "Erro de conexão",
+    Desfecho.MUITOS_REDIRECIONAMENTOS: "Muitos redirecionamentos",
+    Desfecho.ERRO: "Erro",
+    Desfecho.HOST_INALCANCAVEL: "Host inalcançável",
+    Desfecho.REDE_INALCANCAVEL: "Rede inalcançável",
+    Desfecho.PRAZO_ESGOTADO: "Prazo esgotado",
+    Desfecho.RECURSO_LOCAL: "Recurso local esgotado",
+    Desfecho.PORTA_TLS: "Porta TLS",
+}
+
+_TEXTOS_STATUS = {
+    StatusGeral.OK: "OK",
+    StatusGeral.TIMEOUT: "Timeout",
+    StatusGeral.ERRO: "Error",
+}
+
+_DESFECHO_POR_TEXTO = {texto: desfecho for desfecho, texto in _TEXTOS_DESFECHO.items()}
+
+# Desfechos contados como "Timeout" no status consolidado
+_SEM_RESPOSTA_NO_PRAZO = {Desfecho.TIMEOUT, Desfecho.PRAZO_ESGOTADO}
+
+# Falhas antes do fim da conexão TCP: valem para HTTP e HTTPS no mesmo IP e porta
+_FALHAS_TCP = {Desfecho.TIMEOUT, Desfecho.HOST_INALCANCAVEL, Desfecho.REDE_INALCANCAVEL}
+
+_SUFIXO_INFERIDO = " (inferido)"
+
+# Fases cronometradas: (campo de ResultadoProtocolo, rótulo exibido)
+FASES = (
+    ('dns_ms', 'DNS'),
+    ('conexao_ms', 'Conexão'),
+    ('tls_ms', 'TLS'),
+    ('primeiro_byte_ms', '1º byte'),
+    ('total_ms', 'Total'),
+)
+
+
+def status_geral(resultado: ResultadoTeste) -> StatusGeral:
+    """
+    Consolida os resultados HTTP e HTTPS de um par (IP, porta).
+    
+    Args:
+        resultado: Resultado do teste
+    
+    Returns:
+        OK se algum protocolo respondeu, TIMEOUT se ambos expiraram (ou
+        ficaram sem prazo), ERRO caso contrário
+    """
+    if (resultado.http.desfecho in _SEM_RESPOSTA_NO_PRAZO
+            and resultado.https.desfecho in _SEM_RESPOSTA_NO_PRAZO):
+        return StatusGeral.TIMEOUT
+    if not resultado.respondeu:
+        return StatusGeral.ERRO
+    return StatusGeral.OK
+
+
+def inferir_resultado(resultado: ResultadoProtocolo) -> Optional[ResultadoProtocolo]:
+    """
+    Deduz o resultado do outro protocolo a partir de uma falha na camada TCP.
+    
+    HTTP e HTTPS no mesmo IP e porta abrem a mesma conexão TCP: se ela não se
+    completou (timeout de conexão, host ou rede inalcançável), a segunda
+    sondagem teria o mesmo desfecho após esperar outro timeout.
+    
+    Args:
+        resultado: Resultado da primeira sondagem
+    
+    Returns:
+        Resultado marcado como inferido, ou None se a conexão TCP chegou a ser
+        estabelecida (ou falhou de outro modo) e o outro protocolo precisa ser testado
+    """
+    if resultado.desfecho in _FALHAS_TCP and resultado.conexao_ms is None:
+        return ResultadoProtocolo(resultado.desfecho, inferido=True)
+    return None
+
+
+def formatar_protocolo(resultado: ResultadoProtocolo) -> str:
+    """
+    Gera o texto exibido para uma sondagem (ex.: "OK (200)", "Timeout").
+    
+    Args:
+        resultado: Resultado da sondagem
+    
+    Returns:
+        Texto localizado; resultados inferidos terminam em " (inferido)",
+        respostas sem linha de status HTTP são "OK (sem código)" e erros
+        genéricos trazem o tipo da exceção ("Erro: ValueError")
+    """
+    if resultado.desfecho == Desfecho.OK:
+        return f"OK ({resultado.codigo or 'sem código'})"
+    if resultado.desfecho == Desfecho.ERRO and resultado.detalhe:
+        return f"Erro: {resultado.detalhe}"
+    texto = _TEXTOS_DESFECHO[resultado.desfecho]
+    return texto + _SUFIXO_INFERIDO if resultado.inferido else texto
+
+
+def formatar_ms(valor: Optional[float]) -> str:
+    """Formata um tempo em ms com uma casa decimal (vazio se a fase não ocorreu)"""
+    return '' if valor is None else f"{valor:.1f}"
+
+
+def formatar_tempos(resultado: ResultadoProtocolo) -> str:
+    """
+    Resume os tempos de uma sondagem em uma linha (ex.: "Conexão 1.2 | Total 3.4").
+    
+    Args:
+        resultado: Resultado da sondagem
+    
+    Returns:
+        Texto com as fases que ocorreram, em ms
+    """
+    return ' | '.join(
+        f"{rotulo} {getattr(resultado, campo):.1f}"
+        for campo, rotulo in FASES
+        if getattr(resultado, campo) is not None
+    )
+
+
+def tempos_ms(resultado: ResultadoProtocolo) -> Dict[str, Optional[float]]:
+    """
+    Tempos das fases para serialização (ex.: JSON da API web).
+    
+    Args:
+        resultado: Resultado da sondagem
+    
+    Returns:
+        Dicionário {'dns', 'conexao', 'tls', 'primeiro_byte', 'total'} em ms
+    """
+    return {
+        campo[:-3]: None if getattr(resultado, campo) is None else round(getattr(resultado, campo), 1)
+        for campo, _ in FASES
+    }
+
+
+def campos_tempos(prefixo: str) -> List[str]:
+    """Nomes das colunas CSV com os tempos de um protocolo (ex.: "HTTPS TLS (ms)")"""
+    return [f"{prefixo} {rotulo} (ms)" for _, rotulo in FASES]
+
+
+def colunas_tempos(prefixo: str, resultado: ResultadoProtocolo) -> Dict[str, str]:
+    """
+    Valores das colunas CSV de tempos de um protocolo.
+    
+    Args:
+        prefixo: "HTTP" ou "HTTPS"
+        resultado: Resultado da sondagem
+    
+    Returns:
+        Dicionário {coluna: tempo formatado}, com as chaves de campos_tempos(prefixo)
+    """
+    return {
+        f"{prefixo} {rotulo} (ms)": formatar_ms(getattr(resultado, campo))
+        for campo, rotulo in FASES
+    }
+
+
+def formatar_status(status: StatusGeral) -> str:
+    """Gera o texto exibido para o status consolidado"""
+    return _TEXTOS_STATUS[status]
+
+
+def interpretar_texto(texto: str) -> ResultadoProtocolo:
+    """
+    Converte o texto de um relatório CSV de volta em ResultadoProtocolo.
+    
+    Args:
+        texto: Texto gerado por formatar_protocolo (ou por versões anteriores)
+    
+    Returns:
+        Resultado equivalente (sem tempos)
+    """
+    texto = (texto or '').strip()
+    inferido = texto.endswith(_SUFIXO_INFERIDO)
+    if inferido:
+        texto = texto[:-len(_SUFIXO_INFERIDO)]
+    if texto.startswith('OK'):
+        codigo = texto[2:].strip(' ()')
+        return ResultadoProtocolo(Desfecho.OK, int(codigo) if codigo.isdigit() else 0)
+    if texto.startswith('Erro: '):
+        return ResultadoProtocolo(Desfecho.ERRO, detalhe=texto[len('Erro: '):])
+    # Textos desconhecidos viram ERRO
+    desfecho = _DESFECHO_POR_TEXTO.get(texto, Desfecho.ERRO)
+    return ResultadoProtocolo(desfecho, inferido=inferido)
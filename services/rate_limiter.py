@@ -0,0 +1,205 @@
+"""
+Controle de ritmo da varredura: taxa global de conexões, limite de sondagens
+simultâneas por sub-rede e intercalação dos alvos entre sub-redes
+"""
+
+import asyncio
+import ipaddress
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, Iterator, Optional
+
+from services.timeouts import PREFIXO_PADRAO
+
+# Sub-redes alternadas ao mesmo tempo na intercalação (um /16 inteiro em /24)
+SUB_REDES_INTERCALADAS = 256
+
+# IPs lidos à frente e guardados durante a intercalação
+IPS_EM_INTERCALACAO = 65536
+
+
+def sub_rede(ip: str, prefixo: int = PREFIXO_PADRAO) -> int:
+    """Identificador da sub-rede do IP (endereço deslocado pelo tamanho do prefixo)"""
+    return int(ipaddress.IPv4Address(ip)) >> (32 - prefixo)
+
+
+def intercalar_sub_redes(ips: Iterable[str], prefixo: int = PREFIXO_PADRAO,
+                         max_sub_redes: int = SUB_REDES_INTERCALADAS,
+                         max_ips: int = IPS_EM_INTERCALACAO) -> Iterator[str]:
+    """
+    Reordena IPs alternando entre sub-redes (round-robin), lendo aos poucos.
+    
+    Listas ordenadas concentram IPs vizinhos, atrás do mesmo concentrador;
+    intercalando, workers consecutivos atingem sub-redes diferentes. Cada
+    sub-rede lida vira uma fila, e as filas são percorridas em rodízio, um IP
+    de cada vez; uma fila que esvazia dá lugar à próxima sub-rede da lista.
+    Ficam em memória no máximo max_sub_redes filas e max_ips IPs, qualquer
+    que seja o tamanho da lista: um /16 denso é percorrido alternando entre
+    os seus 256 /24.
+    
+    Args:
+        ips: Endereços IPv4 (lista ou iterável), de preferência ordenados
+        prefixo: Tamanho do prefixo que define a sub-rede
+        max_sub_redes: Sub-redes alternadas ao mesmo tempo
+        max_ips: IPs lidos à frente
+    
+    Yields:
+        Os mesmos IPs, mantendo a ordem original dentro de cada sub-rede
+    """
+    iterador = iter(ips)
+    filas = deque()  # sub-redes com IPs pendentes, na ordem do rodízio
+    pendentes: Dict[int, deque] = {}  # sub-rede -> IPs ainda não entregues
+    guardados = 0
+    esgotado = False
+    while True:
+        while not esgotado and len(filas) < max_sub_redes and guardados < max_ips:
+            ip = next(iterador, None)
+            if ip is None:
+                esgotado = True
+                break
+            rede = sub_rede(ip, prefixo)
+            fila = pendentes.get(rede)
+            if fila is None:
+                fila = pendentes[rede] = deque()
+                filas.append(rede)
+            fila.append(ip)
+            guardados += 1
+        if not filas:
+            return
+        rede = filas.popleft()
+        fila = pendentes[rede]
+        yield fila.popleft()
+        guardados -= 1
+        if fila:
+            filas.append(rede)
+        else:
+            del pendentes[rede]
+
+
+class LimitadorTaxa:
+    """
+    Balde de fichas (token bucket) global de conexões por segundo.
+    
+    Cada conexão TCP consome uma ficha; o balde é reabastecido a `taxa`
+    fichas por segundo, até `rajada` fichas acumuladas. Seguro entre threads;
+    o motor asyncio usa reservar() e espera com asyncio.sleep.
+    """
+    
+    def __init__(self, taxa: float, rajada: Optional[int] = None):
+        """
+        Inicializa o limitador.
+        
+        Args:
+            taxa: Conexões por segundo (média)
+            rajada: Conexões que podem ser abertas de uma vez após um período
+                ocioso (padrão: um segundo de taxa)
+        """
+        if taxa <= 0:
+            raise ValueError("A taxa deve ser positiva")
+        self.taxa = taxa
+        self.capacidade = max(1, rajada or math.ceil(taxa))
+        self._fichas = float(self.capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reservar(self) -> float:
+        """
+        Reserva uma ficha.
+        
+        Returns:
+            Segundos a aguardar antes de abrir a conexão (0 se havia ficha).
+            O saldo pode ficar negativo: quem reserva depois espera mais, e a
+            ordem de chegada é preservada
+        """
+        with self._lock:
+            agora = time.monotonic()
+            self._fichas = min(self.capacidade, self._fichas + (agora - self._ultimo) * self.taxa)
+            self._ultimo = agora
+            self._fichas -= 1
+            if self._fichas >= 0:
+                return 0.0
+            return -self._fichas / self.taxa
+    
+    def aguardar(self):
+        """Bloqueia a thread até a vez da próxima conexão"""
+        espera = self.reservar()
+        if espera > 0:
+            time.sleep(espera)
+
+
+class LimitadorSubRedes:
+    """
+    Limita as sondagens simultâneas em cada sub-rede (threads).
+    
+    Não bloqueia: quem submete as tarefas (executar_em_janela) consulta
+    tentar_ocupar() e adia as tarefas de uma sub-rede lotada, em vez de
+    deixá-las paradas nas threads do executor à espera de vaga. Usado só pela
+    thread que submete as tarefas.
+    """
+    
+    def __init__(self, limite: int, prefixo: int = PREFIXO_PADRAO):
+        """
+        Inicializa o limitador.
+        
+        Args:
+            limite: Máximo de sondagens ao mesmo tempo em uma sub-rede
+            prefixo: Tamanho do prefixo que define a sub-rede
+        """
+        self.limite = max(1, limite)
+        self.prefixo = prefixo
+        # Só sub-redes com sondagens em andamento ficam no dicionário
+        self._ativos: Dict[int, int] = {}
+    
+    def tentar_ocupar(self, ip: str) -> bool:
+        """
+        Ocupa uma vaga na sub-rede do IP, se houver.
+        
+        Returns:
+            True se a vaga foi ocupada (devolvê-la com liberar()), False se a
+            sub-rede já está no limite
+        """
+        chave = sub_rede(ip, self.prefixo)
+        ativos = self._ativos.get(chave, 0)
+        if ativos >= self.limite:
+            return False
+        self._ativos[chave] = ativos + 1
+        return True
+    
+    def liberar(self, ip: str):
+        """Devolve a vaga ocupada por tentar_ocupar()"""
+        self._liberar(sub_rede(ip, self.prefixo))
+    
+    def _liberar(self, chave: int):
+        restantes = self._ativos[chave] - 1
+        if restantes:
+            self._ativos[chave] = restantes
+        else:
+            del self._ativos[chave]
+
+
+class LimitadorSubRedesAsync(LimitadorSubRedes):
+    """Limita as sondagens simultâneas em cada sub-rede (asyncio)"""
+    
+    def __init__(self, limite: int, prefixo: int = PREFIXO_PADRAO):
+        super().__init__(limite, prefixo)
+        # Criada no loop de eventos, na primeira sondagem
+        self._condicao_async: Optional[asyncio.Condition] = None
+    
+    @asynccontextmanager
+    async def ocupar(self, ip: str):
+        """Aguarda uma vaga na sub-rede do IP e a mantém durante o bloco async with"""
+        if self._condicao_async is None:
+            self._condicao_async = asyncio.Condition()
+        chave = sub_rede(ip, self.prefixo)
+        async with self._condicao_async:
+            await self._condicao_async.wait_for(lambda: self._ativos.get(chave, 0) < self.limite)
+            self._ativos[chave] = self._ativos.get(chave, 0) + 1
+        try:
+            yield
+        finally:
+            async with self._condicao_async:
+                self._liberar(chave)
+                self._condicao_async.notify_all()
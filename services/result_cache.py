@@ -0,0 +1,236 @@
+"""
+Cache dos resultados recentes, para não testar de novo os mesmos alvos
+
+Cada sondagem (HTTP ou HTTPS) fica guardada por (ip, porta, protocolo,
+perfil) durante a validade configurada; o perfil reúne as opções que mudam o
+desfecho (verificação SSL, timeouts, pré-verificação TCP, inferência de
+HTTPS, timeout adaptativo), para que um teste só reaproveite resultados
+obtidos do mesmo modo. Acima do número máximo de entradas, as menos usadas
+recentemente são descartadas (LRU). Com um arquivo SQLite, o cache sobrevive
+entre execuções da interface web e do desktop.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste
+from services.timeouts import PoliticaTimeout
+
+# Desfechos que dependem do próprio host ou da execução, e não do alvo
+DESFECHOS_NAO_GUARDADOS = {Desfecho.ERRO, Desfecho.PRAZO_ESGOTADO, Desfecho.RECURSO_LOCAL}
+
+PROTOCOLOS = ('http', 'https')
+
+Chave = Tuple[str, int, str, str]  # (ip, porta, protocolo, perfil)
+
+# Tabela das versões anteriores, sem o perfil do teste na chave
+_TABELA_ANTIGA = "resultados"
+
+_CRIAR_TABELA = """
+CREATE TABLE IF NOT EXISTS sondagens (
+    ip TEXT NOT NULL,
+    porta INTEGER NOT NULL,
+    protocolo TEXT NOT NULL,
+    perfil TEXT NOT NULL,
+    expira REAL NOT NULL,
+    desfecho INTEGER NOT NULL,
+    codigo INTEGER NOT NULL,
+    total_ms REAL,
+    dns_ms REAL,
+    conexao_ms REAL,
+    tls_ms REAL,
+    primeiro_byte_ms REAL,
+    inferido INTEGER NOT NULL,
+    PRIMARY KEY (ip, porta, protocolo, perfil)
+)
+"""
+
+
+def perfil_teste(verificar_ssl: bool, politica: PoliticaTimeout, pre_verificar_tcp: bool = False,
+                 inferir_https: bool = False, timeout_adaptativo: bool = False) -> str:
+    """
+    Identifica o modo de teste na chave do cache.
+    
+    O farejamento de protocolo não tem perfil: classifica as portas de outro
+    modo (ex.: HTTP sem código) e não usa o cache.
+    
+    Args:
+        verificar_ssl: Se o teste verifica certificados SSL
+        politica: Timeouts de conexão, TLS e leitura
+        pre_verificar_tcp: Se há conexão TCP simples antes dos testes
+        inferir_https: Se HTTPS é deduzido da falha TCP do HTTP
+        timeout_adaptativo: Se o timeout de conexão segue o RTT da sub-rede
+    
+    Returns:
+        Texto que só se repete para testes com o mesmo desfecho esperado
+    """
+    return (f"ssl={int(verificar_ssl)} tcp={int(pre_verificar_tcp)} inferir={int(inferir_https)} "
+            f"adaptativo={int(timeout_adaptativo)} "
+            f"timeouts={politica.conexao:g}/{politica.tls:g}/{politica.leitura:g}")
+
+
+class CacheResultados:
+    """
+    Cache com validade (TTL) e descarte LRU dos resultados de sondagem.
+    
+    Seguro entre threads. Com caminho_arquivo, as entradas novas ficam
+    pendentes até persistir(), gravadas em uma única transação.
+    """
+    
+    def __init__(self, validade: float, max_entradas: int, caminho_arquivo: Optional[str] = None):
+        """
+        Inicializa o cache, carregando as entradas válidas do SQLite.
+        
+        Args:
+            validade: Segundos em que um resultado continua válido
+            max_entradas: Máximo de sondagens guardadas (as menos usadas saem primeiro)
+            caminho_arquivo: Arquivo SQLite onde o cache é persistido (None = só memória)
+        """
+        self.validade = validade
+        self.max_entradas = max(1, max_entradas)
+        self.caminho_arquivo = caminho_arquivo
+        self._entradas: 'OrderedDict[Chave, Tuple[float, ResultadoProtocolo]]' = OrderedDict()
+        self._pendentes: List[Chave] = []
+        self._descartadas: List[Chave] = []
+        self._lock = threading.Lock()
+        self._conexao: Optional[sqlite3.Connection] = None
+        if caminho_arquivo:
+            self._abrir()
+    
+    def _abrir(self):
+        """Abre o SQLite, remove as entradas vencidas e carrega as válidas"""
+        try:
+            self._conexao = sqlite3.connect(self.caminho_arquivo, check_same_thread=False)
+            with self._conexao:
+                # Entradas sem o perfil do teste não podem ser reaproveitadas
+                self._conexao.execute(f"DROP TABLE IF EXISTS {_TABELA_ANTIGA}")
+                self._conexao.execute(_CRIAR_TABELA)
+                self._conexao.execute("DELETE FROM sondagens WHERE expira <= ?", (time.time(),))
+            # As que vencem por último são as mais recentes: entram por último na ordem LRU
+            linhas = self._conexao.execute(
+                "SELECT ip, porta, protocolo, perfil, expira, desfecho, codigo, total_ms, dns_ms, "
+                "conexao_ms, tls_ms, primeiro_byte_ms, inferido FROM sondagens "
+                "ORDER BY expira DESC LIMIT ?", (self.max_entradas,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logging.warning(f"Cache de resultados sem persistência ({self.caminho_arquivo}): {str(e)}")
+            self._conexao = None
+            return
+        
+        for (ip, porta, protocolo, perfil, expira, desfecho, codigo, total_ms, dns_ms,
+             conexao_ms, tls_ms, primeiro_byte_ms, inferido) in reversed(linhas):
+            self._entradas[(ip, porta, protocolo, perfil)] = (expira, ResultadoProtocolo(
+                Desfecho(desfecho), codigo, total_ms, dns_ms, conexao_ms, tls_ms, primeiro_byte_ms,
+                bool(inferido)
+            ))
+    
+    def _consultar(self, chave: Chave, agora: float) -> Optional[ResultadoProtocolo]:
+        """Sondagem válida da chave, marcada como a mais usada; None se ausente ou vencida"""
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            return None
+        expira, resultado = entrada
+        if expira <= agora:
+            del self._entradas[chave]
+            return None
+        self._entradas.move_to_end(chave)
+        return resultado
+    
+    def obter(self, ip: str, porta: int, perfil: str) -> Optional[ResultadoTeste]:
+        """
+        Retorna o resultado guardado de um par (IP, porta).
+        
+        Args:
+            ip: Endereço IPv4
+            porta: Porta de destino
+            perfil: Modo do teste (perfil_teste)
+        
+        Returns:
+            ResultadoTeste, ou None se HTTP ou HTTPS não está no cache ou venceu
+        """
+        agora = time.time()
+        with self._lock:
+            http = self._consultar((ip, porta, 'http', perfil), agora)
+            https = self._consultar((ip, porta, 'https', perfil), agora)
+        if http is None or https is None:
+            return None
+        return ResultadoTeste(ip, porta, http, https)
+    
+    def guardar(self, resultados: Iterable[ResultadoTeste], perfil: str):
+        """
+        Guarda resultados novos, substituindo os anteriores dos mesmos alvos.
+        
+        Sondagens com erro local, prazo esgotado ou erro inesperado não são guardadas.
+        
+        Args:
+            resultados: Resultados dos testes
+            perfil: Modo dos testes (perfil_teste)
+        """
+        expira = time.time() + self.validade
+        with self._lock:
+            for resultado in resultados:
+                for protocolo, sondagem in zip(PROTOCOLOS, (resultado.http, resultado.https)):
+                    if sondagem.desfecho in DESFECHOS_NAO_GUARDADOS:
+                        continue
+                    chave = (resultado.ip, resultado.porta, protocolo, perfil)
+                    self._entradas[chave] = (expira, sondagem)
+                    self._entradas.move_to_end(chave)
+                    if self._conexao is not None:
+                        self._pendentes.append(chave)
+            while len(self._entradas) > self.max_entradas:
+                chave, _ = self._entradas.popitem(last=False)
+                if self._conexao is not None:
+                    self._descartadas.append(chave)
+    
+    def persistir(self):
+        """Grava no SQLite as entradas novas e remove as descartadas, em uma transação"""
+        if self._conexao is None:
+            return
+        with self._lock:
+            linhas = []
+            for chave in dict.fromkeys(self._pendentes):
+                entrada = self._entradas.get(chave)
+                if entrada is None:
+                    continue
+                expira, sondagem = entrada
+                linhas.append((*chave, expira, int(sondagem.desfecho), sondagem.codigo,
+                               sondagem.total_ms, sondagem.dns_ms, sondagem.conexao_ms, sondagem.tls_ms,
+                               sondagem.primeiro_byte_ms, int(sondagem.inferido)))
+            descartadas = [chave for chave in self._descartadas if chave not in self._entradas]
+            self._pendentes = []
+            self._descartadas = []
+            try:
+                with self._conexao:
+                    self._conexao.executemany(
+                        "DELETE FROM sondagens WHERE ip = ? AND porta = ? AND protocolo = ? "
+                        "AND perfil = ?", descartadas)
+                    self._conexao.executemany(
+                        "INSERT OR REPLACE INTO sondagens VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        linhas)
+            except sqlite3.Error as e:
+                logging.error(f"Erro ao gravar o cache de resultados: {str(e)}")
+    
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+def criar_cache(validade: float, max_entradas: int,
+                caminho_arquivo: Optional[str] = None) -> Optional[CacheResultados]:
+    """
+    Cria o cache de resultados, se habilitado.
+    
+    Args:
+        validade: Segundos de validade (0 ou None desabilita o cache)
+        max_entradas: Máximo de sondagens guardadas
+        caminho_arquivo: Arquivo SQLite (None = só memória)
+    
+    Returns:
+        CacheResultados, ou None se desabilitado
+    """
+    if not validade:
+        return None
+    return CacheResultados(validade, max_entradas, caminho_arquivo)
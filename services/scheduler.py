@@ -0,0 +1,382 @@
+"""
+Agendador de testes: distribui pares (IP, porta) entre os workers
+"""
+
+import logging
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from services.concurrency import ERRNOS_RECURSO_LOCAL, ControleConcorrencia
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste
+from services.rate_limiter import LimitadorSubRedes, intercalar_sub_redes, sub_rede
+from services.timeouts import PREFIXO_PADRAO, OrcamentoIPs
+
+# IPs lidos por vez ao montar a fila de trabalho
+TAMANHO_BLOCO_PADRAO = 1024
+
+# Tarefas submetidas e ainda não concluídas, por worker
+TAREFAS_POR_WORKER = 4
+
+# Tarefas de sub-redes lotadas guardadas à espera de vaga (--max-por-sub-rede)
+TAREFAS_ADIADAS = 4096
+
+# (função, argumentos, (ip, porta) para identificar a tarefa)
+Tarefa = Tuple[Callable[..., Any], tuple, Tuple[str, int]]
+
+
+def ler_blocos(ips: Iterable[str], tamanho_bloco: int = TAMANHO_BLOCO_PADRAO,
+               prefixo: int = PREFIXO_PADRAO) -> Iterator[List[str]]:
+    """
+    Lê IPs em blocos, intercalados entre sub-redes.
+    
+    A intercalação percorre a lista inteira (não cada bloco isoladamente):
+    em uma lista ordenada e densa, um bloco reúne IPs de até
+    SUB_REDES_INTERCALADAS sub-redes, e não só das poucas que caberiam em
+    tamanho_bloco IPs consecutivos.
+    
+    Args:
+        ips: Endereços IPv4 (lista ou iterável)
+        tamanho_bloco: Quantidade de IPs por bloco
+        prefixo: Tamanho do prefixo que define a sub-rede
+    
+    Yields:
+        Listas de até tamanho_bloco IPs
+    """
+    iterador = intercalar_sub_redes(ips, prefixo)
+    while True:
+        bloco = list(islice(iterador, tamanho_bloco))
+        if not bloco:
+            return
+        yield bloco
+
+
+def gerar_alvos(ips: Iterable[str], portas: List[int],
+                tamanho_bloco: int = TAMANHO_BLOCO_PADRAO,
+                prefixo: int = PREFIXO_PADRAO,
+                concluido: Optional[Callable[[str, int], bool]] = None) -> Iterator[Tuple[str, int]]:
+    """
+    Expande IPs × portas em pares (IP, porta).
+    
+    Os IPs são lidos em blocos e, dentro de cada bloco, percorridos porta por
+    porta: conexões simultâneas se espalham por CPEs diferentes em vez de
+    abrir todas as portas de um mesmo CPE ao mesmo tempo. Cada bloco também
+    alterna entre sub-redes, para não concentrar os workers atrás do mesmo
+    concentrador quando a lista de IPs está ordenada.
+    
+    Args:
+        ips: Endereços IPv4 (lista ou iterável)
+        portas: Portas a testar em cada IP
+        tamanho_bloco: Quantidade de IPs intercalados por porta
+        prefixo: Tamanho do prefixo que define a sub-rede
+        concluido: Função opcional que indica os pares já testados (retomada),
+            que são pulados
+    
+    Yields:
+        Tuplas (ip, porta)
+    """
+    for bloco in ler_blocos(ips, tamanho_bloco, prefixo):
+        for porta in portas:
+            for ip in bloco:
+                if concluido is None or not concluido(ip, porta):
+                    yield ip, porta
+
+
+def sondagens_por_ip(portas: List[int], concluido: Optional[Callable[[str, int], bool]] = None
+                     ) -> Union[int, Callable[[str], int]]:
+    """
+    Sondagens esperadas em cada IP, para o OrcamentoIPs descartar os IPs concluídos.
+    
+    Args:
+        portas: Portas testadas em cada IP
+        concluido: Função opcional que indica os pares já testados (retomada)
+    
+    Returns:
+        Número de portas, ou função que conta as portas não concluídas de um IP
+    """
+    if concluido is None:
+        return len(portas)
+    return lambda ip: sum(1 for porta in portas if not concluido(ip, porta))
+
+
+def executar_em_janela(executor: Executor, tarefas: Iterable[Tarefa],
+                       janela: Union[int, Callable[[], int]],
+                       limitador: Optional[LimitadorSubRedes] = None,
+                       max_adiadas: int = TAREFAS_ADIADAS) -> Iterator[Tuple[Future, Tuple[str, int]]]:
+    """
+    Submete tarefas ao executor mantendo no máximo `janela` em andamento.
+    
+    As tarefas são lidas do iterável conforme as anteriores terminam: a
+    memória usada não depende do número de alvos. Se o consumidor parar de
+    iterar, as tarefas ainda não iniciadas são canceladas.
+    
+    Com um limitador de sub-redes, a tarefa de uma sub-rede lotada não é
+    submetida: fica adiada (até max_adiadas no total) e é submetida, na ordem,
+    quando uma tarefa da mesma sub-rede termina. Enquanto isso, tarefas de
+    outras sub-redes seguem sendo lidas e submetidas; nenhuma thread do
+    executor fica parada à espera de vaga.
+    
+    Args:
+        executor: Executor que roda as tarefas
+        tarefas: Tuplas (função, argumentos, identificação (ip, porta))
+        janela: Máximo de tarefas submetidas e não concluídas, ou função que
+            o retorna (consultada a cada conclusão, para uma janela variável)
+        limitador: LimitadorSubRedes opcional, consultado pelo IP da identificação
+        max_adiadas: Máximo de tarefas adiadas; atingido, a leitura de novas
+            tarefas espera as sub-redes lotadas liberarem vagas
+    
+    Yields:
+        Tuplas (future concluído, identificação), na ordem de conclusão
+    """
+    iterador = iter(tarefas)
+    pendentes = {}
+    # Sub-rede lotada -> tarefas adiadas, na ordem de leitura
+    adiadas: Dict[int, Deque[Tarefa]] = {}
+    total_adiadas = 0
+    tamanho_janela = janela if callable(janela) else (lambda: janela)
+    
+    def submeter(tarefa: Tarefa):
+        funcao, argumentos, chave = tarefa
+        pendentes[executor.submit(funcao, *argumentos)] = chave
+    
+    try:
+        while True:
+            vagas = max(0, tamanho_janela() - len(pendentes))
+            if limitador is None:
+                for tarefa in islice(iterador, vagas):
+                    submeter(tarefa)
+            else:
+                # Primeiro as adiadas cujas sub-redes ganharam vaga
+                for rede in list(adiadas):
+                    fila = adiadas[rede]
+                    while vagas and fila and limitador.tentar_ocupar(fila[0][2][0]):
+                        submeter(fila.popleft())
+                        vagas -= 1
+                        total_adiadas -= 1
+                    if not fila:
+                        del adiadas[rede]
+                while vagas and total_adiadas < max_adiadas:
+                    tarefa = next(iterador, None)
+                    if tarefa is None:
+                        break
+                    ip = tarefa[2][0]
+                    rede = sub_rede(ip, limitador.prefixo)
+                    # Com tarefas da sub-rede já adiadas, a nova entra atrás delas
+                    if rede not in adiadas and limitador.tentar_ocupar(ip):
+                        submeter(tarefa)
+                        vagas -= 1
+                    else:
+                        adiadas.setdefault(rede, deque()).append(tarefa)
+                        total_adiadas += 1
+            if not pendentes:
+                return
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for future in concluidos:
+                chave = pendentes.pop(future)
+                if limitador is not None:
+                    limitador.liberar(chave[0])
+                yield future, chave
+    finally:
+        for future, chave in pendentes.items():
+            future.cancel()
+            if limitador is not None:
+                limitador.liberar(chave[0])
+
+
+class AgendadorTestes:
+    """Executa os testes de todos os pares (IP, porta) com concorrência compartilhada"""
+    
+    def __init__(self, testador, portas: List[int], max_workers: int,
+                 tamanho_bloco: int = TAMANHO_BLOCO_PADRAO, parar_na_primeira: bool = False,
+                 historico=None, prazo_ip: Optional[float] = None,
+                 max_por_sub_rede: Optional[int] = None, prefixo_sub_rede: int = PREFIXO_PADRAO,
+                 tarefas_por_worker: int = TAREFAS_POR_WORKER,
+                 controle: Optional[ControleConcorrencia] = None):
+        """
+        Inicializa o agendador.
+        
+        Args:
+            testador: HTTPTester (ou objeto com testar_ip(ip, porta))
+            portas: Portas a testar em cada IP
+            max_workers: Número de threads compartilhadas por todas as portas
+            tamanho_bloco: Quantidade de IPs intercalados por porta
+            parar_na_primeira: Se testa as portas de cada IP em sequência e
+                para na primeira que responder
+            historico: HistoricoPortas opcional; ordena as portas no modo
+                parar_na_primeira e aprende com cada resultado
+            prazo_ip: Tempo máximo de sondagem por IP, somando todas as portas;
+                as portas que não cabem no prazo são marcadas PRAZO_ESGOTADO
+            max_por_sub_rede: Máximo de testes ao mesmo tempo em uma sub-rede
+                (None = sem limite além de max_workers)
+            prefixo_sub_rede: Tamanho do prefixo que agrupa IPs na mesma sub-rede
+            tarefas_por_worker: Tarefas submetidas à frente de cada worker; os
+                alvos são lidos aos poucos, sem criar um Future por alvo de uma vez
+            controle: Controle adaptativo; com ele, os testes em andamento seguem
+                controle.limite (até controle.maximo threads) e max_workers é ignorado
+        """
+        self.testador = testador
+        self.portas = list(portas)
+        self.controle = controle
+        if controle is not None:
+            # Threads são criadas sob demanda: o teto só é alcançado se o limite crescer
+            self.max_workers = controle.maximo
+            self.janela = lambda: controle.limite
+        else:
+            self.max_workers = max(1, max_workers)
+            self.janela = self.max_workers * max(1, tarefas_por_worker)
+        self.tamanho_bloco = tamanho_bloco
+        self.parar_na_primeira = parar_na_primeira
+        self.historico = historico
+        self.prazo_ip = prazo_ip
+        self.prefixo_sub_rede = prefixo_sub_rede
+        self._limitador_sub_redes = None
+        if max_por_sub_rede is not None:
+            self._limitador_sub_redes = LimitadorSubRedes(max_por_sub_rede, prefixo_sub_rede)
+        self._orcamento: Optional[OrcamentoIPs] = None
+        self._concluido: Optional[Callable[[str, int], bool]] = None
+        self._cancelado = False
+    
+    def total_testes(self, numero_ips: int) -> Optional[int]:
+        """
+        Retorna quantos testes (IP × porta) serão executados.
+        
+        No modo parar_na_primeira o total depende das respostas e retorna None.
+        """
+        if self.parar_na_primeira:
+            return None
+        return numero_ips * len(self.portas)
+    
+    def cancelar(self):
+        """Interrompe a execução; testes ainda não iniciados são descartados"""
+        self._cancelado = True
+    
+    def _testar(self, ip: str, porta: int) -> ResultadoTeste:
+        """
+        Testa um par (IP, porta) descontando a duração do prazo restante do IP.
+        
+        Args:
+            ip: Endereço IPv4
+            porta: Porta de destino
+            
+        Returns:
+            ResultadoTeste (PRAZO_ESGOTADO nos dois protocolos se o prazo acabou)
+        """
+        if self._orcamento is None:
+            return self.testador.testar_ip(ip, porta)
+        
+        restante = self._orcamento.restante(ip)
+        if restante <= 0:
+            self._orcamento.consumir(ip, 0.0)
+            esgotado = ResultadoProtocolo(Desfecho.PRAZO_ESGOTADO)
+            return ResultadoTeste(ip, porta, esgotado, esgotado)
+        
+        inicio = time.perf_counter()
+        try:
+            return self.testador.testar_ip(ip, porta, orcamento=restante)
+        finally:
+            self._orcamento.consumir(ip, time.perf_counter() - inicio)
+    
+    def _testar_ate_responder(self, ip: str) -> List[ResultadoTeste]:
+        """
+        Testa as portas de um IP em sequência até a primeira que responder.
+        
+        Args:
+            ip: Endereço IPv4
+            
+        Returns:
+            Resultados das portas testadas (a última é a que respondeu, se houver)
+        """
+        portas = self.historico.ordenar_portas(ip, self.portas) if self.historico else self.portas
+        if self._concluido is not None:
+            portas = [porta for porta in portas if not self._concluido(ip, porta)]
+        resultados = []
+        
+        try:
+            for porta in portas:
+                if self._cancelado:
+                    break
+                resultado = self._testar(ip, porta)
+                resultados.append(resultado)
+                if resultado.respondeu:
+                    break
+        finally:
+            # As portas restantes não serão testadas: o prazo do IP não é mais necessário
+            if self._orcamento is not None:
+                self._orcamento.liberar(ip)
+        
+        return resultados
+    
+    def executar(self, ips: Iterable[str],
+                 callback: Optional[Callable[[ResultadoTeste], None]] = None,
+                 guardar_resultados: bool = True,
+                 concluido: Optional[Callable[[str, int], bool]] = None) -> List[ResultadoTeste]:
+        """
+        Testa todos os IPs em todas as portas.
+        
+        Args:
+            ips: Endereços IPv4 a serem testados (lista ou iterável, lido aos poucos)
+            callback: Função chamada com cada resultado assim que fica pronto
+            guardar_resultados: Se acumula os resultados na lista retornada; com
+                False, só o callback os recebe e a memória não cresce com os alvos
+            concluido: Função opcional que indica os pares (IP, porta) já
+                testados em uma execução interrompida, que são pulados
+        
+        Returns:
+            Lista de ResultadoTeste, na ordem de conclusão (vazia se
+            guardar_resultados for False)
+        """
+        self._cancelado = False
+        self._orcamento = None
+        if self.prazo_ip is not None:
+            self._orcamento = OrcamentoIPs(self.prazo_ip, sondagens_por_ip(self.portas, concluido))
+        self._concluido = concluido
+        resultados = []
+        
+        if self.parar_na_primeira:
+            # Uma tarefa por IP: as portas do IP são testadas em sequência
+            tarefas = (
+                (self._testar_ate_responder, (ip,), (ip, self.portas[0]))
+                for bloco in ler_blocos(ips, self.tamanho_bloco, self.prefixo_sub_rede)
+                for ip in bloco
+                if concluido is None or not all(concluido(ip, porta) for porta in self.portas)
+            )
+        else:
+            tarefas = (
+                (self._testar, (ip, porta), (ip, porta))
+                for ip, porta in gerar_alvos(ips, self.portas, self.tamanho_bloco,
+                                             self.prefixo_sub_rede, concluido)
+            )
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # O limite por sub-rede é aplicado na submissão, fora das threads
+            concluidas = executar_em_janela(executor, tarefas, self.janela, self._limitador_sub_redes)
+            for future, (ip, porta) in concluidas:
+                if self._cancelado:
+                    # Cancela as tarefas já submetidas e ainda não iniciadas
+                    concluidas.close()
+                    break
+                
+                try:
+                    concluidos = future.result()
+                    if not self.parar_na_primeira:
+                        concluidos = [concluidos]
+                except Exception as e:
+                    logging.error(f"Erro ao testar {ip}:{porta}: {str(e)}")
+                    local = isinstance(e, OSError) and e.errno in ERRNOS_RECURSO_LOCAL
+                    erro = (ResultadoProtocolo(Desfecho.RECURSO_LOCAL) if local
+                            else ResultadoProtocolo(Desfecho.ERRO, detalhe=type(e).__name__))
+                    concluidos = [ResultadoTeste(ip, porta, erro, erro)]
+                
+                for resultado in concluidos:
+                    if self.controle is not None:
+                        self.controle.registrar(resultado)
+                    if self.historico:
+                        self.historico.registrar(resultado)
+                    if guardar_resultados:
+                        resultados.append(resultado)
+                    if callback:
+                        callback(resultado)
+        
+        return resultados
@@ -0,0 +1,159 @@
+"""
+Varredura dividida entre processos, para listas de alvos muito grandes
+
+Com um único processo, a interpretação das respostas (requests/urllib3 ou
+asyncio) disputa o GIL bem antes de a rede saturar. Aqui cada processo testa
+uma fatia dos alvos (sub-redes inteiras, distribuídas por hash) com o seu
+próprio motor de testes, e os resultados voltam em lotes por uma fila
+(um pipe) ao processo principal, o único que os grava.
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+from services.probe_result import ResultadoTeste
+from utils.target_set import ConjuntoAlvos
+
+# Resultados enviados juntos pelo pipe (menos trocas entre processos), ou o
+# que houver a cada intervalo
+RESULTADOS_POR_ENVIO = 100
+INTERVALO_ENVIO = 0.5  # segundos
+
+# Lotes aguardando o processo principal; cheia, a fila segura os processos
+LOTES_NA_FILA = 1000
+
+# Espera por mensagens antes de verificar se algum processo morreu
+INTERVALO_VERIFICACAO = 1.0  # segundos
+
+Testar = Callable[[ConjuntoAlvos, object, Callable[[ResultadoTeste], None]], None]
+
+
+class _Remetente:
+    """Agrupa os resultados de um processo e os envia pela fila"""
+    
+    def __init__(self, fila):
+        self.fila = fila
+        self._lote: List[ResultadoTeste] = []
+        self._ultimo_envio = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def adicionar(self, resultado: ResultadoTeste):
+        with self._lock:
+            self._lote.append(resultado)
+            if (len(self._lote) >= RESULTADOS_POR_ENVIO
+                    or time.monotonic() - self._ultimo_envio >= INTERVALO_ENVIO):
+                self._enviar()
+    
+    def descarregar(self):
+        with self._lock:
+            if self._lote:
+                self._enviar()
+    
+    def _enviar(self):
+        self.fila.put(self._lote)
+        self._lote = []
+        self._ultimo_envio = time.monotonic()
+
+
+def _executar_fatia(testar: Testar, fatia: ConjuntoAlvos, indice: int, parametros, fila):
+    """Corpo de cada processo: testa a sua fatia e avisa quando terminar"""
+    remetente = _Remetente(fila)
+    erro = None
+    try:
+        testar(fatia, parametros, remetente.adicionar)
+    except BaseException as e:
+        # Inclui KeyboardInterrupt: o processo principal decide o que fazer
+        erro = f"{type(e).__name__}: {str(e)}"
+    finally:
+        remetente.descarregar()
+        fila.put((indice, erro))
+
+
+def executar_em_processos(testar: Testar, alvos: ConjuntoAlvos, parametros,
+                          processos: int, prefixo: int = 24,
+                          callback: Optional[Callable[[ResultadoTeste], None]] = None,
+                          parametros_da_fatia: Optional[Callable[[ConjuntoAlvos], object]] = None):
+    """
+    Testa os alvos em vários processos, entregando cada resultado no processo atual.
+    
+    As fatias são recortadas aqui: cada processo recebe só os seus alvos, e
+    não o conjunto inteiro.
+    
+    Args:
+        testar: Função de nível de módulo (precisa ser serializável) chamada
+            em cada processo como testar(fatia, parametros, callback)
+        alvos: Alvos de toda a varredura
+        parametros: Repassados a testar (serializáveis)
+        processos: Quantidade de processos
+        prefixo: Prefixo das sub-redes que não são divididas entre processos
+        callback: Chamado no processo atual com cada resultado, na ordem de chegada
+        parametros_da_fatia: Se informado, substitui parametros: chamado com a
+            fatia de cada processo, retorna os parâmetros só dela (ex.: as
+            marcas de retomada dos seus alvos)
+    
+    Raises:
+        RuntimeError: Se algum processo falhou ou terminou sem concluir a fatia
+    """
+    contexto = multiprocessing.get_context()
+    fila = contexto.Queue(maxsize=LOTES_NA_FILA)
+    trabalhadores = []
+    for indice in range(processos):
+        fatia = alvos.fatia(indice, processos, prefixo)
+        trabalhador = contexto.Process(
+            target=_executar_fatia,
+            args=(testar, fatia, indice,
+                  parametros_da_fatia(fatia) if parametros_da_fatia else parametros, fila),
+            name=f"fatia-{indice}"
+        )
+        trabalhador.start()
+        trabalhadores.append(trabalhador)
+    
+    pendentes = set(range(processos))
+    suspeitos = set()
+    erros = []
+    proxima_verificacao = time.monotonic() + INTERVALO_VERIFICACAO
+    try:
+        while pendentes:
+            try:
+                mensagem = fila.get(timeout=INTERVALO_VERIFICACAO)
+            except queue.Empty:
+                mensagem = None
+            
+            if isinstance(mensagem, tuple):
+                indice, erro = mensagem
+                pendentes.discard(indice)
+                if erro:
+                    erros.append(f"fatia {indice}: {erro}")
+            elif mensagem and callback:
+                for resultado in mensagem:
+                    callback(resultado)
+            
+            if time.monotonic() >= proxima_verificacao:
+                # Um processo morto sem avisar (ex.: OOM killer) só é dado
+                # como perdido se continuar pendente na verificação seguinte:
+                # o aviso pode estar na fila, atrás de outros lotes
+                mortos = {indice for indice in pendentes
+                          if not trabalhadores[indice].is_alive() and trabalhadores[indice].exitcode}
+                for indice in mortos & suspeitos:
+                    pendentes.discard(indice)
+                    erros.append(f"fatia {indice}: processo terminou com código "
+                                 f"{trabalhadores[indice].exitcode}")
+                suspeitos = mortos
+                proxima_verificacao = time.monotonic() + INTERVALO_VERIFICACAO
+    finally:
+        if pendentes:
+            # Interrompido no processo principal: encerra as fatias restantes
+            for trabalhador in trabalhadores:
+                if trabalhador.is_alive():
+                    trabalhador.terminate()
+        for trabalhador in trabalhadores:
+            trabalhador.join()
+    
+    if erros:
+        for erro in erros:
+            logging.error(f"Erro na varredura em processos: {erro}")
+        raise RuntimeError(f"{len(erros)} de {processos} processo(s) falharam: {erros[0]}")
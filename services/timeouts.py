@@ -0,0 +1,156 @@
+"""
+Políticas de timeout: limites por fase, prazo por IP e timeout de conexão
+adaptativo, derivado do RTT observado em cada sub-rede
+"""
+
+import ipaddress
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
+
+# Tamanho do prefixo que agrupa IPs com RTT semelhante (mesma CPE/OLT de borda)
+PREFIXO_PADRAO = 24
+
+
+class PoliticaTimeout(NamedTuple):
+    """Limites de tempo (em segundos) de cada fase de uma sondagem"""
+    conexao: float
+    tls: float
+    leitura: float
+    prazo_ip: Optional[float] = None  # soma máxima das sondagens de um IP; None = sem prazo
+    
+    @classmethod
+    def unica(cls, timeout: float, prazo_ip: Optional[float] = None) -> 'PoliticaTimeout':
+        """Política com o mesmo timeout para conexão, TLS e leitura"""
+        return cls(timeout, timeout, timeout, prazo_ip)
+    
+    def limitada(self, restante: float) -> 'PoliticaTimeout':
+        """Cópia com cada fase limitada ao tempo restante do prazo do IP"""
+        return self._replace(
+            conexao=min(self.conexao, restante),
+            tls=min(self.tls, restante),
+            leitura=min(self.leitura, restante)
+        )
+
+
+class OrcamentoIPs:
+    """
+    Tempo de sondagem já consumido por IP, para aplicar o prazo_ip.
+    
+    Conta a duração das sondagens (e não o relógio desde a primeira), pois as
+    portas de um mesmo IP são intercaladas com as de outros IPs na fila.
+    Só os IPs com sondagens pendentes ficam em memória: a entrada de um IP
+    sai quando a última sondagem esperada é descontada (ou com liberar()).
+    """
+    
+    def __init__(self, prazo: float, sondagens_por_ip: Union[int, Callable[[str], int]] = 1):
+        """
+        Inicializa o orçamento.
+        
+        Args:
+            prazo: Tempo máximo de sondagem por IP, em segundos
+            sondagens_por_ip: Sondagens esperadas em cada IP (ex.: número de
+                portas), ou função que o retorna para um IP (consultada na
+                primeira sondagem descontada do IP)
+        """
+        self.prazo = prazo
+        self._sondagens = (sondagens_por_ip if callable(sondagens_por_ip)
+                           else lambda ip: sondagens_por_ip)
+        # ip -> [segundos consumidos, sondagens que faltam]
+        self._em_andamento: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def restante(self, ip: str) -> float:
+        """Segundos que ainda podem ser gastos com o IP (0 se o prazo acabou)"""
+        with self._lock:
+            entrada = self._em_andamento.get(ip)
+            return max(0.0, self.prazo - (entrada[0] if entrada else 0.0))
+    
+    def consumir(self, ip: str, segundos: float):
+        """Desconta do IP o tempo gasto em uma sondagem (0 se foi pulada por falta de prazo)"""
+        with self._lock:
+            entrada = self._em_andamento.get(ip)
+            if entrada is None:
+                entrada = self._em_andamento[ip] = [0.0, self._sondagens(ip)]
+            entrada[0] += segundos
+            entrada[1] -= 1
+            if entrada[1] <= 0:
+                del self._em_andamento[ip]
+    
+    def liberar(self, ip: str):
+        """Descarta o IP antes da última sondagem esperada (ex.: parou na primeira porta)"""
+        with self._lock:
+            self._em_andamento.pop(ip, None)
+    
+    def __len__(self) -> int:
+        return len(self._em_andamento)
+
+
+class TimeoutAdaptativo:
+    """
+    Estima o timeout de conexão por sub-rede, como o RTO do TCP (RFC 6298).
+    
+    Cada conexão TCP bem-sucedida é uma amostra de RTT da sua sub-rede /24.
+    O timeout de um IP é SRTT + K × RTTVAR da sub-rede, limitado entre o
+    mínimo e o máximo; sub-redes sem amostras usam o máximo (timeout fixo).
+    """
+    
+    # Constantes da RFC 6298
+    ALFA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+    
+    def __init__(self, minimo: float, maximo: float, prefixo: int = PREFIXO_PADRAO):
+        """
+        Inicializa o estimador.
+        
+        Args:
+            minimo: Menor timeout de conexão em segundos (piso)
+            maximo: Maior timeout de conexão em segundos (teto e valor inicial)
+            prefixo: Tamanho do prefixo IPv4 que agrupa as amostras
+        """
+        self.minimo = min(minimo, maximo)
+        self.maximo = maximo
+        self._deslocamento = 32 - prefixo
+        # sub-rede -> [srtt, rttvar] em segundos
+        self._estimativas: Dict[int, List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def _sub_rede(self, ip: str) -> int:
+        return int(ipaddress.IPv4Address(ip)) >> self._deslocamento
+    
+    def registrar(self, ip: str, rtt: float):
+        """
+        Adiciona uma amostra de RTT (duração de uma conexão TCP bem-sucedida).
+        
+        Args:
+            ip: Endereço IPv4 conectado
+            rtt: Tempo de conexão em segundos
+        """
+        sub_rede = self._sub_rede(ip)
+        with self._lock:
+            estimativa = self._estimativas.get(sub_rede)
+            if estimativa is None:
+                # Primeira amostra: SRTT = R, RTTVAR = R/2
+                self._estimativas[sub_rede] = [rtt, rtt / 2]
+                return
+            srtt, rttvar = estimativa
+            estimativa[1] = (1 - self.BETA) * rttvar + self.BETA * abs(srtt - rtt)
+            estimativa[0] = (1 - self.ALFA) * srtt + self.ALFA * rtt
+    
+    def timeout(self, ip: str) -> float:
+        """
+        Retorna o timeout de conexão para o IP.
+        
+        Args:
+            ip: Endereço IPv4
+        
+        Returns:
+            Timeout em segundos, entre minimo e maximo
+        """
+        sub_rede = self._sub_rede(ip)
+        with self._lock:
+            estimativa = self._estimativas.get(sub_rede)
+            if estimativa is None:
+                return self.maximo
+            srtt, rttvar = estimativa
+        return min(self.maximo, max(self.minimo, srtt + self.K * rttvar))
@@ -28,6 +28,7 @@ async function executarTestes() {
     const porta = parseInt(document.getElementById('porta').value) || 8080;
     const timeout = parseInt(document.getElementById('timeout').value) || 5;
     const verificarSsl = document.getElementById('verificar-ssl').checked;
+    const forcarAtualizacao = document.getElementById('forcar-atualizacao').checked;
     
     // Esconde painéis anteriores
     resultadosPanel.classList.add('hidden');
@@ -47,7 +48,8 @@ async function executarTestes() {
                 ips: ips,
                 porta: porta,
                 timeout: timeout,
-                verificar_ssl: verificarSsl
+                verificar_ssl: verificarSsl,
+                forcar_atualizacao: forcarAtualizacao
             })
         });
         
@@ -0,0 +1,23 @@
+"""
+Configuração dos testes: permite importar os módulos do projeto (config,
+services, utils) ao rodar pytest a partir de qualquer diretório e fornece
+o certificado dos servidores TLS locais
+"""
+
+import os
+import sys
+
+import pytest
+
+from servidores import criar_contexto_tls
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def contexto_tls(tmp_path_factory):
+    """Contexto TLS de servidor com certificado autoassinado (pula sem openssl)"""
+    contexto = criar_contexto_tls(str(tmp_path_factory.mktemp('tls')))
+    if contexto is None:
+        pytest.skip("openssl não disponível para gerar o certificado")
+    return contexto
@@ -0,0 +1,108 @@
+"""
+Servidores locais usados pelos testes dos motores (HTTP, TLS, porta fechada
+e porta que aceita a conexão mas nunca responde)
+"""
+
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+
+@contextmanager
+def servidor_local(responder: Callable[[bytes], bytes],
+                   contexto: Optional[ssl.SSLContext] = None) -> Iterator[int]:
+    """
+    Servidor TCP em 127.0.0.1 que responde a cada conexão e a encerra.
+    
+    Args:
+        responder: Recebe os primeiros bytes do cliente e devolve a resposta
+        contexto: Contexto TLS de servidor; None atende em texto puro
+    
+    Yields:
+        Porta do servidor
+    """
+    servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    servidor.bind(('127.0.0.1', 0))
+    servidor.listen(8)
+    servidor.settimeout(0.2)
+    ativo = threading.Event()
+    ativo.set()
+    
+    def atender():
+        while ativo.is_set():
+            try:
+                conexao, _ = servidor.accept()
+            except socket.timeout:
+                continue
+            conexao.settimeout(2)
+            try:
+                if contexto is not None:
+                    conexao = contexto.wrap_socket(conexao, server_side=True)
+                conexao.sendall(responder(conexao.recv(4096)))
+            except OSError:  # inclui ssl.SSLError: cliente sem TLS
+                pass
+            finally:
+                conexao.close()
+    
+    thread = threading.Thread(target=atender, daemon=True)
+    thread.start()
+    try:
+        yield servidor.getsockname()[1]
+    finally:
+        ativo.clear()
+        thread.join()
+        servidor.close()
+
+
+@contextmanager
+def servidor_mudo() -> Iterator[int]:
+    """Porta que completa a conexão TCP (fila do kernel) e nunca responde"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as servidor:
+        servidor.bind(('127.0.0.1', 0))
+        servidor.listen(8)
+        yield servidor.getsockname()[1]
+
+
+@contextmanager
+def servidor_lotado() -> Iterator[int]:
+    """
+    Porta cuja fila de conexões está cheia: o kernel descarta os SYNs e a
+    conexão TCP expira (comportamento do Linux com listen(0))
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as servidor:
+        servidor.bind(('127.0.0.1', 0))
+        servidor.listen(0)
+        porta = servidor.getsockname()[1]
+        with socket.create_connection(('127.0.0.1', porta)):
+            yield porta
+
+
+def porta_fechada() -> int:
+    """Porta local sem nenhum servidor (conexão recusada)"""
+    with socket.socket() as livre:
+        livre.bind(('127.0.0.1', 0))
+        return livre.getsockname()[1]
+
+
+def criar_contexto_tls(diretorio: str) -> Optional[ssl.SSLContext]:
+    """
+    Contexto TLS de servidor com um certificado autoassinado gerado pelo openssl.
+    
+    Returns:
+        SSLContext, ou None se o openssl não estiver disponível
+    """
+    if shutil.which('openssl') is None:
+        return None
+    chave, certificado = f"{diretorio}/chave.pem", f"{diretorio}/certificado.pem"
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-subj', '/CN=127.0.0.1', '-keyout', chave, '-out', certificado],
+        check=True, capture_output=True
+    )
+    contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    contexto.load_cert_chain(certificado, chave)
+    return contexto
@@ -0,0 +1,83 @@
+"""
+Testes do motor asyncio (AsyncHTTPTester) contra servidores locais
+"""
+
+import sys
+
+import pytest
+
+from services.async_http_tester import AsyncHTTPTester
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste
+from services.timeouts import PoliticaTimeout
+from servidores import porta_fechada, servidor_local, servidor_lotado, servidor_mudo
+
+POLITICA = PoliticaTimeout(conexao=0.5, tls=1, leitura=0.5)
+
+
+def responder_204(_: bytes) -> bytes:
+    return b"HTTP/1.1 204 No Content\r\nConnection: close\r\n\r\n"
+
+
+def sondar(porta: int, **opcoes) -> ResultadoTeste:
+    testador = AsyncHTTPTester(politica_timeout=POLITICA, max_conexoes=4, **opcoes)
+    resultados = testador.testar_multiplos_ips(['127.0.0.1'], portas=[porta])
+    assert len(resultados) == 1
+    return resultados[0]
+
+
+def test_http_ok():
+    with servidor_local(responder_204) as porta:
+        resultado = sondar(porta)
+    
+    assert resultado.http.desfecho == Desfecho.OK
+    assert resultado.http.codigo == 204
+    assert resultado.http.conexao_ms is not None
+    assert resultado.https.desfecho == Desfecho.ERRO_SSL
+
+
+def test_https_ok(contexto_tls):
+    with servidor_local(responder_204, contexto_tls) as porta:
+        resultado = sondar(porta)
+    
+    assert resultado.https.desfecho == Desfecho.OK
+    assert resultado.https.codigo == 204
+    # GET em texto puro numa porta TLS: sem linha de status HTTP
+    assert resultado.http.desfecho == Desfecho.ERRO_CONEXAO
+
+
+def test_conexao_recusada():
+    resultado = sondar(porta_fechada())
+    
+    assert resultado.http.desfecho == Desfecho.RECUSADA
+    assert resultado.https.desfecho == Desfecho.RECUSADA
+
+
+def test_sem_resposta_expira():
+    with servidor_mudo() as porta:
+        resultado = sondar(porta)
+    
+    assert resultado.http.desfecho == Desfecho.TIMEOUT
+    assert resultado.http.conexao_ms is not None  # a conexão completou; a leitura expirou
+    assert resultado.https.desfecho == Desfecho.TIMEOUT
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason="fila cheia só descarta SYNs no Linux")
+def test_inferir_https_sem_conexao_tcp():
+    with servidor_lotado() as porta:
+        resultado = sondar(porta, protocolos_simultaneos=False, inferir_https=True)
+    
+    assert resultado.http.desfecho == Desfecho.TIMEOUT
+    assert resultado.https == ResultadoProtocolo(Desfecho.TIMEOUT, inferido=True)
+
+
+def test_testar_multiplos_ips_e_portas():
+    recebidos = []
+    fechada = porta_fechada()
+    with servidor_local(responder_204) as aberta:
+        testador = AsyncHTTPTester(politica_timeout=POLITICA, max_conexoes=4)
+        resultados = testador.testar_multiplos_ips(['127.0.0.1'], callback=recebidos.append,
+                                                   portas=[aberta, fechada])
+    
+    assert sorted(resultados) == sorted(recebidos)
+    desfechos = {resultado.porta: resultado.http.desfecho for resultado in resultados}
+    assert desfechos == {aberta: Desfecho.OK, fechada: Desfecho.RECUSADA}
@@ -0,0 +1,73 @@
+"""
+Testes do diário de retomada e do mapa de testes concluídos
+"""
+
+import pytest
+
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste
+from utils.checkpoint import DiarioVarredura, MarcasConcluidas, ler_diario
+from utils.ip_parser import interpretar_alvo
+from utils.target_set import ConjuntoAlvos
+
+OK = ResultadoProtocolo(Desfecho.OK, 204)
+TIMEOUT = ResultadoProtocolo(Desfecho.TIMEOUT)
+INFERIDO = ResultadoProtocolo(Desfecho.TIMEOUT, inferido=True)
+
+RESULTADOS = [
+    ResultadoTeste('10.0.0.2', 443, ResultadoProtocolo(Desfecho.ERRO_SSL), OK),
+    ResultadoTeste('10.0.0.1', 80, TIMEOUT, INFERIDO),
+]
+
+
+def test_diario_ida_e_volta(tmp_path):
+    caminho = str(tmp_path / 'varredura.diario')
+    with DiarioVarredura(caminho) as diario:
+        for resultado in RESULTADOS:
+            diario.registrar(resultado)
+    
+    assert list(ler_diario(caminho)) == RESULTADOS
+
+
+def test_retomar_descarta_registro_incompleto(tmp_path):
+    caminho = tmp_path / 'varredura.diario'
+    with DiarioVarredura(str(caminho)) as diario:
+        diario.registrar(RESULTADOS[0])
+    with open(caminho, 'ab') as arquivo:
+        arquivo.write(b'\x01\x02\x03')  # gravação interrompida
+    assert list(ler_diario(str(caminho))) == RESULTADOS[:1]
+    
+    with DiarioVarredura(str(caminho), retomar=True) as diario:
+        diario.registrar(RESULTADOS[1])
+    
+    assert list(ler_diario(str(caminho))) == RESULTADOS
+
+
+def test_arquivo_que_nao_e_diario(tmp_path):
+    caminho = tmp_path / 'resultados.csv'
+    caminho.write_text("IP,Porta,HTTP,HTTPS\n", encoding='utf-8')
+    with pytest.raises(ValueError):
+        DiarioVarredura(str(caminho), retomar=True)
+    assert caminho.read_text(encoding='utf-8') == "IP,Porta,HTTP,HTTPS\n"  # intacto
+
+
+def test_marcas_concluidas():
+    alvos = ConjuntoAlvos(faixas=[interpretar_alvo('10.0.0.0/29')])
+    marcas = MarcasConcluidas(alvos, [80, 443])
+    
+    assert marcas.marcar(RESULTADOS[0])
+    assert not marcas.marcar(RESULTADOS[0])  # já marcado
+    assert not marcas.marcar(RESULTADOS[0]._replace(ip='10.0.1.1'))  # fora da varredura
+    assert not marcas.marcar(RESULTADOS[0]._replace(porta=8080))
+    assert marcas.total == 1
+    assert marcas.concluido('10.0.0.2', 443)
+    assert not marcas.concluido('10.0.0.2', 80)
+
+
+def test_parar_na_primeira():
+    alvos = ConjuntoAlvos(faixas=[interpretar_alvo('10.0.0.0/29')])
+    marcas = MarcasConcluidas(alvos, [80, 443], parar_na_primeira=True)
+    marcas.marcar(RESULTADOS[0])  # respondeu no HTTPS
+    marcas.marcar(RESULTADOS[1])  # não respondeu
+    
+    assert marcas.concluido('10.0.0.2', 80)
+    assert not marcas.concluido('10.0.0.1', 443)
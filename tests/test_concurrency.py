@@ -0,0 +1,54 @@
+"""
+Testes do controle adaptativo de concorrência
+"""
+
+import pytest
+
+from services import concurrency
+from services.concurrency import ControleConcorrencia
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """Relógio monotônico controlado pelo teste (relogio[0] em segundos)"""
+    agora = [100.0]
+    monkeypatch.setattr(concurrency.time, 'monotonic', lambda: agora[0])
+    return agora
+
+
+def resultado(desfecho: Desfecho = Desfecho.OK, conexao_ms: float = 1.0) -> ResultadoTeste:
+    sondagem = ResultadoProtocolo(desfecho, conexao_ms=None if desfecho == Desfecho.RECURSO_LOCAL else conexao_ms)
+    return ResultadoTeste('10.0.0.1', 80, sondagem, sondagem)
+
+
+def rodada(controle: ControleConcorrencia, relogio, duracao: float, concluido: ResultadoTeste) -> int:
+    """Conclui uma rodada inteira em `duracao` segundos e retorna o novo limite"""
+    relogio[0] += duracao
+    for _ in range(max(controle.limite, ControleConcorrencia.AMOSTRAS_MINIMAS)):
+        controle.registrar(concluido)
+    return controle.limite
+
+
+def test_controle_concorrencia(relogio):
+    controle = ControleConcorrencia(inicial=8, minimo=2, maximo=64)
+    
+    # Partida lenta: dobra enquanto a vazão sobe
+    assert rodada(controle, relogio, 1.0, resultado()) == 16
+    assert rodada(controle, relogio, 1.0, resultado()) == 32
+    # Erro local: metade, e fim da partida lenta
+    assert rodada(controle, relogio, 1.0, resultado(Desfecho.RECURSO_LOCAL)) == 16
+    # Vazão estável mantém; vazão maior soma INCREMENTO
+    assert rodada(controle, relogio, 1.0, resultado()) == 16
+    assert rodada(controle, relogio, 0.5, resultado()) == 18
+    # Latência de conexão muito acima da base: -20%
+    assert rodada(controle, relogio, 0.1, resultado(conexao_ms=50.0)) == 14
+
+
+def test_controle_respeita_limites(relogio):
+    controle = ControleConcorrencia(inicial=100, minimo=3, maximo=40)
+    assert controle.limite == 40
+    
+    for _ in range(10):
+        rodada(controle, relogio, 1.0, resultado(Desfecho.RECURSO_LOCAL))
+    assert controle.limite == 3
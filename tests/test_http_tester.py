@@ -0,0 +1,115 @@
+"""
+Testes da classificação de falhas e do farejamento de protocolo (--farejar)
+contra servidores locais
+"""
+
+import errno
+import socket
+import ssl
+
+import pytest
+
+from services.http_tester import HTTPTester, classificar_excecao, extrair_codigo_status
+from services.probe_result import Desfecho, formatar_protocolo
+from services.timeouts import PoliticaTimeout
+from servidores import porta_fechada, servidor_local
+
+POLITICA = PoliticaTimeout(conexao=2, tls=1, leitura=1)
+
+
+def farejar(porta: int):
+    with HTTPTester(porta=porta, farejar_protocolo=True, politica_timeout=POLITICA) as tester:
+        return tester.testar_ip('127.0.0.1')
+
+
+def test_extrair_codigo_status():
+    assert extrair_codigo_status(b"HTTP/1.1 200 OK") == 200
+    assert extrair_codigo_status(b"HTTP/1.0 404") == 404
+    assert extrair_codigo_status(b"<html>") is None
+    assert extrair_codigo_status(b"") is None
+
+
+def responder_contando(resposta: bytes):
+    """Responde sempre o mesmo e guarda o que cada conexão enviou"""
+    requisicoes = []
+    
+    def responder(requisicao: bytes) -> bytes:
+        requisicoes.append(requisicao)
+        return resposta
+    
+    return responder, requisicoes
+
+
+def test_farejar_servidor_sem_linha_de_status():
+    # Estilo HTTP/0.9: só o corpo, sem linha de status, para qualquer requisição
+    responder, requisicoes = responder_contando(b"<html><body>CPE</body></html>")
+    with servidor_local(responder) as porta:
+        resultado = farejar(porta)
+    
+    assert resultado.http == resultado.http._replace(desfecho=Desfecho.OK, codigo=0)
+    assert formatar_protocolo(resultado.http) == "OK (sem código)"
+    assert resultado.https.desfecho == Desfecho.ERRO_SSL
+    assert len(requisicoes) == 1
+
+
+def test_farejar_texto_puro_que_fecha_apos_responder():
+    # Rejeita o ClientHello com 400 e encerra a conexão em seguida
+    responder, requisicoes = responder_contando(b"HTTP/1.1 400 Bad Request\r\nConnection: close\r\n\r\n")
+    with servidor_local(responder) as porta:
+        resultado = farejar(porta)
+    
+    assert resultado.http.desfecho == Desfecho.OK
+    assert resultado.http.codigo == 400
+    assert resultado.https.desfecho == Desfecho.ERRO_SSL
+    # Uma única conexão, a do ClientHello
+    assert len(requisicoes) == 1
+    assert not requisicoes[0].startswith(b"GET")
+
+
+def test_farejar_porta_tls(contexto_tls):
+    responder, requisicoes = responder_contando(b"HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n")
+    with servidor_local(responder, contexto_tls) as porta:
+        resultado = farejar(porta)
+    
+    assert resultado.https.desfecho == Desfecho.OK
+    assert resultado.https.codigo == 200
+    assert resultado.http.desfecho == Desfecho.PORTA_TLS
+    assert len(requisicoes) == 1
+
+
+def test_farejar_porta_fechada():
+    resultado = farejar(porta_fechada())
+    
+    assert resultado.http.desfecho == Desfecho.RECUSADA
+    assert resultado.https.desfecho == Desfecho.RECUSADA
+
+
+class ErroComMotivo(Exception):
+    """Como o MaxRetryError do urllib3: a causa fica no atributo reason"""
+    
+    def __init__(self, reason):
+        super().__init__('falhou')
+        self.reason = reason
+
+
+def com_causa(erro: BaseException, causa: BaseException) -> BaseException:
+    erro.__cause__ = causa
+    return erro
+
+
+@pytest.mark.parametrize('erro, desfecho', [
+    (com_causa(RuntimeError('x'), ssl.SSLError(1, 'handshake')), Desfecho.ERRO_SSL),
+    (ErroComMotivo(ConnectionRefusedError()), Desfecho.RECUSADA),
+    (Exception(socket.timeout()), Desfecho.TIMEOUT),
+    (ErroComMotivo(OSError(errno.EHOSTUNREACH, 'x')), Desfecho.HOST_INALCANCAVEL),
+    (OSError(errno.ENETUNREACH, 'x'), Desfecho.REDE_INALCANCAVEL),
+    (OSError(errno.EMFILE, 'x'), Desfecho.RECURSO_LOCAL),
+])
+def test_classificar_excecao(erro, desfecho):
+    assert classificar_excecao(erro) == desfecho
+
+
+def test_classificar_excecao_desconhecida():
+    erro = RuntimeError('x')
+    erro.__context__ = erro  # ciclo na cadeia
+    assert classificar_excecao(erro) is None
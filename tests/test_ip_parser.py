@@ -0,0 +1,61 @@
+"""
+Testes da conversão de linhas de alvos (IPs, prefixos CIDR e faixas)
+"""
+
+import pytest
+
+from utils.ip_parser import (
+    converter_linhas, int_para_ipv4, interpretar_alvo, ipv4_para_int, numpy_disponivel
+)
+
+LINHAS = (b"10.0.0.1\n"
+          b"# comentario\n"
+          b"\n"
+          b"192.168.1.0/30\n"
+          b" 10.0.0.2 \r\n"
+          b"10.0.1.1-10.0.1.3\n"
+          b"300.1.1.1\n"
+          b"010.0.0.3\n"
+          b"texto")
+
+MOTORES = [False, pytest.param(True, marks=pytest.mark.skipif(
+    not numpy_disponivel(), reason="NumPy não instalado"))]
+
+
+def test_ipv4_ida_e_volta():
+    for ip in ('0.0.0.0', '10.0.0.1', '255.255.255.255'):
+        assert int_para_ipv4(ipv4_para_int(ip)) == ip
+    assert ipv4_para_int('1.2.3.4') == 0x01020304
+    # Forma canônica usada pelo cadastro de equipamentos do desktop
+    assert int_para_ipv4(ipv4_para_int('010.000.0.3')) == '10.0.0.3'
+    for invalido in ('1.2.3', '1.2.3.256', '١.2.3.4', '1.2.3.4/32', ''):
+        with pytest.raises(ValueError):
+            ipv4_para_int(invalido)
+
+
+@pytest.mark.parametrize('texto', ['1.2.3', '1.2.3.256', '1.2.3.a', '1.2.3.-1', '1.2.3.4.5', '١.2.3.4'])
+def test_ipv4_invalido(texto):
+    with pytest.raises(ValueError):
+        ipv4_para_int(texto)
+
+
+def test_interpretar_alvo():
+    rede = ipv4_para_int('192.168.1.0')
+    assert interpretar_alvo('192.168.1.0/30') == (rede + 1, rede + 2)
+    assert interpretar_alvo('192.168.1.0/30', rede_inteira=True) == (rede, rede + 3)
+    assert interpretar_alvo('192.168.1.7/31') == (rede + 6, rede + 7)
+    assert interpretar_alvo('10.0.0.1 - 10.0.0.9') == (ipv4_para_int('10.0.0.1'), ipv4_para_int('10.0.0.9'))
+    with pytest.raises(ValueError):
+        interpretar_alvo('10.0.0.9-10.0.0.1')
+
+
+@pytest.mark.parametrize('usar_numpy', MOTORES)
+def test_converter_linhas(usar_numpy):
+    convertidos = converter_linhas(LINHAS, primeira_linha=5, usar_numpy=usar_numpy)
+    
+    assert sorted(convertidos.enderecos) == [ipv4_para_int('10.0.0.1'), ipv4_para_int('10.0.0.2'),
+                                             ipv4_para_int('10.0.0.3')]
+    assert sorted(convertidos.faixas) == [interpretar_alvo('10.0.1.1-10.0.1.3'),
+                                          interpretar_alvo('192.168.1.0/30')]
+    assert convertidos.invalidas == [(11, '300.1.1.1'), (13, 'texto')]
+    assert convertidos.quebras == 8
@@ -0,0 +1,79 @@
+"""
+Testes do histórico de portas (ordem do modo --parar-na-primeira)
+"""
+
+import os
+
+from services.port_history import HistoricoPortas
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste
+
+OK = ResultadoProtocolo(Desfecho.OK, 200)
+TIMEOUT = ResultadoProtocolo(Desfecho.TIMEOUT)
+
+
+def respondeu(ip: str, porta: int) -> ResultadoTeste:
+    return ResultadoTeste(ip, porta, OK, TIMEOUT)
+
+
+def test_ordenar_portas():
+    historico = HistoricoPortas()
+    for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+        historico.registrar(respondeu(ip, 8080))
+    historico.registrar(respondeu('10.0.0.9', 443))
+    historico.registrar(ResultadoTeste('10.0.0.9', 80, TIMEOUT, TIMEOUT))  # sem resposta
+    
+    # A última porta do IP vem primeiro; depois, a contagem global; empates na ordem dada
+    assert historico.ordenar_portas('10.0.0.9', [80, 8080, 443, 2265]) == [443, 8080, 80, 2265]
+    assert historico.ordenar_portas('10.0.0.50', [80, 443, 8080]) == [8080, 443, 80]
+
+
+def test_limite_de_ips():
+    historico = HistoricoPortas(max_ips=2)
+    historico.registrar(respondeu('10.0.0.1', 443))
+    historico.registrar(respondeu('10.0.0.2', 443))
+    historico.registrar(respondeu('10.0.0.1', 443))  # volta a ser o mais recente
+    historico.registrar(respondeu('10.0.0.3', 80))
+    
+    assert historico.ordenar_portas('10.0.0.2', [80, 443]) == [443, 80]  # só a contagem global
+    assert historico.ordenar_portas('10.0.0.3', [443, 80]) == [80, 443]
+    assert len(historico._porta_por_ip) == 2
+
+
+def test_carregar_csvs_com_e_sem_porta(tmp_path):
+    antigo = tmp_path / 'resultados_antigo.csv'
+    antigo.write_text("IP,HTTP,HTTPS,Status\n"
+                      "10.0.0.1,OK (200),Timeout,OK\n"
+                      "10.0.0.2,Timeout,Timeout,Timeout\n", encoding='utf-8')
+    atual = tmp_path / 'resultados_atual.csv'
+    atual.write_text("IP,Porta,HTTP,HTTPS\n"
+                     "10.0.0.1,8443,Timeout,OK (302)\n"
+                     "10.0.0.3,80,Conexão recusada,Timeout\n", encoding='utf-8')
+    os.utime(antigo, (1, 1))  # o mais antigo é lido primeiro
+    historico = HistoricoPortas()
+    
+    aproveitadas = historico.carregar_csvs([str(tmp_path / 'resultados_*.csv')], porta_padrao=2265)
+    
+    assert aproveitadas == 2
+    assert historico.ordenar_portas('10.0.0.1', [2265, 8443]) == [8443, 2265]
+    assert historico.ordenar_portas('10.0.0.3', [80, 2265, 8443]) == [2265, 8443, 80]
+
+
+def test_csv_sem_porta_ignorado_sem_porta_padrao(tmp_path):
+    (tmp_path / 'resultados_antigo.csv').write_text("IP,HTTP,HTTPS\n10.0.0.1,OK (200),Timeout\n",
+                                                    encoding='utf-8')
+    
+    assert HistoricoPortas().carregar_csvs([str(tmp_path / '*.csv')]) == 0
+
+
+def test_salvar_e_carregar(tmp_path):
+    caminho = str(tmp_path / 'historico.json')
+    historico = HistoricoPortas(caminho)
+    historico.registrar(respondeu('10.0.0.1', 443))
+    historico.registrar(respondeu('10.0.0.2', 8080))
+    historico.salvar()
+    
+    recarregado = HistoricoPortas(caminho)
+    recarregado.inicializar([str(tmp_path / 'nenhum_*.csv')])
+    
+    assert recarregado.ordenar_portas('10.0.0.1', [8080, 443]) == [443, 8080]
+    assert recarregado.ordenar_portas('10.0.0.2', [443, 8080]) == [8080, 443]
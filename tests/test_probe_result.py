@@ -0,0 +1,70 @@
+"""
+Testes dos tipos de resultado e dos textos exibidos
+"""
+
+import pickle
+
+import pytest
+
+from services.probe_result import (
+    Desfecho, ResultadoProtocolo, ResultadoTeste, StatusGeral, formatar_protocolo,
+    inferir_resultado, interpretar_texto, status_geral
+)
+
+OK = ResultadoProtocolo(Desfecho.OK, 200)
+TIMEOUT = ResultadoProtocolo(Desfecho.TIMEOUT)
+
+
+@pytest.mark.parametrize('desfecho', list(Desfecho))
+@pytest.mark.parametrize('inferido', [False, True])
+def test_texto_ida_e_volta(desfecho, inferido):
+    if desfecho == Desfecho.OK:
+        resultado = ResultadoProtocolo(desfecho, 301)
+    else:
+        resultado = ResultadoProtocolo(desfecho, inferido=inferido)
+    
+    assert interpretar_texto(formatar_protocolo(resultado)) == resultado
+
+
+def test_erro_generico_guarda_o_tipo():
+    erro = ResultadoProtocolo(Desfecho.ERRO, detalhe='SSLZeroReturnError')
+    
+    assert formatar_protocolo(erro) == "Erro: SSLZeroReturnError"
+    assert interpretar_texto("Erro: SSLZeroReturnError") == erro
+    assert formatar_protocolo(ResultadoProtocolo(Desfecho.ERRO)) == "Erro"
+
+
+def test_interpretar_textos_antigos():
+    assert interpretar_texto("OK") == ResultadoProtocolo(Desfecho.OK, 0)
+    assert interpretar_texto(" OK (404) ") == ResultadoProtocolo(Desfecho.OK, 404)
+    assert interpretar_texto("") == ResultadoProtocolo(Desfecho.ERRO)
+
+
+def test_status_geral():
+    recusada = ResultadoProtocolo(Desfecho.RECUSADA)
+    prazo = ResultadoProtocolo(Desfecho.PRAZO_ESGOTADO)
+    
+    assert status_geral(ResultadoTeste('10.0.0.1', 80, TIMEOUT, OK)) == StatusGeral.OK
+    assert status_geral(ResultadoTeste('10.0.0.1', 80, TIMEOUT, prazo)) == StatusGeral.TIMEOUT
+    assert status_geral(ResultadoTeste('10.0.0.1', 80, TIMEOUT, recusada)) == StatusGeral.ERRO
+
+
+def test_inferir_resultado():
+    assert inferir_resultado(TIMEOUT) == ResultadoProtocolo(Desfecho.TIMEOUT, inferido=True)
+    inalcancavel = ResultadoProtocolo(Desfecho.HOST_INALCANCAVEL)
+    assert inferir_resultado(inalcancavel).inferido
+    # A conexão TCP completou: o outro protocolo precisa ser testado
+    assert inferir_resultado(ResultadoProtocolo(Desfecho.TIMEOUT, conexao_ms=1.0)) is None
+    assert inferir_resultado(ResultadoProtocolo(Desfecho.RECUSADA)) is None
+
+
+def test_tempos_compactos():
+    resultado = ResultadoProtocolo(Desfecho.OK, 200, total_ms=3.25, conexao_ms=1.5)
+    
+    assert (resultado.total_ms, resultado.conexao_ms) == (3.25, 1.5)
+    assert (resultado.dns_ms, resultado.tls_ms, resultado.primeiro_byte_ms) == (None, None, None)
+    assert abs(ResultadoProtocolo(Desfecho.OK, total_ms=1234.567).total_ms - 1234.567) < 0.001
+    assert pickle.loads(pickle.dumps(resultado)) == resultado
+    # Sem tempos: uma instância por combinação de campos
+    assert ResultadoProtocolo(Desfecho.OK, 200) is OK
+    assert pickle.loads(pickle.dumps(OK)) is OK
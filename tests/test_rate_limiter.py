@@ -0,0 +1,96 @@
+"""
+Testes do limitador de taxa e do limite de sondagens simultâneas por sub-rede
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import rate_limiter
+from services.rate_limiter import LimitadorSubRedes, LimitadorTaxa, sub_rede
+from services.scheduler import executar_em_janela
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """Relógio monotônico controlado pelo teste (relogio[0] em segundos)"""
+    agora = [100.0]
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', lambda: agora[0])
+    return agora
+
+
+def test_limitador_taxa(relogio):
+    limitador = LimitadorTaxa(taxa=10, rajada=2)
+    
+    assert [limitador.reservar() for _ in range(4)] == [0.0, 0.0, pytest.approx(0.1), pytest.approx(0.2)]
+    relogio[0] += 1.0  # reabastece até a rajada, não além
+    assert [limitador.reservar() for _ in range(3)] == [0.0, 0.0, pytest.approx(0.1)]
+    with pytest.raises(ValueError):
+        LimitadorTaxa(taxa=0)
+
+
+@pytest.mark.parametrize('taxa, rajada', [(50, None), (1000, 10), (2.5, 1)])
+def test_taxa_media_exata(relogio, taxa, rajada):
+    limitador = LimitadorTaxa(taxa=taxa, rajada=rajada)
+    conexoes = 500
+    
+    # Uma conexão por vez, cada uma esperando o tempo pedido (como aguardar())
+    for _ in range(conexoes):
+        relogio[0] += limitador.reservar()
+    
+    # Passada a rajada, as conexões saem exatamente a `taxa` por segundo
+    assert relogio[0] - 100.0 == pytest.approx((conexoes - limitador.capacidade) / taxa)
+    
+    # Reservas simultâneas: esperas escalonadas em 1/taxa, na ordem de chegada
+    relogio[0] += 1000.0
+    esperas = [limitador.reservar() for _ in range(limitador.capacidade + 3)]
+    assert esperas[limitador.capacidade:] == [pytest.approx(n / taxa) for n in (1, 2, 3)]
+
+
+def test_limitador_sub_redes():
+    limitador = LimitadorSubRedes(limite=2, prefixo=24)
+    
+    assert limitador.tentar_ocupar('10.0.0.1')
+    assert limitador.tentar_ocupar('10.0.0.2')
+    assert not limitador.tentar_ocupar('10.0.0.3')  # mesma /24
+    assert limitador.tentar_ocupar('10.0.1.1')
+    limitador.liberar('10.0.0.1')
+    assert limitador.tentar_ocupar('10.0.0.3')
+    for ip in ('10.0.0.2', '10.0.0.3', '10.0.1.1'):
+        limitador.liberar(ip)
+    assert limitador._ativos == {}
+
+
+def test_janela_adia_sub_redes_lotadas_sem_bloquear_threads():
+    lock = threading.Lock()
+    ativos = {}
+    maximo = {}
+    inicio = {}
+    
+    def sondar(ip: str) -> str:
+        rede = sub_rede(ip, 24)
+        with lock:
+            inicio[ip] = time.monotonic()
+            ativos[rede] = ativos.get(rede, 0) + 1
+            maximo[rede] = max(maximo.get(rede, 0), ativos[rede])
+        time.sleep(0.05)
+        with lock:
+            ativos[rede] -= 1
+        return ip
+    
+    # Uma /24 lotada na frente da fila não pode segurar as outras
+    ips = [f'10.0.0.{n}' for n in range(1, 9)] + [f'10.0.{rede}.1' for rede in range(1, 7)]
+    tarefas = ((sondar, (ip,), (ip, 80)) for ip in ips)
+    limitador = LimitadorSubRedes(limite=2, prefixo=24)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        concluidos = [future.result() for future, _ in
+                      executar_em_janela(executor, tarefas, 4, limitador, max_adiadas=8)]
+    
+    assert sorted(concluidos) == sorted(ips)
+    assert max(maximo.values()) == 2
+    assert maximo[sub_rede('10.0.0.1', 24)] == 2
+    # As outras sub-redes começam antes de a /24 lotada terminar
+    assert max(inicio[f'10.0.{rede}.1'] for rede in range(1, 7)) < inicio['10.0.0.8']
+    assert limitador._ativos == {}
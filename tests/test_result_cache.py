@@ -0,0 +1,82 @@
+"""
+Testes do cache de resultados (validade, LRU, perfil do teste e SQLite)
+"""
+
+import sqlite3
+
+from services import result_cache
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste
+from services.result_cache import CacheResultados, criar_cache, perfil_teste
+from services.timeouts import PoliticaTimeout
+
+POLITICA = PoliticaTimeout.unica(5)
+PERFIL = perfil_teste(False, POLITICA)
+
+
+def resultado(ip: str, desfecho: Desfecho = Desfecho.OK, inferido: bool = False) -> ResultadoTeste:
+    http = ResultadoProtocolo(desfecho, 200 if desfecho == Desfecho.OK else 0)
+    https = ResultadoProtocolo(desfecho, inferido=inferido)
+    return ResultadoTeste(ip, 80, http, https)
+
+
+def test_obter_guardado_e_vencido(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(result_cache.time, 'time', lambda: agora[0])
+    cache = CacheResultados(validade=60, max_entradas=10)
+    cache.guardar([resultado('10.0.0.1')], PERFIL)
+    
+    assert cache.obter('10.0.0.1', 80, PERFIL) == resultado('10.0.0.1')
+    agora[0] += 61
+    assert cache.obter('10.0.0.1', 80, PERFIL) is None
+
+
+def test_descarta_os_menos_usados():
+    cache = CacheResultados(validade=60, max_entradas=4)  # 2 sondagens por alvo
+    cache.guardar([resultado('10.0.0.1'), resultado('10.0.0.2')], PERFIL)
+    cache.obter('10.0.0.1', 80, PERFIL)
+    cache.guardar([resultado('10.0.0.3')], PERFIL)
+    
+    assert cache.obter('10.0.0.2', 80, PERFIL) is None
+    assert cache.obter('10.0.0.1', 80, PERFIL) is not None
+    assert cache.obter('10.0.0.3', 80, PERFIL) is not None
+
+
+def test_perfil_separa_modos_de_teste():
+    inferindo = perfil_teste(False, POLITICA, inferir_https=True)
+    curto = perfil_teste(False, PoliticaTimeout.unica(1))
+    assert len({PERFIL, inferindo, curto, perfil_teste(True, POLITICA)}) == 4
+    
+    cache = CacheResultados(validade=60, max_entradas=10)
+    cache.guardar([resultado('10.0.0.1', Desfecho.TIMEOUT, inferido=True)], inferindo)
+    cache.guardar([resultado('10.0.0.2', Desfecho.TIMEOUT)], curto)
+    
+    assert cache.obter('10.0.0.1', 80, inferindo) is not None
+    assert cache.obter('10.0.0.1', 80, PERFIL) is None
+    assert cache.obter('10.0.0.2', 80, PERFIL) is None
+
+
+def test_nao_guarda_falhas_locais():
+    cache = CacheResultados(validade=60, max_entradas=10)
+    cache.guardar([resultado('10.0.0.1', Desfecho.RECURSO_LOCAL),
+                   resultado('10.0.0.2', Desfecho.PRAZO_ESGOTADO)], PERFIL)
+    assert len(cache) == 0
+
+
+def test_sqlite_sobrevive_e_descarta_tabela_antiga(tmp_path):
+    caminho = str(tmp_path / 'cache.sqlite')
+    with sqlite3.connect(caminho) as conexao:
+        conexao.execute("CREATE TABLE resultados (ip TEXT, verificar_ssl INTEGER)")
+    
+    cache = CacheResultados(validade=60, max_entradas=10, caminho_arquivo=caminho)
+    cache.guardar([resultado('10.0.0.1')], PERFIL)
+    cache.persistir()
+    
+    recarregado = CacheResultados(validade=60, max_entradas=10, caminho_arquivo=caminho)
+    assert recarregado.obter('10.0.0.1', 80, PERFIL) == resultado('10.0.0.1')
+    with sqlite3.connect(caminho) as conexao:
+        tabelas = {linha[0] for linha in conexao.execute("SELECT name FROM sqlite_master")}
+    assert 'resultados' not in tabelas
+
+
+def test_validade_zero_desabilita():
+    assert criar_cache(0, 10) is None
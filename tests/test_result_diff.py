@@ -0,0 +1,66 @@
+"""
+Testes da comparação entre varreduras
+"""
+
+from collections import Counter
+
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste
+from utils.result_diff import AUSENTE, Transicao, comparar_resultados, estado
+
+OK = ResultadoProtocolo(Desfecho.OK, 200)
+TIMEOUT = ResultadoProtocolo(Desfecho.TIMEOUT)
+RECUSADA = ResultadoProtocolo(Desfecho.RECUSADA)
+
+
+def resultado(ip: str, http: ResultadoProtocolo, porta: int = 80) -> ResultadoTeste:
+    return ResultadoTeste(ip, porta, http, TIMEOUT)
+
+
+ANTERIORES = [
+    resultado('10.0.0.1', OK),
+    resultado('10.0.0.2', OK),
+    resultado('10.0.0.9', OK),  # só na anterior
+]
+ATUAIS = [
+    resultado('10.0.0.1', OK),
+    resultado('10.0.0.2', TIMEOUT),
+    resultado('10.0.0.10', RECUSADA),  # só na atual (depois de .9 em ordem numérica)
+]
+
+
+def test_estado():
+    assert estado(None) == AUSENTE
+    assert estado(resultado('10.0.0.1', OK)) == "OK"
+    assert estado(resultado('10.0.0.1', TIMEOUT)) == "Timeout"
+    assert estado(resultado('10.0.0.1', RECUSADA)) == estado(
+        ResultadoTeste('10.0.0.1', 80, TIMEOUT, RECUSADA))
+
+
+def test_ausentes_so_contados_por_padrao():
+    contagem = Counter()
+    transicoes = list(comparar_resultados(ANTERIORES, ATUAIS, contagem))
+    
+    assert transicoes == [Transicao('10.0.0.2', 80, "OK", "Timeout")]
+    assert contagem[("OK", "OK")] == 1
+    assert contagem[("OK", AUSENTE)] == 1
+    assert contagem[(AUSENTE, estado(ATUAIS[2]))] == 1
+
+
+def test_incluir_ausentes():
+    transicoes = list(comparar_resultados(ANTERIORES, ATUAIS, incluir_ausentes=True))
+    
+    assert [(t.ip, t.anterior, t.atual) for t in transicoes] == [
+        ('10.0.0.2', "OK", "Timeout"),
+        ('10.0.0.9', "OK", AUSENTE),
+        ('10.0.0.10', AUSENTE, estado(ATUAIS[2])),
+    ]
+
+
+def test_repetido_vale_o_ultimo():
+    anteriores = [resultado('10.0.0.1', OK)]
+    atuais = [resultado('10.0.0.1', TIMEOUT), resultado('10.0.0.1', OK),
+              resultado('10.0.0.1', TIMEOUT, porta=8080)]
+    contagem = Counter()
+    
+    assert list(comparar_resultados(anteriores, atuais, contagem)) == []
+    assert contagem == Counter({("OK", "OK"): 1, (AUSENTE, "Timeout"): 1})
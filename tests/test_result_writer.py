@@ -0,0 +1,58 @@
+"""
+Testes da gravação, ordenação em disco e leitura dos resultados
+"""
+
+import pytest
+
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste
+from utils.result_writer import EscritorResultados, ler_resultados, ordenar_arquivo
+
+OK = ResultadoProtocolo(Desfecho.OK, 200)
+TIMEOUT = ResultadoProtocolo(Desfecho.TIMEOUT)
+INFERIDO = ResultadoProtocolo(Desfecho.TIMEOUT, inferido=True)
+
+RESULTADOS = [
+    ResultadoTeste('10.0.0.10', 80, OK, ResultadoProtocolo(Desfecho.ERRO_SSL)),
+    ResultadoTeste('10.0.0.9', 8080, TIMEOUT, INFERIDO),
+    ResultadoTeste('10.0.0.9', 443, ResultadoProtocolo(Desfecho.RECUSADA), OK),
+    ResultadoTeste('9.255.255.255', 80, TIMEOUT, INFERIDO),
+]
+
+
+def sem_tempos(resultado: ResultadoTeste) -> ResultadoTeste:
+    """O que volta da leitura: desfechos e códigos, sem os tempos"""
+    def protocolo(sondagem: ResultadoProtocolo) -> ResultadoProtocolo:
+        return ResultadoProtocolo(sondagem.desfecho, sondagem.codigo, inferido=sondagem.inferido)
+    return resultado._replace(http=protocolo(resultado.http), https=protocolo(resultado.https))
+
+
+@pytest.mark.parametrize('formato', ['csv', 'jsonl'])
+def test_gravar_ordenar_e_ler(tmp_path, formato):
+    caminho = str(tmp_path / f'resultados.{formato}')
+    cronometrado = RESULTADOS[0]._replace(http=ResultadoProtocolo(Desfecho.OK, 200, 3.25, conexao_ms=1.5))
+    with EscritorResultados(caminho) as escritor:
+        for resultado in [cronometrado] + RESULTADOS[1:]:
+            escritor.adicionar(resultado)
+    assert escritor.total_gravados == len(RESULTADOS)
+    assert list(ler_resultados(caminho)) == [sem_tempos(resultado) for resultado in RESULTADOS]
+    
+    ordenar_arquivo(caminho, linhas_por_lote=2)
+    
+    assert [(resultado.ip, resultado.porta) for resultado in ler_resultados(caminho)] == [
+        ('9.255.255.255', 80), ('10.0.0.9', 443), ('10.0.0.9', 8080), ('10.0.0.10', 80)]
+    assert sorted(tmp_path.iterdir()) == [tmp_path / f'resultados.{formato}']
+
+
+def test_csv_sem_coluna_porta(tmp_path):
+    caminho = tmp_path / 'antigo.csv'
+    caminho.write_text("IP,HTTP,HTTPS\n10.0.0.1,OK (301),Timeout\n", encoding='utf-8')
+    
+    assert list(ler_resultados(str(caminho), porta_padrao=8080)) == [
+        ResultadoTeste('10.0.0.1', 8080, ResultadoProtocolo(Desfecho.OK, 301), TIMEOUT)]
+    with pytest.raises(ValueError):
+        list(ler_resultados(str(caminho)))
+
+
+def test_formato_invalido(tmp_path):
+    with pytest.raises(ValueError):
+        EscritorResultados(str(tmp_path / 'resultados.txt'), 'xml')
@@ -0,0 +1,37 @@
+"""
+Testes da montagem da fila de trabalho (blocos, intercalação e portas)
+"""
+
+from services.rate_limiter import intercalar_sub_redes, sub_rede
+from services.scheduler import gerar_alvos, ler_blocos
+from utils.ip_parser import ipv4_para_int
+from utils.target_set import ConjuntoAlvos
+
+
+def test_intercalar_mantem_a_ordem_de_cada_sub_rede():
+    ips = ['1.1.1.1', '1.1.1.2', '2.2.2.1', '1.1.1.3', '2.2.2.2']
+    assert list(intercalar_sub_redes(ips)) == ['1.1.1.1', '2.2.2.1', '1.1.1.2', '2.2.2.2', '1.1.1.3']
+
+
+def test_blocos_alternam_entre_sub_redes_de_um_16_denso():
+    inicio = ipv4_para_int('10.0.0.0')
+    alvos = ConjuntoAlvos(faixas=[(inicio, inicio + 65535)])
+    blocos = list(ler_blocos(alvos, tamanho_bloco=1024))
+    
+    # Cada bloco cobre os 256 /24 do /16, não só os 4 de 1024 IPs consecutivos
+    assert {len({sub_rede(ip) for ip in bloco}) for bloco in blocos} == {256}
+    todos = [ip for bloco in blocos for ip in bloco]
+    assert len(todos) == len(set(todos)) == 65536
+
+
+def test_intercalar_limita_as_sub_redes_em_rodizio():
+    ips = [f"10.0.{rede}.{host}" for rede in range(8) for host in range(4)]
+    intercalados = list(intercalar_sub_redes(ips, max_sub_redes=2))
+    assert sorted(intercalados) == sorted(ips)
+    assert intercalados[:4] == ['10.0.0.0', '10.0.1.0', '10.0.0.1', '10.0.1.1']
+
+
+def test_gerar_alvos_porta_por_porta_e_pula_concluidos():
+    alvos = list(gerar_alvos(['10.0.0.1', '10.0.1.1'], [80, 443],
+                             concluido=lambda ip, porta: (ip, porta) == ('10.0.1.1', 80)))
+    assert alvos == [('10.0.0.1', 80), ('10.0.0.1', 443), ('10.0.1.1', 443)]
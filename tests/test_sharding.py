@@ -0,0 +1,67 @@
+"""
+Testes da varredura dividida entre processos
+"""
+
+import multiprocessing
+
+import pytest
+
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste
+from services.sharding import executar_em_processos
+from utils.checkpoint import MarcasConcluidas
+from utils.ip_parser import ipv4_para_int
+from utils.target_set import ConjuntoAlvos
+
+OK = ResultadoProtocolo(Desfecho.OK, 200)
+
+
+def alvos_de_teste() -> ConjuntoAlvos:
+    inicio = ipv4_para_int('10.0.0.0')
+    return ConjuntoAlvos(faixas=[(inicio, inicio + 2047)])
+
+
+def sondar_sem_rede(fatia, parametros, callback):
+    """Finge testar cada IP da fatia na porta 80, pulando os concluídos"""
+    concluido = parametros
+    for ip in fatia:
+        if concluido is None or not concluido(ip, 80):
+            callback(ResultadoTeste(ip, 80, OK, OK))
+
+
+def test_fatias_dividem_os_alvos_sem_repetir():
+    alvos = alvos_de_teste()
+    fatias = [alvos.fatia(indice, 3) for indice in range(3)]
+    ips = [ip for fatia in fatias for ip in fatia]
+    assert sorted(ips, key=ipv4_para_int) == list(alvos)
+
+
+def test_restringir_mantem_as_marcas_da_fatia():
+    alvos = alvos_de_teste()
+    marcas = MarcasConcluidas(alvos, [80, 443])
+    marcas.marcar(ResultadoTeste('10.0.3.7', 80, OK, OK))
+    marcas.marcar(ResultadoTeste('10.0.5.9', 443, OK, OK))
+    
+    restritas = [marcas.restringir(alvos.fatia(indice, 2)) for indice in range(2)]
+    
+    assert sum(parte.total for parte in restritas) == 2
+    assert any(parte.concluido('10.0.3.7', 80) for parte in restritas)
+    assert any(parte.concluido('10.0.5.9', 443) for parte in restritas)
+    assert not any(parte.concluido('10.0.3.7', 443) for parte in restritas)
+
+
+@pytest.mark.parametrize('metodo', ['fork', 'spawn'])
+def test_executar_em_processos(metodo, monkeypatch):
+    if metodo not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"{metodo} indisponível")
+    contexto = multiprocessing.get_context(metodo)
+    monkeypatch.setattr(multiprocessing, 'get_context', lambda: contexto)
+    alvos = alvos_de_teste()
+    marcas = MarcasConcluidas(alvos, [80])
+    marcas.marcar(ResultadoTeste('10.0.0.1', 80, OK, OK))
+    recebidos = []
+    
+    executar_em_processos(sondar_sem_rede, alvos, None, 2, callback=recebidos.append,
+                          parametros_da_fatia=lambda fatia: marcas.restringir(fatia).concluido)
+    
+    assert len(recebidos) == len(alvos) - 1
+    assert '10.0.0.1' not in {resultado.ip for resultado in recebidos}
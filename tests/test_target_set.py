@@ -0,0 +1,84 @@
+"""
+Testes do conjunto de alvos (faixas, exclusões, fatias e posições)
+"""
+
+import time
+from array import array
+
+from utils.ip_parser import interpretar_alvo, ipv4_para_int
+from utils.target_set import MAX_GRUPOS_FATIAMENTO, ConjuntoAlvos, mesclar_faixas, subtrair_faixas
+
+
+def alvos(*textos: str, exclusoes=()) -> ConjuntoAlvos:
+    enderecos = array('I')
+    faixas = []
+    for texto in textos:
+        primeiro, ultimo = interpretar_alvo(texto)
+        if primeiro == ultimo:
+            enderecos.append(primeiro)
+        else:
+            faixas.append((primeiro, ultimo))
+    return ConjuntoAlvos(enderecos, faixas, [interpretar_alvo(texto, rede_inteira=True)
+                                             for texto in exclusoes])
+
+
+def test_mesclar_faixas():
+    assert mesclar_faixas([(10, 20), (1, 3), (4, 5), (15, 30), (40, 40)]) == [(1, 5), (10, 30), (40, 40)]
+    assert mesclar_faixas([]) == []
+
+
+def test_subtrair_faixas():
+    assert subtrair_faixas([(1, 10), (20, 30)], [(0, 2), (5, 6), (10, 22), (30, 40)]) == [
+        (3, 4), (7, 9), (23, 29)]
+    assert subtrair_faixas([(1, 10)], []) == [(1, 10)]
+    assert subtrair_faixas([(5, 6)], [(1, 10)]) == []
+
+
+def test_repetidos_e_exclusoes():
+    conjunto = alvos('10.0.0.9', '10.0.0.9', '10.0.0.2', '10.0.0.0/29', '10.0.1.1-10.0.1.4',
+                     exclusoes=['10.0.1.2-10.0.1.3'])
+    
+    assert list(conjunto) == ['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4', '10.0.0.5',
+                              '10.0.0.6', '10.0.0.9', '10.0.1.1', '10.0.1.4']
+    assert len(conjunto) == 9
+    assert conjunto.total_repetidos == 2  # 10.0.0.9 repetido e 10.0.0.2 dentro do /29
+    assert conjunto.total_excluidos == 2
+
+
+def test_posicao_segue_a_iteracao():
+    conjunto = alvos('10.0.0.200', '10.0.0.0/28', '10.0.0.100', '10.0.2.0-10.0.2.9',
+                     exclusoes=['10.0.0.5'])
+    
+    for indice, ip in enumerate(conjunto):
+        assert conjunto.posicao(ip) == indice
+    assert conjunto.posicao('10.0.0.5') is None
+    assert conjunto.posicao('10.0.0.99') is None
+    assert conjunto.posicao('nao-e-ip') is None
+    assert '10.0.2.9' in conjunto
+
+
+def test_fatias_cobrem_tudo_sem_dividir_sub_redes():
+    conjunto = alvos(*(f'10.0.{rede}.7' for rede in range(20)), '10.1.0.0/22')
+    fatias = [conjunto.fatia(indice, 3) for indice in range(3)]
+    
+    assert sorted((ip for fatia in fatias for ip in fatia), key=ipv4_para_int) == list(conjunto)
+    assert sum(len(fatia) for fatia in fatias) == len(conjunto)
+    # Cada sub-rede /24 aparece em uma única fatia
+    redes = [{ipv4_para_int(ip) >> 8 for ip in fatia} for fatia in fatias]
+    assert sum(len(conjunto_redes) for conjunto_redes in redes) == len(set().union(*redes))
+
+
+def test_fatias_de_um_8_em_sub_redes_32():
+    conjunto = alvos('10.0.0.0-10.255.255.255', '11.0.0.5')
+    
+    inicio = time.perf_counter()
+    fatias = [conjunto.fatia(indice, 4, prefixo=32) for indice in range(4)]
+    assert time.perf_counter() - inicio < 5  # sem percorrer os 16M endereços
+    
+    assert sum(len(fatia) for fatia in fatias) == len(conjunto)
+    assert all(len(fatia.faixas) <= MAX_GRUPOS_FATIAMENTO for fatia in fatias)
+    assert all(len(fatia) > len(conjunto) // 8 for fatia in fatias)  # divisão equilibrada
+    # Faixas de fatias diferentes não se sobrepõem
+    pedacos = sorted(faixa for fatia in fatias for faixa in fatia.faixas)
+    assert all(anterior[1] < seguinte[0] for anterior, seguinte in zip(pedacos, pedacos[1:]))
+    assert sum(fatia.posicao('11.0.0.5') is not None for fatia in fatias) == 1
@@ -0,0 +1,51 @@
+"""
+Testes do prazo por IP e do timeout adaptativo
+"""
+
+import pytest
+
+from services.timeouts import OrcamentoIPs, TimeoutAdaptativo
+
+
+def test_orcamento_desconta_e_esgota():
+    orcamento = OrcamentoIPs(prazo=2.0, sondagens_por_ip=3)
+    orcamento.consumir('10.0.0.1', 1.5)
+    assert orcamento.restante('10.0.0.1') == 0.5
+    orcamento.consumir('10.0.0.1', 1.0)
+    assert orcamento.restante('10.0.0.1') == 0.0
+    assert orcamento.restante('10.0.0.2') == 2.0
+
+
+def test_orcamento_descarta_ip_concluido():
+    orcamento = OrcamentoIPs(prazo=5.0, sondagens_por_ip=2)
+    for indice in range(1000):
+        ip = f"10.0.{indice >> 8}.{indice & 255}"
+        orcamento.consumir(ip, 0.1)
+        orcamento.consumir(ip, 0.1)
+    assert len(orcamento) == 0
+
+
+def test_orcamento_sondagens_por_funcao_e_liberar():
+    orcamento = OrcamentoIPs(prazo=5.0, sondagens_por_ip=lambda ip: 1 if ip.endswith('.1') else 3)
+    orcamento.consumir('10.0.0.1', 1.0)
+    orcamento.consumir('10.0.0.2', 1.0)
+    assert len(orcamento) == 1
+    orcamento.liberar('10.0.0.2')
+    assert len(orcamento) == 0
+    assert orcamento.restante('10.0.0.2') == 5.0
+
+
+def test_timeout_adaptativo_por_sub_rede():
+    estimador = TimeoutAdaptativo(minimo=0.2, maximo=5.0)
+    assert estimador.timeout('10.0.0.1') == 5.0  # sem amostras
+    
+    estimador.registrar('10.0.0.1', 0.1)  # SRTT 0.1, RTTVAR 0.05
+    assert estimador.timeout('10.0.0.200') == pytest.approx(0.3)
+    assert estimador.timeout('10.0.1.1') == 5.0  # outra sub-rede
+    
+    for _ in range(50):
+        estimador.registrar('10.0.0.1', 0.01)
+    assert estimador.timeout('10.0.0.1') == 0.2  # piso
+    
+    estimador.registrar('10.0.0.1', 30.0)
+    assert estimador.timeout('10.0.0.1') == 5.0  # teto
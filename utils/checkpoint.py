@@ -0,0 +1,252 @@
+"""
+Diário de retomada: registro só de acréscimos dos testes concluídos
+
+Cada teste (IP, porta) concluído vira um registro binário de tamanho fixo
+com os desfechos e códigos HTTP. As gravações são agrupadas e sincronizadas
+em disco (fsync) em lotes, o que permite milhares de registros por segundo;
+uma interrupção perde no máximo o último lote, que volta a ser testado.
+Ao retomar, os registros marcam um mapa de bits indexado pela posição do
+alvo no ConjuntoAlvos (1 bit por IP × porta).
+"""
+
+import os
+import struct
+import time
+from typing import Iterator, List, Optional
+
+from services.probe_result import Desfecho, ResultadoProtocolo, ResultadoTeste
+from utils.ip_parser import int_para_ipv4, ipv4_para_int
+from utils.target_set import ConjuntoAlvos
+
+CABECALHO = b'DIARIO-VARREDURA 1\n'
+
+# IP, porta, desfecho HTTP, desfecho HTTPS, inferidos (bit 0 = HTTP,
+# bit 1 = HTTPS), código HTTP, código HTTPS
+_REGISTRO = struct.Struct('<IHBBBxHH')
+
+# Sincronização em disco a cada N registros ou a cada intervalo, o que vier primeiro
+REGISTROS_POR_SINCRONIA = 4096
+INTERVALO_SINCRONIA = 1.0  # segundos
+
+# Registros lidos por vez ao carregar o diário
+_REGISTROS_POR_LEITURA = 65536
+
+
+def _codificar(resultado: ResultadoTeste) -> bytes:
+    """Monta o registro binário de um resultado"""
+    inferidos = int(resultado.http.inferido) | int(resultado.https.inferido) << 1
+    return _REGISTRO.pack(
+        ipv4_para_int(resultado.ip), resultado.porta,
+        resultado.http.desfecho, resultado.https.desfecho, inferidos,
+        resultado.http.codigo, resultado.https.codigo
+    )
+
+
+def _registros_validos(caminho_arquivo: str) -> int:
+    """
+    Quantidade de registros completos no diário.
+    
+    Raises:
+        ValueError: Se o arquivo não é um diário de varredura
+    """
+    with open(caminho_arquivo, 'rb') as arquivo:
+        if arquivo.read(len(CABECALHO)) != CABECALHO:
+            raise ValueError(f"{caminho_arquivo} não é um diário de varredura")
+    return (os.path.getsize(caminho_arquivo) - len(CABECALHO)) // _REGISTRO.size
+
+
+def ler_diario(caminho_arquivo: str) -> Iterator[ResultadoTeste]:
+    """
+    Lê os testes registrados no diário, na ordem de conclusão.
+    
+    Um registro incompleto no final (gravação interrompida) é ignorado.
+    Os resultados vêm sem os tempos de cada fase.
+    
+    Args:
+        caminho_arquivo: Diário gravado por DiarioVarredura
+    
+    Yields:
+        ResultadoTeste
+    
+    Raises:
+        FileNotFoundError: Se o diário não existir
+        ValueError: Se o arquivo não é um diário de varredura
+    """
+    restantes = _registros_validos(caminho_arquivo)
+    with open(caminho_arquivo, 'rb') as arquivo:
+        arquivo.seek(len(CABECALHO))
+        while restantes:
+            quantidade = min(restantes, _REGISTROS_POR_LEITURA)
+            dados = arquivo.read(quantidade * _REGISTRO.size)
+            restantes -= quantidade
+            for (numero, porta, desfecho_http, desfecho_https, inferidos,
+                 codigo_http, codigo_https) in _REGISTRO.iter_unpack(dados):
+                yield ResultadoTeste(
+                    int_para_ipv4(numero), porta,
+                    ResultadoProtocolo(Desfecho(desfecho_http), codigo_http,
+                                       inferido=bool(inferidos & 1)),
+                    ResultadoProtocolo(Desfecho(desfecho_https), codigo_https,
+                                       inferido=bool(inferidos & 2))
+                )
+
+
+class DiarioVarredura:
+    """
+    Grava os testes concluídos no diário, em lotes sincronizados com fsync.
+    
+    Uso:
+        with DiarioVarredura('results.csv.diario', retomar=True) as diario:
+            diario.registrar(resultado)
+    
+    Não é seguro entre threads: registrar() deve ser chamado de uma só
+    thread (a que recebe os resultados).
+    """
+    
+    def __init__(self, caminho_arquivo: str, retomar: bool = False):
+        """
+        Abre o diário.
+        
+        Args:
+            caminho_arquivo: Arquivo do diário
+            retomar: Se acrescenta ao diário existente (descartando um registro
+                incompleto no final); com False, começa um diário novo
+        
+        Raises:
+            OSError: Se o arquivo não puder ser aberto
+            ValueError: Se retomar e o arquivo existente não é um diário
+        """
+        self.caminho_arquivo = caminho_arquivo
+        if retomar and os.path.exists(caminho_arquivo):
+            validos = _registros_validos(caminho_arquivo)
+            os.truncate(caminho_arquivo, len(CABECALHO) + validos * _REGISTRO.size)
+            self._arquivo = open(caminho_arquivo, 'ab', buffering=0)
+        else:
+            self._arquivo = open(caminho_arquivo, 'wb', buffering=0)
+            self._arquivo.write(CABECALHO)
+        self._pendentes = bytearray()
+        self._quantidade_pendente = 0
+        self._ultima_sincronia = time.monotonic()
+    
+    def __enter__(self) -> 'DiarioVarredura':
+        return self
+    
+    def __exit__(self, tipo, valor, rastro):
+        self.fechar()
+    
+    def registrar(self, resultado: ResultadoTeste):
+        """Acrescenta um teste concluído; sincroniza quando o lote fecha"""
+        self._pendentes += _codificar(resultado)
+        self._quantidade_pendente += 1
+        if (self._quantidade_pendente >= REGISTROS_POR_SINCRONIA
+                or time.monotonic() - self._ultima_sincronia >= INTERVALO_SINCRONIA):
+            self.sincronizar()
+    
+    def sincronizar(self):
+        """Grava os registros pendentes e força a gravação em disco (fsync)"""
+        if self._pendentes:
+            self._arquivo.write(self._pendentes)
+            os.fsync(self._arquivo.fileno())
+            self._pendentes = bytearray()
+            self._quantidade_pendente = 0
+        self._ultima_sincronia = time.monotonic()
+    
+    def fechar(self):
+        """Sincroniza os registros pendentes e fecha o diário"""
+        if self._arquivo.closed:
+            return
+        try:
+            self.sincronizar()
+        finally:
+            self._arquivo.close()
+
+
+class MarcasConcluidas:
+    """
+    Mapa de bits dos testes (IP × porta) já concluídos.
+    
+    O bit de cada teste é posição do IP no ConjuntoAlvos × número de portas
+    + índice da porta: 200 mil IPs × 7 portas ocupam 171 KB. Serializável,
+    para consulta nos processos de uma varredura dividida.
+    """
+    
+    def __init__(self, alvos: ConjuntoAlvos, portas: List[int], parar_na_primeira: bool = False):
+        """
+        Inicializa o mapa vazio.
+        
+        Args:
+            alvos: Alvos da varredura
+            portas: Portas testadas em cada IP
+            parar_na_primeira: Se um IP que já respondeu em alguma porta
+                conta como concluído em todas
+        """
+        self.alvos = alvos
+        self.parar_na_primeira = parar_na_primeira
+        self.total = 0
+        self._indice_porta = {porta: indice for indice, porta in enumerate(portas)}
+        self._bits = bytearray((len(alvos) * len(portas) + 7) // 8)
+        self._respondidos = bytearray((len(alvos) + 7) // 8)
+    
+    def _bit(self, ip: str, porta: int) -> Optional[int]:
+        """Bit do teste no mapa, ou None se não faz parte da varredura"""
+        indice_porta = self._indice_porta.get(porta)
+        if indice_porta is None:
+            return None
+        posicao = self.alvos.posicao(ip)
+        if posicao is None:
+            return None
+        return posicao * len(self._indice_porta) + indice_porta
+    
+    def marcar(self, resultado: ResultadoTeste) -> bool:
+        """
+        Marca um teste como concluído.
+        
+        Returns:
+            True se o teste faz parte da varredura e ainda não estava marcado
+        """
+        bit = self._bit(resultado.ip, resultado.porta)
+        if bit is None or self._bits[bit >> 3] & (1 << (bit & 7)):
+            return False
+        self._bits[bit >> 3] |= 1 << (bit & 7)
+        if resultado.respondeu:
+            posicao = bit // len(self._indice_porta)
+            self._respondidos[posicao >> 3] |= 1 << (posicao & 7)
+        self.total += 1
+        return True
+    
+    def restringir(self, alvos: ConjuntoAlvos) -> 'MarcasConcluidas':
+        """
+        Cópia das marcas só com os alvos de uma fatia (ex.: a de um processo).
+        
+        Args:
+            alvos: Subconjunto dos alvos originais
+        
+        Returns:
+            MarcasConcluidas indexada pelas posições em alvos
+        """
+        portas = len(self._indice_porta)
+        marcas = MarcasConcluidas(alvos, list(self._indice_porta), self.parar_na_primeira)
+        for destino, ip in enumerate(alvos):
+            origem = self.alvos.posicao(ip)
+            if origem is None:
+                continue
+            for indice in range(portas):
+                bit = origem * portas + indice
+                if self._bits[bit >> 3] & (1 << (bit & 7)):
+                    novo = destino * portas + indice
+                    marcas._bits[novo >> 3] |= 1 << (novo & 7)
+                    marcas.total += 1
+            if self._respondidos[origem >> 3] & (1 << (origem & 7)):
+                marcas._respondidos[destino >> 3] |= 1 << (destino & 7)
+        return marcas
+    
+    def concluido(self, ip: str, porta: int) -> bool:
+        """Indica se o teste (IP, porta) já foi concluído e deve ser pulado"""
+        bit = self._bit(ip, porta)
+        if bit is None:
+            return False
+        if self._bits[bit >> 3] & (1 << (bit & 7)):
+            return True
+        if self.parar_na_primeira:
+            posicao = bit // len(self._indice_porta)
+            return bool(self._respondidos[posicao >> 3] & (1 << (posicao & 7)))
+        return False
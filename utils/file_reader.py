@@ -1,9 +1,35 @@
 """
 Utilitário para leitura e validação de arquivos de IPs
+
+Além de IPs individuais, cada linha pode conter um prefixo CIDR
+(100.64.0.0/16) ou uma faixa (10.0.0.1-10.0.3.254). Os alvos são expandidos
+sob demanda, como inteiros, sem montar a lista de endereços em memória.
+
+Arquivos são mapeados em memória (mmap) e percorridos em trechos terminados
+em quebra de linha, sem cópia para o processo; os trechos podem ser
+convertidos em paralelo por vários processos.
 """
 
+import mmap
+import os
 import re
-from typing import List
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from utils.ip_parser import AlvosConvertidos, converter_linhas, int_para_ipv4
+
+# Linhas inválidas guardadas para o aviso ao usuário (as demais só são contadas)
+MAX_INVALIDAS_EXIBIDAS = 20
+
+# Bytes lidos do arquivo por vez (cada bloco é convertido em lote)
+TAMANHO_BLOCO_LEITURA = 1024 * 1024
+
+# Fatias convertidas à frente do consumo, por processo (limita a memória)
+FATIAS_POR_PROCESSO = 2
+
+_PADRAO_IPV4 = re.compile(r'^(\d{1,3}\.){3}\d{1,3}$')
 
 
 def validar_ipv4(ip: str) -> bool:
@@ -16,9 +42,7 @@ def validar_ipv4(ip: str) -> bool:
     Returns:
         True se o IP é válido, False caso contrário
     """
-    padrao_ipv4 = r'^(\d{1,3}\.){3}\d{1,3}$'
-    
-    if not re.match(padrao_ipv4, ip):
+    if not _PADRAO_IPV4.match(ip):
         return False
     
     partes = ip.split('.')
@@ -33,47 +57,212 @@ def validar_ipv4(ip: str) -> bool:
     return True
 
 
-def ler_ips_do_arquivo(caminho_arquivo: str) -> List[str]:
+@contextmanager
+def _mapear(caminho_arquivo: str) -> Iterator[Optional[mmap.mmap]]:
+    """Mapeia o arquivo para leitura (None se estiver vazio: mmap não aceita tamanho 0)"""
+    with open(caminho_arquivo, 'rb') as arquivo:
+        if os.fstat(arquivo.fileno()).st_size == 0:
+            yield None
+            return
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            yield mapa
+
+
+def _limites_trechos(mapa: mmap.mmap, tamanho: int) -> Iterator[Tuple[int, int]]:
+    """
+    Divide o arquivo mapeado em trechos de cerca de `tamanho` bytes.
+    
+    Cada trecho termina logo após uma quebra de linha (exceto o último); uma
+    linha maior que `tamanho` fica inteira em um trecho.
+    
+    Yields:
+        Tuplas (início, fim) em bytes, fim exclusivo
+    """
+    inicio, total = 0, len(mapa)
+    while inicio < total:
+        corte = inicio + tamanho
+        if corte >= total:
+            corte = total
+        else:
+            quebra = mapa.rfind(b'\n', inicio, corte)
+            if quebra < 0:
+                quebra = mapa.find(b'\n', corte)
+            corte = total if quebra < 0 else quebra + 1
+        yield inicio, corte
+        inicio = corte
+
+
+def fatiar_arquivo(caminho_arquivo: str,
+                   tamanho_fatia: int = TAMANHO_BLOCO_LEITURA) -> List[Tuple[int, int]]:
     """
-    Lê endereços IPv4 de um arquivo de texto.
+    Divide um arquivo de alvos em fatias de bytes para conversão em paralelo.
+    
+    Só as quebras de linha próximas aos cortes são lidas (mmap.rfind); o
+    arquivo não é copiado.
     
     Args:
-        caminho_arquivo: Caminho para o arquivo contendo os IPs
-        
+        caminho_arquivo: Caminho para o arquivo
+        tamanho_fatia: Tamanho aproximado de cada fatia, em bytes
+    
     Returns:
-        Lista de IPs válidos encontrados no arquivo
-        
-    Raises:
-        FileNotFoundError: Se o arquivo não existir
+        Lista de (início, fim) em bytes, cobrindo o arquivo, cada fatia
+        terminada em quebra de linha
+    """
+    with _mapear(caminho_arquivo) as mapa:
+        return [] if mapa is None else list(_limites_trechos(mapa, tamanho_fatia))
+
+
+def converter_fatia(caminho_arquivo: str, inicio: int, fim: int) -> AlvosConvertidos:
+    """
+    Converte uma fatia do arquivo (função dos processos de conversão).
+    
+    Returns:
+        AlvosConvertidos com as linhas inválidas numeradas a partir de 1 na fatia
     """
-    ips_validos = []
-    ips_invalidos = []
-    
-    try:
-        with open(caminho_arquivo, 'r', encoding='utf-8') as arquivo:
-            for numero_linha, linha in enumerate(arquivo, start=1):
-                # Remove espaços em branco e quebras de linha
-                ip = linha.strip()
-                
-                # Ignora linhas vazias e comentários
-                if not ip or ip.startswith('#'):
-                    continue
-                
-                # Valida o IP
-                if validar_ipv4(ip):
-                    ips_validos.append(ip)
-                else:
-                    ips_invalidos.append((numero_linha, ip))
+    with _mapear(caminho_arquivo) as mapa:
+        with memoryview(mapa)[inicio:fim] as trecho:
+            return converter_linhas(trecho)
+
+
+def _converter_mapeado(caminho_arquivo: str) -> Iterator[AlvosConvertidos]:
+    """Converte o arquivo mapeado em trechos de TAMANHO_BLOCO_LEITURA, neste processo"""
+    with _mapear(caminho_arquivo) as mapa:
+        if mapa is None:
+            return
+        for inicio, fim in _limites_trechos(mapa, TAMANHO_BLOCO_LEITURA):
+            # A visão precisa ser liberada antes de o mmap ser fechado
+            with memoryview(mapa)[inicio:fim] as trecho:
+                convertidos = converter_linhas(trecho)
+            yield convertidos
+
+
+def _converter_em_processos(caminho_arquivo: str, processos: int) -> Iterator[AlvosConvertidos]:
+    """
+    Converte as fatias do arquivo em vários processos, entregando-as em ordem.
+    
+    No máximo FATIAS_POR_PROCESSO fatias por processo ficam convertidas à
+    frente do consumo, para alimentar a varredura aos poucos.
+    """
+    fatias = iter(fatiar_arquivo(caminho_arquivo))
+    pendentes = deque()
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        try:
+            for inicio, fim in fatias:
+                pendentes.append(executor.submit(converter_fatia, caminho_arquivo, inicio, fim))
+                if len(pendentes) >= processos * FATIAS_POR_PROCESSO:
+                    yield pendentes.popleft().result()
+            while pendentes:
+                yield pendentes.popleft().result()
+        finally:
+            for futuro in pendentes:
+                futuro.cancel()
+
+
+class FonteAlvos:
+    """
+    Alvos IPv4 lidos sob demanda de um arquivo ou de um texto.
+    
+    Cada iteração relê a origem em blocos de bytes, convertidos em lote
+    (utils.ip_parser) e gerados um a um; prefixos e faixas são expandidos
+    como inteiros. len() conta os endereços em uma passada sem guardá-los
+    (o resultado fica em cache).
+    
+    A ordem do arquivo não é preservada: dentro de cada bloco, os IPs simples
+    vêm antes das faixas. Quem consome a fonte (ConjuntoAlvos) ordena e
+    mescla os alvos de todo modo.
+    """
+    
+    def __init__(self, converter_blocos: Callable[[], Iterable[AlvosConvertidos]],
+                 descricao: str = ''):
+        """
+        Inicializa a fonte.
+        
+        Args:
+            converter_blocos: Função que retorna, a cada chamada, um novo iterável
+                com os blocos da origem já convertidos, em ordem (linhas
+                inválidas numeradas a partir de 1 em cada bloco)
+            descricao: Origem dos alvos, usada nas mensagens de erro
+        """
+        self._converter_blocos = converter_blocos
+        self.descricao = descricao
+        self._total: Optional[int] = None
+        self.total_invalidas = 0
+        self.invalidas: List[Tuple[int, str]] = []  # (número da linha, texto), até MAX_INVALIDAS_EXIBIDAS
+    
+    @classmethod
+    def do_arquivo(cls, caminho_arquivo: str, processos: int = 1) -> 'FonteAlvos':
+        """
+        Cria uma fonte que lê o arquivo mapeado em memória, em trechos de
+        TAMANHO_BLOCO_LEITURA bytes.
+        
+        Args:
+            caminho_arquivo: Caminho para o arquivo
+            processos: Processos que convertem as fatias em paralelo (1 = neste
+                processo)
         
-        # Avisa sobre IPs inválidos
-        if ips_invalidos:
-            print(f"[AVISO] {len(ips_invalidos)} IP(s) invalido(s) encontrado(s) e ignorado(s)")
-            for linha, ip in ips_invalidos:
-                print(f"   Linha {linha}: {ip}")
+        Raises:
+            FileNotFoundError: Se o arquivo não existir
+        """
+        # Falha já na criação, como a leitura antiga
+        open(caminho_arquivo, 'rb').close()
         
-        return ips_validos
+        if processos > 1:
+            return cls(lambda: _converter_em_processos(caminho_arquivo, processos), caminho_arquivo)
+        return cls(lambda: _converter_mapeado(caminho_arquivo), caminho_arquivo)
+    
+    @classmethod
+    def do_texto(cls, texto: str) -> 'FonteAlvos':
+        """Cria uma fonte a partir de um texto com um alvo por linha"""
+        return cls(lambda: [converter_linhas(texto.encode('utf-8'))], 'texto')
+    
+    def blocos(self) -> Iterator[AlvosConvertidos]:
+        """
+        Converte a origem bloco a bloco.
         
-    except FileNotFoundError:
-        raise FileNotFoundError(f"Arquivo não encontrado: {caminho_arquivo}")
-    except Exception as e:
-        raise Exception(f"Erro ao ler arquivo {caminho_arquivo}: {str(e)}")
+        As linhas inválidas são contadas em total_invalidas e as primeiras
+        guardadas em invalidas.
+        """
+        self.total_invalidas = 0
+        self.invalidas = []
+        deslocamento = 0  # linhas dos blocos anteriores
+        for convertidos in self._converter_blocos():
+            if convertidos.invalidas:
+                invalidas = [(linha + deslocamento, texto) for linha, texto in convertidos.invalidas]
+                convertidos = convertidos._replace(invalidas=invalidas)
+                self.total_invalidas += len(invalidas)
+                espaco = MAX_INVALIDAS_EXIBIDAS - len(self.invalidas)
+                self.invalidas.extend(invalidas[:max(espaco, 0)])
+            deslocamento += convertidos.quebras
+            yield convertidos
+    
+    def faixas(self) -> Iterator[Tuple[int, int]]:
+        """Gera as faixas (primeiro, último) de cada alvo válido"""
+        for convertidos in self.blocos():
+            for numero in convertidos.enderecos:
+                yield numero, numero
+            yield from convertidos.faixas
+    
+    def __iter__(self) -> Iterator[str]:
+        for convertidos in self.blocos():
+            yield from map(int_para_ipv4, convertidos.enderecos)
+            for primeiro, ultimo in convertidos.faixas:
+                yield from map(int_para_ipv4, range(primeiro, ultimo + 1))
+    
+    def __len__(self) -> int:
+        if self._total is None:
+            self._total = sum(
+                len(convertidos.enderecos)
+                + sum(ultimo - primeiro + 1 for primeiro, ultimo in convertidos.faixas)
+                for convertidos in self.blocos()
+            )
+        return self._total
+
+
+def avisar_linhas_invalidas(alvos: FonteAlvos):
+    """Exibe as linhas inválidas encontradas na última leitura da fonte"""
+    if alvos.total_invalidas:
+        print(f"[AVISO] {alvos.total_invalidas} linha(s) invalida(s) encontrada(s) e ignorada(s)")
+        for linha, texto in alvos.invalidas:
+            print(f"   Linha {linha}: {texto}")
+        if alvos.total_invalidas > len(alvos.invalidas):
+            print(f"   ... e mais {alvos.total_invalidas - len(alvos.invalidas)}")
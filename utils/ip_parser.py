@@ -0,0 +1,230 @@
+"""
+Conversão em lote de linhas de alvos (IPs, prefixos CIDR e faixas) para
+endereços IPv4 como inteiros de 32 bits
+
+Um bloco inteiro de linhas é convertido de uma vez: com NumPy instalado, as
+linhas com um IP simples são interpretadas byte a byte de forma vetorizada;
+sem NumPy, cada linha passa por socket.inet_pton. Prefixos, faixas e IPs
+fora do formato estrito (espaços, zeros à esquerda) seguem pela
+interpretação completa, linha a linha.
+"""
+
+import ipaddress
+import socket
+import sys
+from array import array
+from typing import List, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: usa a conversão em Python puro
+    np = None
+
+
+class AlvosConvertidos(NamedTuple):
+    """Resultado da conversão de um bloco de linhas"""
+    enderecos: array  # array('I') com os IPs simples do bloco
+    faixas: List[Tuple[int, int]]  # (primeiro, último) de prefixos CIDR e faixas
+    invalidas: List[Tuple[int, str]]  # (número da linha, texto) das linhas inválidas
+    quebras: int = 0  # quebras de linha no bloco (numeração do bloco seguinte)
+
+
+def numpy_disponivel() -> bool:
+    """Indica se a conversão vetorizada (NumPy) pode ser usada"""
+    return np is not None
+
+
+def ipv4_para_int(texto: str) -> int:
+    """
+    Converte um IPv4 com pontos ("10.0.0.1") em inteiro.
+    
+    Raises:
+        ValueError: Se o texto não for um IPv4 com quatro octetos de 0 a 255
+    """
+    partes = texto.split('.')
+    if len(partes) != 4:
+        raise ValueError(texto)
+    numero = 0
+    for parte in partes:
+        if not (parte.isascii() and parte.isdigit() and len(parte) <= 3):
+            raise ValueError(texto)
+        octeto = int(parte)
+        if octeto > 255:
+            raise ValueError(texto)
+        numero = (numero << 8) | octeto
+    return numero
+
+
+def int_para_ipv4(numero: int) -> str:
+    """Converte um IPv4 em inteiro de volta para a notação com pontos"""
+    return f"{numero >> 24}.{(numero >> 16) & 255}.{(numero >> 8) & 255}.{numero & 255}"
+
+
+def interpretar_alvo(texto: str, rede_inteira: bool = False) -> Tuple[int, int]:
+    """
+    Converte uma linha de alvos em uma faixa de inteiros.
+    
+    Args:
+        texto: IP ("10.0.0.1"), prefixo CIDR ("100.64.0.0/16") ou faixa
+            ("10.0.0.1-10.0.3.254")
+        rede_inteira: Mantém os endereços de rede e de broadcast dos
+            prefixos (listas de exclusão)
+    
+    Returns:
+        Tupla (primeiro, último) inclusiva. Prefixos menores que /31 excluem
+        os endereços de rede e de broadcast, exceto com rede_inteira
+    
+    Raises:
+        ValueError: Se a linha não for um alvo válido
+    """
+    if '/' in texto:
+        rede = ipaddress.IPv4Network(texto.strip(), strict=False)
+        primeiro, ultimo = int(rede.network_address), int(rede.broadcast_address)
+        if rede.prefixlen < 31 and not rede_inteira:
+            primeiro, ultimo = primeiro + 1, ultimo - 1
+        return primeiro, ultimo
+    
+    if '-' in texto:
+        inicio, fim = texto.split('-', 1)
+        primeiro, ultimo = ipv4_para_int(inicio.strip()), ipv4_para_int(fim.strip())
+        if primeiro > ultimo:
+            raise ValueError(texto)
+        return primeiro, ultimo
+    
+    numero = ipv4_para_int(texto.strip())
+    return numero, numero
+
+
+def _interpretar_linha(linha: str, numero_linha: int, resultado: AlvosConvertidos):
+    """Interpreta uma linha fora do caminho rápido e acumula em resultado"""
+    texto = linha.strip()
+    if not texto or texto.startswith('#'):
+        return
+    try:
+        primeiro, ultimo = interpretar_alvo(texto)
+    except ValueError:
+        resultado.invalidas.append((numero_linha, texto))
+        return
+    if primeiro == ultimo:
+        resultado.enderecos.append(primeiro)
+    elif primeiro < ultimo:
+        resultado.faixas.append((primeiro, ultimo))
+
+
+def _converter_python(buffer: bytes, primeira_linha: int) -> AlvosConvertidos:
+    """
+    Conversão linha a linha com inet_pton (em C): aceita apenas "a.b.c.d" sem
+    zeros à esquerda; o que ele rejeita passa pela interpretação completa.
+    """
+    resultado = AlvosConvertidos(array('I'), [], [])
+    texto = str(buffer, 'utf-8', errors='replace')
+    if '\r' in texto:
+        texto = texto.replace('\r\n', '\n')
+    
+    empacotados = []
+    inet_pton, familia = socket.inet_pton, socket.AF_INET
+    for numero_linha, linha in enumerate(texto.split('\n'), start=primeira_linha):
+        try:
+            empacotados.append(inet_pton(familia, linha))
+        except OSError:
+            _interpretar_linha(linha, numero_linha, resultado)
+    
+    # Endereços em ordem de rede (big-endian) para array('I') na ordem da máquina
+    enderecos = array('I', b''.join(empacotados))
+    if sys.byteorder == 'little':
+        enderecos.byteswap()
+    enderecos.extend(resultado.enderecos)
+    return resultado._replace(enderecos=enderecos, quebras=texto.count('\n'))
+
+
+def _converter_numpy(buffer: bytes, primeira_linha: int) -> AlvosConvertidos:
+    """
+    Conversão vetorizada sobre os bytes do bloco, sem laço por linha.
+    
+    Uma linha é um IP simples se tem exatamente quatro sequências de dígitos,
+    três pontos, todos entre dígitos, e nenhum outro caractere (exceto \r).
+    O valor de cada octeto é lido no último dígito de cada sequência, somando
+    os dois dígitos anteriores com pesos 10 e 100.
+    """
+    resultado = AlvosConvertidos(array('I'), [], [])
+    dados = np.frombuffer(buffer, dtype=np.uint8)
+    if not len(dados):
+        return resultado
+    
+    digito = (dados >= ord('0')) & (dados <= ord('9'))
+    quebra = dados == ord('\n')
+    ponto = dados == ord('.')
+    outro = ~(digito | quebra | ponto | (dados == ord('\r')))
+    digito_antes = np.concatenate(([False], digito[:-1]))
+    digito_depois = np.concatenate((digito[1:], [False]))
+    
+    # Linha de cada byte (repetindo o número da linha pelo seu tamanho) e contagens por linha
+    quebras = np.flatnonzero(quebra)
+    total_linhas = len(quebras) + 1
+    tamanhos = np.diff(quebras, prepend=-1, append=len(dados) - 1)
+    linha = np.repeat(np.arange(total_linhas, dtype=np.int32), tamanhos)
+    
+    def por_linha(mascara):
+        return np.bincount(linha[mascara], minlength=total_linhas)
+    
+    fim_octeto = np.flatnonzero(digito & ~digito_depois)
+    linha_octeto = linha[fim_octeto]
+    ponto_entre_digitos = ponto & digito_antes & digito_depois
+    validas = (
+        (np.bincount(linha_octeto, minlength=total_linhas) == 4)
+        & (por_linha(ponto_entre_digitos) == 3)
+        & (por_linha(outro | (ponto & ~ponto_entre_digitos)) == 0)
+    )
+    
+    # Octetos: até três dígitos terminando em fim_octeto
+    valor = dados.astype(np.int16) - ord('0')
+    dois_digitos = digito_antes[fim_octeto]
+    tres_digitos = dois_digitos & digito_antes[np.maximum(fim_octeto - 1, 0)]
+    quatro_digitos = tres_digitos & digito_antes[np.maximum(fim_octeto - 2, 0)]
+    octetos = (
+        valor[fim_octeto]
+        + 10 * valor[np.maximum(fim_octeto - 1, 0)] * dois_digitos
+        + 100 * valor[np.maximum(fim_octeto - 2, 0)] * tres_digitos
+    )
+    fora_da_faixa = quatro_digitos | (octetos > 255)
+    validas[linha_octeto[fora_da_faixa]] = False
+    
+    # Linhas válidas têm exatamente quatro octetos consecutivos
+    octetos = octetos[validas[linha_octeto]].astype(np.uint32).reshape(-1, 4)
+    enderecos = (octetos[:, 0] << 24) | (octetos[:, 1] << 16) | (octetos[:, 2] << 8) | octetos[:, 3]
+    resultado.enderecos.frombytes(enderecos.astype(np.uint32).tobytes())
+    
+    # Linhas vazias, comentários, prefixos, faixas e inválidas: conversão linha a linha
+    inicios = np.concatenate(([0], quebras + 1))
+    fins = np.concatenate((quebras, [len(dados)]))
+    for indice in np.flatnonzero(~validas & (fins > inicios)).tolist():
+        linha_texto = str(buffer[inicios[indice]:fins[indice]], 'utf-8', errors='replace')
+        _interpretar_linha(linha_texto, primeira_linha + indice, resultado)
+    return resultado._replace(quebras=len(quebras))
+
+
+def converter_linhas(buffer: bytes, primeira_linha: int = 1,
+                     usar_numpy: Optional[bool] = None) -> AlvosConvertidos:
+    """
+    Converte um bloco de linhas de alvos em endereços inteiros.
+    
+    Linhas vazias e comentários (#) são ignorados. Os IPs simples ficam em
+    `enderecos` e os prefixos CIDR e faixas em `faixas`, sem expansão.
+    
+    Args:
+        buffer: Linhas separadas por \\n (UTF-8/ASCII), como lidas do arquivo
+            (bytes ou memoryview, por exemplo de um mmap)
+        primeira_linha: Número da primeira linha do bloco (para os avisos)
+        usar_numpy: Força (True) ou desativa (False) a conversão vetorizada;
+            None usa NumPy se estiver instalado
+    
+    Returns:
+        AlvosConvertidos com os endereços, as faixas e as linhas inválidas
+    """
+    if usar_numpy is None:
+        usar_numpy = np is not None
+    if usar_numpy:
+        if np is None:
+            raise RuntimeError("NumPy não está instalado")
+        return _converter_numpy(buffer, primeira_linha)
+    return _converter_python(buffer, primeira_linha)
@@ -0,0 +1,176 @@
+"""
+Comparação entre duas varreduras: só as mudanças de estado
+
+Os dois arquivos de resultados são percorridos juntos, em ordem de IP
+(numérico) e porta, como uma intercalação (merge join): a memória não
+depende do tamanho das varreduras. Um arquivo fora dessa ordem (gravado com
+--nao-ordenar, diário de retomada, exportação antiga sem a coluna Porta) é
+antes copiado para um temporário e ordenado em disco.
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+from collections import Counter
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from services.probe_result import (
+    Desfecho, ResultadoProtocolo, ResultadoTeste, StatusGeral, formatar_protocolo,
+    formatar_status, status_geral
+)
+from utils.checkpoint import CABECALHO, ler_diario
+from utils.ip_parser import ipv4_para_int
+from utils.result_writer import (
+    formato_do_arquivo, ler_resultados, ordenar_arquivo, registro_jsonl
+)
+
+# Estado de um alvo que não aparece em uma das varreduras
+AUSENTE = "Ausente"
+
+_EXPIRADOS = {Desfecho.TIMEOUT, Desfecho.PRAZO_ESGOTADO}
+
+
+class Transicao(NamedTuple):
+    """Mudança de estado de um par (IP, porta) entre duas varreduras"""
+    ip: str
+    porta: int
+    anterior: str  # estado na varredura anterior (AUSENTE se não foi testado)
+    atual: str  # estado na varredura atual (AUSENTE se não foi testado)
+
+
+def estado(resultado: Optional[ResultadoTeste]) -> str:
+    """
+    Resume um resultado no estado comparado entre varreduras.
+    
+    Args:
+        resultado: Resultado do teste, ou None se o alvo não foi testado
+    
+    Returns:
+        "OK" se algum protocolo respondeu, "Timeout" se ambos expiraram, a
+        falha que impediu a resposta nos demais casos (ex.: "Conexão
+        recusada") ou AUSENTE
+    """
+    if resultado is None:
+        return AUSENTE
+    status = status_geral(resultado)
+    if status != StatusGeral.ERRO:
+        return formatar_status(status)
+    # A falha do HTTP, a menos que ele só tenha expirado
+    falha = resultado.https if resultado.http.desfecho in _EXPIRADOS else resultado.http
+    return formatar_protocolo(ResultadoProtocolo(falha.desfecho))
+
+
+def _chave(resultado: ResultadoTeste) -> Tuple[int, int]:
+    return ipv4_para_int(resultado.ip), resultado.porta
+
+
+def _ler(caminho_arquivo: str, porta_padrao: Optional[int]) -> Iterator[ResultadoTeste]:
+    """Lê um arquivo de resultados (CSV, JSON Lines) ou um diário de retomada"""
+    with open(caminho_arquivo, 'rb') as arquivo:
+        diario = arquivo.read(len(CABECALHO)) == CABECALHO
+    if diario:
+        return ler_diario(caminho_arquivo)
+    return ler_resultados(caminho_arquivo, formato_do_arquivo(caminho_arquivo), porta_padrao)
+
+
+def _em_ordem(resultados: Iterable[ResultadoTeste]) -> bool:
+    """Indica se os resultados estão em ordem de IP (numérico) e porta"""
+    anterior = None
+    for resultado in resultados:
+        chave = _chave(resultado)
+        if anterior is not None and chave < anterior:
+            return False
+        anterior = chave
+    return True
+
+
+@contextlib.contextmanager
+def resultados_ordenados(caminho_arquivo: str,
+                         porta_padrao: Optional[int] = None) -> Iterator[Iterator[ResultadoTeste]]:
+    """
+    Abre um arquivo de resultados para leitura em ordem de IP e porta.
+    
+    Um arquivo já ordenado é lido diretamente; os demais são copiados para um
+    JSON Lines temporário, ordenado em disco e removido ao sair.
+    
+    Uso:
+        with resultados_ordenados('anterior.csv') as resultados:
+            for resultado in resultados: ...
+    
+    Args:
+        caminho_arquivo: CSV, JSON Lines ou diário de retomada
+        porta_padrao: Porta das linhas de CSVs sem a coluna Porta
+    
+    Raises:
+        FileNotFoundError: Se o arquivo não existir
+        ValueError: Se o CSV não tem a coluna Porta e não há porta_padrao
+    """
+    if _em_ordem(_ler(caminho_arquivo, porta_padrao)):
+        yield _ler(caminho_arquivo, porta_padrao)
+        return
+    
+    descritor, temporario = tempfile.mkstemp(prefix='comparacao_', suffix='.jsonl')
+    try:
+        with open(descritor, 'w', newline='', encoding='utf-8') as saida:
+            for resultado in _ler(caminho_arquivo, porta_padrao):
+                saida.write(json.dumps(registro_jsonl(resultado), ensure_ascii=False) + '\n')
+        ordenar_arquivo(temporario, 'jsonl')
+        yield ler_resultados(temporario, 'jsonl')
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _sem_repetidos(resultados: Iterator[ResultadoTeste]
+                   ) -> Iterator[Tuple[Tuple[int, int], ResultadoTeste]]:
+    """(chave, resultado) em ordem; de um alvo repetido, vale o último"""
+    atual = next(resultados, None)
+    for proximo in resultados:
+        if _chave(proximo) != _chave(atual):
+            yield _chave(atual), atual
+        atual = proximo
+    if atual is not None:
+        yield _chave(atual), atual
+
+
+def comparar_resultados(anteriores: Iterable[ResultadoTeste],
+                        atuais: Iterable[ResultadoTeste],
+                        contagem: Optional[Counter] = None,
+                        incluir_ausentes: bool = False) -> Iterator[Transicao]:
+    """
+    Compara duas varreduras, ambas em ordem de IP (numérico) e porta.
+    
+    Args:
+        anteriores: Resultados da varredura anterior
+        atuais: Resultados da varredura atual
+        contagem: Se informado, recebe a quantidade de cada transição
+            (anterior, atual) e a de alvos comparados sem mudança, em
+            (estado, estado); os alvos presentes em uma só varredura entram
+            como (estado, AUSENTE) ou (AUSENTE, estado)
+        incluir_ausentes: Também emite os alvos presentes em uma só varredura
+            (ex.: faixas diferentes); por padrão eles são apenas contados
+    
+    Yields:
+        Transicao de cada alvo testado nas duas varreduras cujo estado mudou
+    """
+    contagem = Counter() if contagem is None else contagem
+    fim = ((1 << 32, 0), None)
+    anteriores = _sem_repetidos(iter(anteriores))
+    atuais = _sem_repetidos(iter(atuais))
+    chave_anterior, anterior = next(anteriores, fim)
+    chave_atual, atual = next(atuais, fim)
+    while anterior is not None or atual is not None:
+        if chave_anterior < chave_atual:
+            par, antes, agora = anterior, estado(anterior), AUSENTE
+            chave_anterior, anterior = next(anteriores, fim)
+        elif chave_atual < chave_anterior:
+            par, antes, agora = atual, AUSENTE, estado(atual)
+            chave_atual, atual = next(atuais, fim)
+        else:
+            par, antes, agora = atual, estado(anterior), estado(atual)
+            chave_anterior, anterior = next(anteriores, fim)
+            chave_atual, atual = next(atuais, fim)
+        contagem[(antes, agora)] += 1
+        if antes != agora and (incluir_ausentes or AUSENTE not in (antes, agora)):
+            yield Transicao(par.ip, par.porta, antes, agora)
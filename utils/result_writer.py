@@ -0,0 +1,296 @@
+"""
+Gravação incremental dos resultados em CSV ou JSON Lines
+
+Os resultados são gravados à medida que ficam prontos, por uma thread
+alimentada por uma fila, com descargas periódicas em disco: uma falha no meio
+da varredura preserva o que já foi testado e a memória não cresce com o
+número de alvos. A ordenação final (por IP numérico e porta) é uma ordenação
+externa: lotes ordenados em arquivos temporários, intercalados no final.
+"""
+
+import csv
+import heapq
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from services.probe_result import (
+    ResultadoTeste, campos_tempos, colunas_tempos, formatar_protocolo, formatar_status,
+    interpretar_texto, status_geral, tempos_ms
+)
+from utils.ip_parser import ipv4_para_int
+
+FORMATOS = ('csv', 'jsonl')
+
+CAMPOS_CSV = ['IP', 'Porta', 'HTTP', 'HTTPS'] + campos_tempos('HTTP') + campos_tempos('HTTPS')
+
+# Descarga em disco a cada N linhas ou a cada intervalo, o que vier primeiro
+LINHAS_POR_DESCARGA = 1000
+INTERVALO_DESCARGA = 1.0  # segundos
+
+# Resultados aguardando gravação; cheia, a fila segura os workers
+TAMANHO_FILA = 10000
+
+# Linhas ordenadas em memória por vez na ordenação externa
+LINHAS_POR_LOTE_ORDENACAO = 100000
+
+_FIM = object()  # sinaliza o fim da fila para a thread de gravação
+
+
+def linha_csv(resultado: ResultadoTeste) -> Dict[str, object]:
+    """
+    Monta a linha CSV de um resultado.
+    
+    Args:
+        resultado: Resultado do teste
+    
+    Returns:
+        Dicionário com as colunas de CAMPOS_CSV
+    """
+    linha = {
+        'IP': resultado.ip,
+        'Porta': resultado.porta,
+        'HTTP': formatar_protocolo(resultado.http),
+        'HTTPS': formatar_protocolo(resultado.https)
+    }
+    linha.update(colunas_tempos('HTTP', resultado.http))
+    linha.update(colunas_tempos('HTTPS', resultado.https))
+    return linha
+
+
+def registro_jsonl(resultado: ResultadoTeste) -> Dict[str, object]:
+    """Monta o registro JSON de um resultado (mesmos campos da API web)"""
+    return {
+        'ip': resultado.ip,
+        'porta': resultado.porta,
+        'http': formatar_protocolo(resultado.http),
+        'https': formatar_protocolo(resultado.https),
+        'status': formatar_status(status_geral(resultado)),
+        'tempos_http': tempos_ms(resultado.http),
+        'tempos_https': tempos_ms(resultado.https)
+    }
+
+
+def formato_do_arquivo(caminho_arquivo: str) -> str:
+    """Deduz o formato pela extensão (.jsonl ou .json = JSON Lines; demais = CSV)"""
+    return 'jsonl' if caminho_arquivo.lower().endswith(('.jsonl', '.json')) else 'csv'
+
+
+class EscritorResultados:
+    """
+    Grava resultados em uma thread própria, alimentada por uma fila.
+    
+    Uso:
+        with EscritorResultados('results.csv') as escritor:
+            escritor.adicionar(resultado)
+    
+    Um erro de gravação não interrompe os testes: os resultados seguintes
+    são descartados e o erro é relançado em fechar().
+    """
+    
+    def __init__(self, caminho_arquivo: str, formato: Optional[str] = None):
+        """
+        Inicializa o escritor.
+        
+        Args:
+            caminho_arquivo: Arquivo de saída (sobrescrito)
+            formato: 'csv' ou 'jsonl' (padrão: pela extensão do arquivo)
+        """
+        self.caminho_arquivo = caminho_arquivo
+        self.formato = formato or formato_do_arquivo(caminho_arquivo)
+        if self.formato not in FORMATOS:
+            raise ValueError(f"Formato inválido: {self.formato}")
+        self.total_gravados = 0
+        self._fila: queue.Queue = queue.Queue(maxsize=TAMANHO_FILA)
+        self._thread: Optional[threading.Thread] = None
+        self._erro: Optional[Exception] = None
+    
+    def __enter__(self) -> 'EscritorResultados':
+        if self._thread is None:
+            self.iniciar()
+        return self
+    
+    def __exit__(self, tipo, valor, rastro):
+        # Com uma exceção em andamento, só garante o que já foi gravado
+        if tipo is None:
+            self.fechar()
+        else:
+            try:
+                self.fechar()
+            except Exception as e:
+                logging.error(f"Erro ao gravar resultados: {str(e)}")
+    
+    def iniciar(self):
+        """Abre o arquivo e inicia a thread de gravação"""
+        arquivo = open(self.caminho_arquivo, 'w', newline='', encoding='utf-8')
+        self._thread = threading.Thread(target=self._gravar, args=(arquivo,),
+                                        name='escritor-resultados')
+        self._thread.start()
+    
+    def adicionar(self, resultado: ResultadoTeste):
+        """Enfileira um resultado para gravação (bloqueia se a fila estiver cheia)"""
+        self._fila.put(resultado)
+    
+    def fechar(self):
+        """
+        Grava os resultados pendentes e fecha o arquivo.
+        
+        Raises:
+            OSError: Se alguma gravação falhou
+        """
+        if self._thread is None:
+            return
+        self._fila.put(_FIM)
+        self._thread.join()
+        self._thread = None
+        if self._erro is not None:
+            raise self._erro
+    
+    def _gravar(self, arquivo: TextIO):
+        """Laço da thread: grava cada resultado e descarrega periodicamente"""
+        if self.formato == 'csv':
+            escritor = csv.DictWriter(arquivo, fieldnames=CAMPOS_CSV)
+            escrever = lambda resultado: escritor.writerow(linha_csv(resultado))
+        else:
+            escrever = lambda resultado: arquivo.write(
+                json.dumps(registro_jsonl(resultado), ensure_ascii=False) + '\n')
+        
+        pendentes = 0
+        ultima_descarga = time.monotonic()
+        with arquivo:
+            try:
+                if self.formato == 'csv':
+                    escritor.writeheader()
+                while True:
+                    try:
+                        resultado = self._fila.get(timeout=INTERVALO_DESCARGA)
+                    except queue.Empty:
+                        resultado = None
+                    if resultado is _FIM:
+                        return
+                    if resultado is not None:
+                        escrever(resultado)
+                        self.total_gravados += 1
+                        pendentes += 1
+                    agora = time.monotonic()
+                    if pendentes and (pendentes >= LINHAS_POR_DESCARGA
+                                      or agora - ultima_descarga >= INTERVALO_DESCARGA):
+                        arquivo.flush()
+                        pendentes = 0
+                        ultima_descarga = agora
+            except Exception as e:
+                self._erro = e
+                logging.error(f"Erro ao gravar {self.caminho_arquivo}: {str(e)}")
+                # Continua consumindo a fila para não travar os workers
+                while self._fila.get() is not _FIM:
+                    pass
+
+
+def _chave_csv(linha: str) -> Tuple[int, int]:
+    campos = next(csv.reader([linha]))
+    return ipv4_para_int(campos[0]), int(campos[1])
+
+
+def _chave_jsonl(linha: str) -> Tuple[int, int]:
+    registro = json.loads(linha)
+    return ipv4_para_int(registro['ip']), int(registro['porta'])
+
+
+def _gravar_lote(linhas: List[str], chave: Callable[[str], Tuple[int, int]],
+                 diretorio: str) -> str:
+    """Ordena um lote e o grava em um arquivo temporário; retorna o caminho"""
+    linhas.sort(key=chave)
+    descritor, caminho = tempfile.mkstemp(prefix='lote_', suffix='.tmp', dir=diretorio)
+    with open(descritor, 'w', newline='', encoding='utf-8') as arquivo:
+        arquivo.writelines(linhas)
+    return caminho
+
+
+def ordenar_arquivo(caminho_arquivo: str, formato: Optional[str] = None,
+                    linhas_por_lote: int = LINHAS_POR_LOTE_ORDENACAO):
+    """
+    Ordena o arquivo de resultados por IP (numérico) e porta, em disco.
+    
+    Ordenação externa: lotes de até linhas_por_lote linhas são ordenados em
+    memória e gravados em arquivos temporários (no mesmo diretório), depois
+    intercalados com heapq.merge. O arquivo é substituído só no final.
+    
+    Args:
+        caminho_arquivo: Arquivo gravado por EscritorResultados
+        formato: 'csv' ou 'jsonl' (padrão: pela extensão do arquivo)
+        linhas_por_lote: Linhas mantidas em memória por vez
+    """
+    formato = formato or formato_do_arquivo(caminho_arquivo)
+    chave = _chave_csv if formato == 'csv' else _chave_jsonl
+    diretorio = os.path.dirname(os.path.abspath(caminho_arquivo))
+    lotes: List[str] = []
+    try:
+        with open(caminho_arquivo, 'r', newline='', encoding='utf-8') as entrada:
+            cabecalho = entrada.readline() if formato == 'csv' else ''
+            linhas: List[str] = []
+            for linha in entrada:
+                if not linha.strip():
+                    continue
+                linhas.append(linha if linha.endswith('\n') else linha + '\n')
+                if len(linhas) >= linhas_por_lote:
+                    lotes.append(_gravar_lote(linhas, chave, diretorio))
+                    linhas = []
+            if linhas:
+                lotes.append(_gravar_lote(linhas, chave, diretorio))
+        
+        descritor, temporario = tempfile.mkstemp(prefix='ordenado_', suffix='.tmp', dir=diretorio)
+        lotes.append(temporario)
+        arquivos = [open(lote, 'r', newline='', encoding='utf-8') for lote in lotes[:-1]]
+        try:
+            with open(descritor, 'w', newline='', encoding='utf-8') as saida:
+                saida.write(cabecalho)
+                saida.writelines(heapq.merge(*arquivos, key=chave))
+        finally:
+            for arquivo in arquivos:
+                arquivo.close()
+        os.replace(temporario, caminho_arquivo)
+    finally:
+        for lote in lotes:
+            if os.path.exists(lote):
+                os.remove(lote)
+
+
+def ler_resultados(caminho_arquivo: str, formato: Optional[str] = None,
+                   porta_padrao: Optional[int] = None) -> Iterator[ResultadoTeste]:
+    """
+    Lê de volta um arquivo de resultados, um resultado por vez.
+    
+    Args:
+        caminho_arquivo: Arquivo gravado por EscritorResultados
+        formato: 'csv' ou 'jsonl' (padrão: pela extensão do arquivo)
+        porta_padrao: Porta atribuída às linhas de CSVs sem a coluna Porta
+            (exportações antigas, de uma só porta)
+    
+    Yields:
+        ResultadoTeste com os desfechos e códigos (sem os tempos)
+    
+    Raises:
+        ValueError: Se o CSV não tem a coluna Porta e não há porta_padrao
+    """
+    formato = formato or formato_do_arquivo(caminho_arquivo)
+    with open(caminho_arquivo, 'r', newline='', encoding='utf-8') as arquivo:
+        if formato == 'csv':
+            registros: Iterable[Dict] = (
+                {'ip': linha['IP'], 'porta': linha.get('Porta') or porta_padrao,
+                 'http': linha['HTTP'], 'https': linha['HTTPS']}
+                for linha in csv.DictReader(arquivo)
+            )
+        else:
+            registros = (json.loads(linha) for linha in arquivo if linha.strip())
+        for registro in registros:
+            if registro['porta'] is None:
+                raise ValueError(f"{caminho_arquivo} não tem a coluna Porta")
+            yield ResultadoTeste(
+                registro['ip'], int(registro['porta']),
+                interpretar_texto(registro['http']), interpretar_texto(registro['https'])
+            )
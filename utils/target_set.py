@@ -0,0 +1,343 @@
+"""
+Conjunto compacto de alvos IPv4: sem repetições, em ordem numérica e sem as
+faixas excluídas (redes de gerência, listas de "não varrer")
+
+Os IPs simples ficam em um array('I') ordenado (4 bytes por alvo, contra
+~60 de uma string); prefixos CIDR e faixas ficam como intervalos mesclados,
+expandidos só na iteração. Com NumPy instalado, a ordenação e a filtragem
+são vetorizadas.
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from utils.file_reader import FonteAlvos, avisar_linhas_invalidas
+from utils.ip_parser import int_para_ipv4, interpretar_alvo, ipv4_para_int, np
+
+Faixa = Tuple[int, int]  # (primeiro, último), inclusiva
+
+# Grupos de sub-redes vizinhas sorteados entre os processos por fatia(): limita
+# as faixas recortadas mesmo com prefixos longos (um /8 em /32 são 16M sub-redes)
+MAX_GRUPOS_FATIAMENTO = 1 << 16
+
+
+def mesclar_faixas(faixas: Iterable[Faixa]) -> List[Faixa]:
+    """
+    Ordena faixas e junta as sobrepostas ou vizinhas.
+    
+    Args:
+        faixas: Faixas (primeiro, último) em qualquer ordem
+    
+    Returns:
+        Faixas disjuntas em ordem crescente
+    """
+    mescladas: List[Faixa] = []
+    for primeiro, ultimo in sorted(faixas):
+        if mescladas and primeiro <= mescladas[-1][1] + 1:
+            if ultimo > mescladas[-1][1]:
+                mescladas[-1] = (mescladas[-1][0], ultimo)
+        else:
+            mescladas.append((primeiro, ultimo))
+    return mescladas
+
+
+def subtrair_faixas(faixas: List[Faixa], exclusoes: List[Faixa]) -> List[Faixa]:
+    """
+    Remove das faixas os endereços cobertos pelas exclusões.
+    
+    Args:
+        faixas: Faixas disjuntas e ordenadas (saída de mesclar_faixas)
+        exclusoes: Faixas a remover, também disjuntas e ordenadas
+    
+    Returns:
+        O que sobra das faixas, disjunto e ordenado
+    """
+    restantes: List[Faixa] = []
+    j = 0
+    for primeiro, ultimo in faixas:
+        # Exclusões que terminam antes desta faixa não afetam as seguintes
+        while j < len(exclusoes) and exclusoes[j][1] < primeiro:
+            j += 1
+        k = j
+        while k < len(exclusoes) and exclusoes[k][0] <= ultimo:
+            inicio_exclusao, fim_exclusao = exclusoes[k]
+            if inicio_exclusao > primeiro:
+                restantes.append((primeiro, inicio_exclusao - 1))
+            primeiro = fim_exclusao + 1
+            if primeiro > ultimo:
+                break
+            k += 1
+        if primeiro <= ultimo:
+            restantes.append((primeiro, ultimo))
+    return restantes
+
+
+def _ordenar_sem_repeticoes(enderecos: array) -> array:
+    """Ordena os endereços numericamente e remove as repetições"""
+    if np is not None:
+        return array('I', np.unique(np.frombuffer(enderecos, dtype=np.uint32)).tobytes())
+    return array('I', sorted(set(enderecos)))
+
+
+def _fora_das_faixas(enderecos: array, faixas: List[Faixa]) -> array:
+    """
+    Filtra os endereços que não estão em nenhuma das faixas.
+    
+    Args:
+        enderecos: Endereços ordenados
+        faixas: Faixas disjuntas e ordenadas
+    """
+    if not faixas or not enderecos:
+        return enderecos
+    if np is not None:
+        valores = np.frombuffer(enderecos, dtype=np.uint32)
+        inicios = np.array([primeiro for primeiro, _ in faixas], dtype=np.uint32)
+        fins = np.array([ultimo for _, ultimo in faixas], dtype=np.uint32)
+        # Última faixa que começa antes (ou no) de cada endereço
+        indices = np.searchsorted(inicios, valores, side='right') - 1
+        dentro = (indices >= 0) & (valores <= fins[np.maximum(indices, 0)])
+        return array('I', valores[~dentro].tobytes())
+    
+    # Varredura conjunta das duas sequências ordenadas
+    restantes = array('I')
+    j = 0
+    for numero in enderecos:
+        while j < len(faixas) and faixas[j][1] < numero:
+            j += 1
+        if j == len(faixas) or numero < faixas[j][0]:
+            restantes.append(numero)
+    return restantes
+
+
+def _fatia_das_redes(redes, total: int):
+    """
+    Fatia (0 a total-1) de cada sub-rede, por hash multiplicativo: redes
+    vizinhas caem em fatias diferentes. Aceita um inteiro ou um array NumPy
+    de uint32.
+    """
+    return (((redes * 2654435761) & 0xFFFFFFFF) >> 16) % total
+
+
+def ler_exclusoes(caminho_arquivo: str) -> List[Faixa]:
+    """
+    Lê uma lista de exclusão (IPs, prefixos CIDR ou faixas, um por linha).
+    
+    Prefixos excluem a rede inteira, inclusive os endereços de rede e de
+    broadcast.
+    
+    Args:
+        caminho_arquivo: Caminho para o arquivo de exclusões
+    
+    Returns:
+        Faixas excluídas, mescladas
+    
+    Raises:
+        FileNotFoundError: Se o arquivo não existir
+        ValueError: Se alguma linha não for um alvo válido (uma exclusão
+            ignorada em silêncio faria a varredura atingir a rede protegida)
+    """
+    faixas = []
+    with open(caminho_arquivo, 'r', encoding='utf-8') as arquivo:
+        for numero_linha, linha in enumerate(arquivo, 1):
+            linha = linha.strip()
+            if not linha or linha.startswith('#'):
+                continue
+            try:
+                faixas.append(interpretar_alvo(linha, rede_inteira=True))
+            except ValueError:
+                raise ValueError(f"Exclusão inválida na linha {numero_linha} de {caminho_arquivo}: {linha}")
+    return mesclar_faixas(faixas)
+
+
+class ConjuntoAlvos:
+    """
+    Alvos IPv4 sem repetições, em ordem numérica, com exclusões aplicadas.
+    
+    Iterar gera os IPs como texto, em ordem crescente; len() é o total de
+    endereços distintos.
+    """
+    
+    def __init__(self, enderecos: Optional[array] = None, faixas: Iterable[Faixa] = (),
+                 exclusoes: Iterable[Faixa] = ()):
+        """
+        Inicializa o conjunto.
+        
+        Args:
+            enderecos: IPs simples como inteiros (array('I'), em qualquer ordem)
+            faixas: Prefixos e faixas (primeiro, último) em qualquer ordem
+            exclusoes: Faixas (primeiro, último) que não devem ser testadas
+        """
+        enderecos = enderecos if enderecos is not None else array('I')
+        faixas = list(faixas)
+        total_entrada = len(enderecos) + sum(ultimo - primeiro + 1 for primeiro, ultimo in faixas)
+        
+        faixas = mesclar_faixas(faixas)
+        exclusoes = mesclar_faixas(exclusoes)
+        enderecos = _ordenar_sem_repeticoes(enderecos)
+        # IPs simples já cobertos por uma faixa só seriam testados duas vezes
+        enderecos = _fora_das_faixas(enderecos, faixas)
+        total_sem_repeticoes = len(enderecos) + sum(ultimo - primeiro + 1 for primeiro, ultimo in faixas)
+        
+        self.enderecos = _fora_das_faixas(enderecos, exclusoes)
+        self.faixas = subtrair_faixas(faixas, exclusoes)
+        # Endereços das faixas anteriores a cada faixa (posição de um IP)
+        self._antes_da_faixa = [0]
+        for primeiro, ultimo in self.faixas:
+            self._antes_da_faixa.append(self._antes_da_faixa[-1] + ultimo - primeiro + 1)
+        self._total = len(self.enderecos) + self._antes_da_faixa[-1]
+        self.total_repetidos = total_entrada - total_sem_repeticoes
+        self.total_excluidos = total_sem_repeticoes - self._total
+    
+    @classmethod
+    def da_fonte(cls, fonte: FonteAlvos, exclusoes: Iterable[Faixa] = ()) -> 'ConjuntoAlvos':
+        """
+        Monta o conjunto a partir de uma fonte de alvos (arquivo ou texto).
+        
+        Args:
+            fonte: Alvos lidos sob demanda
+            exclusoes: Faixas (primeiro, último) que não devem ser testadas
+        
+        Returns:
+            ConjuntoAlvos; as linhas inválidas continuam registradas na fonte
+        """
+        enderecos = array('I')
+        faixas: List[Faixa] = []
+        for convertidos in fonte.blocos():
+            enderecos.extend(convertidos.enderecos)
+            faixas.extend(convertidos.faixas)
+        return cls(enderecos, faixas, exclusoes)
+    
+    def inteiros(self) -> Iterator[int]:
+        """Gera os endereços como inteiros, em ordem crescente"""
+        expandidas = chain.from_iterable(range(primeiro, ultimo + 1) for primeiro, ultimo in self.faixas)
+        if not self.faixas:
+            return iter(self.enderecos)
+        if not self.enderecos:
+            return expandidas
+        return heapq.merge(self.enderecos, expandidas)
+    
+    @property
+    def memoria(self) -> int:
+        """Bytes ocupados pelos IPs simples e pelas faixas (aproximado)"""
+        return self.enderecos.itemsize * len(self.enderecos) + 8 * len(self.faixas)
+    
+    def fatia(self, indice: int, total: int, prefixo: int = 24) -> 'ConjuntoAlvos':
+        """
+        Parte dos alvos testada por um de vários processos.
+        
+        Os alvos são distribuídos por sub-rede /prefixo, com hash: cada
+        sub-rede fica inteira em uma única fatia, e o limite de testes
+        simultâneos por sub-rede continua valendo com vários processos.
+        
+        Quando as faixas cobrem mais de MAX_GRUPOS_FATIAMENTO sub-redes, o
+        hash é aplicado a grupos de 2^n sub-redes consecutivas (sub-redes
+        continuam inteiras): cada faixa é recortada em no máximo
+        MAX_GRUPOS_FATIAMENTO pedaços contíguos, sem percorrer sub-rede por
+        sub-rede.
+        
+        Args:
+            indice: Fatia desejada (0 a total-1)
+            total: Quantidade de fatias
+            prefixo: Prefixo que agrupa IPs na mesma sub-rede
+        
+        Returns:
+            ConjuntoAlvos com os alvos da fatia
+        """
+        deslocamento = self._deslocamento_grupos(prefixo)
+        if np is not None and self.enderecos:
+            valores = np.frombuffer(self.enderecos, dtype=np.uint32)
+            selecionados = _fatia_das_redes(valores >> deslocamento, total) == indice
+            enderecos = array('I', valores[selecionados].tobytes())
+        else:
+            enderecos = array('I', (numero for numero in self.enderecos
+                                    if _fatia_das_redes(numero >> deslocamento, total) == indice))
+        
+        # Faixas são recortadas nas fronteiras dos grupos; grupos vizinhos da
+        # mesma fatia voltam a ser uma faixa só
+        faixas: List[Faixa] = []
+        for primeiro, ultimo in self.faixas:
+            for grupo in range(primeiro >> deslocamento, (ultimo >> deslocamento) + 1):
+                if _fatia_das_redes(grupo, total) == indice:
+                    inicio = max(primeiro, grupo << deslocamento)
+                    fim = min(ultimo, ((grupo + 1) << deslocamento) - 1)
+                    if faixas and faixas[-1][1] + 1 == inicio:
+                        faixas[-1] = (faixas[-1][0], fim)
+                    else:
+                        faixas.append((inicio, fim))
+        return ConjuntoAlvos(enderecos, faixas)
+    
+    def _deslocamento_grupos(self, prefixo: int) -> int:
+        """
+        Bits à direita descartados para obter o grupo de sub-redes de um
+        endereço em fatia(): 32 - prefixo, mais os bits que juntam sub-redes
+        vizinhas até as faixas somarem no máximo MAX_GRUPOS_FATIAMENTO grupos.
+        """
+        deslocamento = 32 - prefixo
+        redes = sum((ultimo >> deslocamento) - (primeiro >> deslocamento) + 1
+                    for primeiro, ultimo in self.faixas)
+        por_grupo = -(-redes // MAX_GRUPOS_FATIAMENTO)  # sub-redes por grupo, arredondado para cima
+        return min(32, deslocamento + (por_grupo - 1).bit_length())
+    
+    def __iter__(self) -> Iterator[str]:
+        return map(int_para_ipv4, self.inteiros())
+    
+    def __len__(self) -> int:
+        return self._total
+    
+    def __contains__(self, ip: str) -> bool:
+        return self.posicao(ip) is not None
+    
+    def posicao(self, ip: str) -> Optional[int]:
+        """
+        Posição do IP na ordem de iteração.
+        
+        Args:
+            ip: Endereço IPv4
+        
+        Returns:
+            Índice de 0 a len()-1, ou None se o IP não pertence ao conjunto
+        """
+        try:
+            numero = ipv4_para_int(ip)
+        except ValueError:
+            return None
+        anteriores = bisect_left(self.enderecos, numero)
+        # Última faixa que começa antes (ou no) do endereço
+        faixa = bisect_right(self.faixas, (numero, 0xFFFFFFFF)) - 1
+        if anteriores < len(self.enderecos) and self.enderecos[anteriores] == numero:
+            # IPs simples nunca estão dentro de uma faixa
+            return anteriores + self._antes_da_faixa[faixa + 1]
+        if faixa >= 0 and numero <= self.faixas[faixa][1]:
+            return anteriores + self._antes_da_faixa[faixa] + numero - self.faixas[faixa][0]
+        return None
+
+
+def carregar_alvos(caminho_arquivo: str, exclusoes: Iterable[Faixa] = (),
+                   processos: int = 1) -> ConjuntoAlvos:
+    """
+    Lê um arquivo de alvos em uma única passada e avisa sobre linhas inválidas.
+    
+    Args:
+        caminho_arquivo: Caminho para o arquivo (IPs, prefixos CIDR ou faixas)
+        exclusoes: Faixas (primeiro, último) que não devem ser testadas
+        processos: Processos que convertem as fatias do arquivo em paralelo
+    
+    Returns:
+        ConjuntoAlvos sem repetições e sem as exclusões
+    
+    Raises:
+        FileNotFoundError: Se o arquivo não existir
+    """
+    try:
+        fonte = FonteAlvos.do_arquivo(caminho_arquivo, processos)
+        alvos = ConjuntoAlvos.da_fonte(fonte, exclusoes)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Arquivo não encontrado: {caminho_arquivo}")
+    except Exception as e:
+        raise Exception(f"Erro ao ler arquivo {caminho_arquivo}: {str(e)}")
+    
+    avisar_linhas_invalidas(fonte)
+    return alvos